@@ -0,0 +1,49 @@
+"""Time capacity report over many builds
+
+Usage:
+    python -m benchmarks.bench_analytics
+"""
+
+import time
+
+from iiblib.iib_analytics import BuildHistoryArrays
+from iiblib.iib_compact_model import CompactBuildDetails
+from iiblib.iib_timestamps import build_durations
+
+from .fixtures import make_build
+
+
+def _python_report(builds):
+    """Report computed by looping over state history of every build"""
+    durations = {}
+    for build in builds:
+        queue, run = build_durations(build["state_history"])
+        durations.setdefault(build["request_type"], []).append((queue, run))
+    return durations
+
+
+def main(builds=500000):
+    print("generating %d builds" % builds)
+    data = [make_build(bid, bundles=0) for bid in range(1, builds + 1)]
+
+    start = time.time()
+    _python_report(data)
+    print("python loop over state_history: %6.2f s" % (time.time() - start))
+
+    start = time.time()
+    arrays = BuildHistoryArrays.from_builds(data)
+    built = time.time()
+    arrays.report()
+    print(
+        "raw builds -> arrays:           %6.2f s (report %.2f s)"
+        % (time.time() - start, time.time() - built)
+    )
+
+    compact = [CompactBuildDetails.from_dict(build) for build in data]
+    start = time.time()
+    BuildHistoryArrays.from_builds(compact).report()
+    print("compact builds -> arrays:       %6.2f s" % (time.time() - start))
+
+
+if __name__ == "__main__":
+    main()
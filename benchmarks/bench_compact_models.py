@@ -0,0 +1,46 @@
+"""Compare memory used by IIBBuildDetailsModel and CompactBuildDetails
+
+Usage:
+    python -m benchmarks.bench_compact_models
+"""
+
+import gc
+import json
+import tracemalloc
+
+from iiblib.iib_build_details_model import IIBBuildDetailsModel
+from iiblib.iib_compact_model import CompactBuildDetails
+
+from .fixtures import make_build
+
+
+def _measure(factory, documents):
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(json.loads(document)) for document in documents]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main(builds=20000):
+    # documents are decoded inside measurement so every object owns its data
+    # as it would when decoded from separate IIB responses
+    documents = [json.dumps(make_build(bid, bundles=5)) for bid in range(builds)]
+    print("%d builds" % builds)
+    baseline = None
+    for name, factory in (
+        ("IIBBuildDetailsModel", IIBBuildDetailsModel.from_dict),
+        ("CompactBuildDetails", CompactBuildDetails.from_dict),
+    ):
+        size = _measure(factory, documents)
+        baseline = baseline or size
+        print(
+            "%-22s %8.1f MiB  %6d bytes/build  %5.2fx"
+            % (name, size / 2.0**20, size / builds, baseline / float(size))
+        )
+
+
+if __name__ == "__main__":
+    main()
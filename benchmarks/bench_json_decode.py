@@ -0,0 +1,29 @@
+"""Compare JSON decoders on a 100 items "builds" page
+
+Usage:
+    python -m benchmarks.bench_json_decode
+"""
+
+import json
+import timeit
+
+from iiblib.iib_json import available_decoders, get_decoder
+
+from .fixtures import make_page
+
+
+def main(number=50):
+    body = json.dumps(make_page(items=100)).encode("utf-8")
+    print("builds page size: %d bytes" % len(body))
+    baseline = None
+    for name in reversed(available_decoders()):
+        loads = get_decoder(name)
+        seconds = min(timeit.repeat(lambda: loads(body), number=number, repeat=5))
+        per_call = seconds / number * 1000
+        if baseline is None:
+            baseline = per_call
+        print("%-8s %8.3f ms/page  %5.2fx" % (name, per_call, baseline / per_call))
+
+
+if __name__ == "__main__":
+    main()
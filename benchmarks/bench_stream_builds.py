@@ -0,0 +1,51 @@
+"""Compare peak memory of decoding whole builds page and streaming it
+
+Usage:
+    python -m benchmarks.bench_stream_builds
+"""
+
+import json
+import tracemalloc
+
+from iiblib.iib_build_details_model import IIBBuildDetailsModel
+from iiblib.iib_json import get_decoder, iter_json_object
+
+from .fixtures import make_page
+
+
+def _chunks(body, size=64 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+def _whole_page(body):
+    data = get_decoder("json")(body)
+    models = [IIBBuildDetailsModel.from_dict(item) for item in data["items"]]
+    return sum(model.id for model in models)
+
+
+def _streamed_page(body):
+    return sum(
+        IIBBuildDetailsModel.from_dict(value).id
+        for key, value in iter_json_object(_chunks(body), "items")
+        if key == "items"
+    )
+
+
+def _peak(func, body):
+    tracemalloc.start()
+    func(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(items=500):
+    body = json.dumps(make_page(items=items)).encode("utf-8")
+    print("builds page: %d items, %d bytes" % (items, len(body)))
+    for name, func in (("whole page", _whole_page), ("streamed", _streamed_page)):
+        print("%-12s peak %10d bytes" % (name, _peak(func, body)))
+
+
+if __name__ == "__main__":
+    main()
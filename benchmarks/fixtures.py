@@ -0,0 +1,116 @@
+"""Synthetic IIB responses used by benchmarks"""
+
+import datetime
+
+_BASE_TIME = datetime.datetime(2024, 1, 1)
+_STATES = ("complete", "complete", "complete", "failed", "in_progress")
+_FAILURE_REASONS = (
+    "Failed to resolve the container image",
+    "The request failed due to a timeout",
+    "Failed to build the index image on the arch",
+)
+
+
+def _timestamp(seconds):
+    return (_BASE_TIME + datetime.timedelta(seconds=seconds)).strftime(
+        "%Y-%m-%dT%H:%M:%S.%fZ"
+    )
+
+
+def make_build(bid, bundles=20):
+    """Return dictionary of "add" build as returned by IIB API
+
+    Args:
+        bid (int)
+            build id
+        bundles (int)
+            number of bundles in the build
+    """
+    start = bid * 37
+    state = _STATES[bid % len(_STATES)]
+    bundle_list = [
+        "registry.example.com/operator-%d/bundle@sha256:%064x" % (n % 7, bid * 100 + n)
+        for n in range(bundles)
+    ]
+    state_history = [
+        {
+            "state": "in_progress",
+            "state_reason": "The request was initiated",
+            "updated": _timestamp(start),
+        },
+        {
+            "state": "in_progress",
+            "state_reason": "Resolving the container images",
+            "updated": _timestamp(start + 120 + bid % 300),
+        },
+    ]
+    if state != "in_progress":
+        state_history.append(
+            {
+                "state": state,
+                "state_reason": (
+                    "The request completed successfully"
+                    if state == "complete"
+                    else _FAILURE_REASONS[bid % len(_FAILURE_REASONS)]
+                ),
+                "updated": _timestamp(start + 900 + bid % 600),
+            }
+        )
+    state_history.reverse()
+    return {
+        "id": bid,
+        "arches": ["amd64", "arm64", "ppc64le", "s390x"],
+        "batch": bid,
+        "batch_annotations": {"release": "RHBA-2024:%05d" % (bid % 1000)},
+        "binary_image": "registry.example.com/openshift4/ose-operator-registry:v4.15",
+        "binary_image_resolved": "registry.example.com/openshift4/"
+        "ose-operator-registry@sha256:%064x" % (bid % 3),
+        "build_tags": ["v4.15-%d" % bid],
+        "bundle_mapping": {
+            "operator-%d" % n: [b for b in bundle_list if "operator-%d/" % n in b]
+            for n in range(7)
+        },
+        "bundles": bundle_list,
+        "check_related_images": False,
+        "deprecation_list": [],
+        "distribution_scope": "prod",
+        "from_index": "registry.example.com/redhat/redhat-operator-index:v4.15",
+        "from_index_resolved": "registry.example.com/redhat/"
+        "redhat-operator-index@sha256:%064x" % bid,
+        "index_image": "registry.example.com/iib/iib:%d" % bid,
+        "index_image_resolved": "registry.example.com/iib/iib@sha256:%064x" % (bid + 1),
+        "internal_index_image_copy": "registry.example.com/iib-internal:%d" % bid,
+        "internal_index_image_copy_resolved": "registry.example.com/"
+        "iib-internal@sha256:%064x" % (bid + 2),
+        "logs": {
+            "expiration": _timestamp(start + 86400 * 90),
+            "url": "https://iib.example.com/api/v1/builds/%d/logs" % bid,
+        },
+        "omps_operator_version": {},
+        "organization": None,
+        "removed_operators": [],
+        "request_type": "add",
+        "state": state,
+        "state_history": state_history,
+        "state_reason": state_history[0]["state_reason"],
+        "updated": state_history[0]["updated"],
+        "user": "release-bot-%d@example.com" % (bid % 5),
+    }
+
+
+def make_page(items=100, page=1, bundles=20):
+    """Return dictionary of "builds" page as returned by IIB API"""
+    first = (page - 1) * items + 1
+    return {
+        "items": [make_build(bid, bundles) for bid in range(first, first + items)],
+        "meta": {
+            "first": "https://iib.example.com/api/v1/builds?page=1",
+            "last": "",
+            "next": "",
+            "page": page,
+            "pages": page + 1,
+            "per_page": items,
+            "previous": "",
+            "total": items * (page + 1),
+        },
+    }
@@ -0,0 +1,384 @@
+import warnings
+
+from .iib_build_details_model import IIBBuildDetailsModel
+from .iib_build_details_pager import IIBBuildDetailsPager
+from .iib_compact_model import CompactBuildDetails
+from .iib_timestamps import parse_timestamp
+
+# Marker of missing timestamp in timestamp arrays
+MISSING = -(2**63)
+
+_HOUR = 3600 * 10**6
+_TERMINAL_STATES = ("complete", "failed")
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required for build history analytics")
+    return numpy
+
+
+def _timestamps_to_array(numpy, values):
+    """Convert list of IIB timestamps or microseconds to int64 array"""
+    if not values or not isinstance(values[0], str):
+        return numpy.array(values, dtype=numpy.int64)
+    try:
+        with warnings.catch_warnings():
+            # numpy only warns about timezone offsets it can't represent
+            warnings.simplefilter("error")
+            strings = numpy.char.rstrip(numpy.array(values), "Z")
+            return strings.astype("datetime64[us]").astype(numpy.int64)
+    except (TypeError, ValueError, Warning):
+        # timestamps with timezone offsets or mixed with integers
+        return numpy.array(
+            [
+                parse_timestamp(value) if isinstance(value, str) else value
+                for value in values
+            ],
+            dtype=numpy.int64,
+        )
+
+
+def _encode(numpy, values):
+    """Return (labels, codes) of categorical values"""
+    labels, codes = numpy.unique(numpy.array(values, dtype=object), return_inverse=True)
+    return [str(label) for label in labels], codes.astype(numpy.int32)
+
+
+class BuildHistoryArrays(object):
+    """
+    NumPy arrays describing many builds and their state history
+
+    Build milestones are derived from state history in the same way as
+    iib_timestamps.build_times does, but for all builds at once.
+
+    Args:
+        ids (numpy.ndarray)
+            int64 array of build ids
+        request_type_labels (list)
+            Names of request types
+        request_types (numpy.ndarray)
+            int32 array of indexes to request_type_labels
+        state_labels (list)
+            Names of states
+        states (numpy.ndarray)
+            int32 array of indexes to state_labels
+        created (numpy.ndarray)
+            int64 array of creation times in microseconds since epoch
+        started (numpy.ndarray)
+            int64 array of times when worker started processing the build,
+            MISSING when build didn't start yet
+        finished (numpy.ndarray)
+            int64 array of times when build reached terminal state,
+            MISSING when build didn't finish yet
+        state_reasons (list)
+            State reasons of builds
+    """
+
+    def __init__(
+        self,
+        ids,
+        request_type_labels,
+        request_types,
+        state_labels,
+        states,
+        created,
+        started,
+        finished,
+        state_reasons,
+    ):
+        self.ids = ids
+        self.request_type_labels = request_type_labels
+        self.request_types = request_types
+        self.state_labels = state_labels
+        self.states = states
+        self.created = created
+        self.started = started
+        self.finished = finished
+        self.state_reasons = state_reasons
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_builds(cls, builds):
+        """
+        Create arrays from builds
+
+        Args:
+            builds (iterable)
+                Iterable of IIBBuildDetailsModel, CompactBuildDetails
+                instances or raw json build data
+
+        Raises:
+            ImportError when numpy is not installed
+
+        Returns:
+            BuildHistoryArrays
+        """
+        numpy = _import_numpy()
+        ids = []
+        request_types = []
+        states = []
+        state_reasons = []
+        entry_builds = []
+        entry_states = []
+        entry_times = []
+        for build in builds:
+            index = len(ids)
+            if isinstance(build, CompactBuildDetails):
+                ids.append(build.id)
+                request_types.append(build.request_type)
+                states.append(build.state)
+                state_reasons.append(build.state_reason)
+                for state, _, updated in build.state_history:
+                    entry_builds.append(index)
+                    entry_states.append(state)
+                    entry_times.append(updated)
+                continue
+            if isinstance(build, IIBBuildDetailsModel):
+                build = build.to_dict()
+            ids.append(build["id"])
+            request_types.append(build["request_type"])
+            states.append(build["state"])
+            state_reasons.append(build["state_reason"])
+            for entry in build.get("state_history") or ():
+                entry_builds.append(index)
+                entry_states.append(entry["state"])
+                entry_times.append(entry["updated"])
+
+        request_type_labels, request_type_codes = _encode(numpy, request_types)
+        state_labels, state_codes = _encode(numpy, states)
+        created, started, finished = cls._milestones(
+            numpy,
+            len(ids),
+            numpy.array(entry_builds, dtype=numpy.int64),
+            numpy.isin(numpy.array(entry_states, dtype=object), _TERMINAL_STATES),
+            _timestamps_to_array(numpy, entry_times),
+        )
+        return cls(
+            numpy.array(ids, dtype=numpy.int64),
+            request_type_labels,
+            request_type_codes,
+            state_labels,
+            state_codes,
+            created,
+            started,
+            finished,
+            state_reasons,
+        )
+
+    @classmethod
+    def from_pages(cls, pages):
+        """
+        Create arrays from pages of builds
+
+        Args:
+            pages (iterable)
+                Iterable of raw json "builds" pages or IIBBuildDetailsPager
+                instances
+
+        Returns:
+            BuildHistoryArrays
+        """
+
+        def _builds():
+            for page in pages:
+                if isinstance(page, IIBBuildDetailsPager):
+                    for build in page.items():
+                        yield build
+                else:
+                    for build in page["items"]:
+                        yield build
+
+        return cls.from_builds(_builds())
+
+    @staticmethod
+    def _milestones(numpy, count, entry_builds, terminal, times):
+        created = numpy.full(count, MISSING, dtype=numpy.int64)
+        started = numpy.full(count, MISSING, dtype=numpy.int64)
+        finished = numpy.full(count, MISSING, dtype=numpy.int64)
+        if not len(times):
+            return created, started, finished
+
+        order = numpy.lexsort((times, entry_builds))
+        entry_builds = entry_builds[order]
+        terminal = terminal[order]
+        times = times[order]
+
+        # oldest entry of every build
+        first = numpy.flatnonzero(numpy.r_[True, entry_builds[1:] != entry_builds[:-1]])
+        created[entry_builds[first]] = times[first]
+
+        # oldest terminal entry of every build
+        terminal_builds = entry_builds[terminal]
+        terminal_times = times[terminal]
+        if len(terminal_times):
+            first_terminal = numpy.flatnonzero(
+                numpy.r_[True, terminal_builds[1:] != terminal_builds[:-1]]
+            )
+            finished[terminal_builds[first_terminal]] = terminal_times[first_terminal]
+
+        # second non-terminal entry preceding the terminal one
+        progress_builds = entry_builds[~terminal]
+        progress_times = times[~terminal]
+        if len(progress_times):
+            group_start = numpy.flatnonzero(
+                numpy.r_[True, progress_builds[1:] != progress_builds[:-1]]
+            )
+            second = group_start + 1
+            second = second[second < len(progress_builds)]
+            second = second[progress_builds[second] == progress_builds[second - 1]]
+            candidate_builds = progress_builds[second]
+            candidate_times = progress_times[second]
+            build_finished = finished[candidate_builds]
+            valid = (build_finished == MISSING) | (candidate_times < build_finished)
+            started[candidate_builds[valid]] = candidate_times[valid]
+        return created, started, finished
+
+    def _seconds(self, end, start):
+        numpy = _import_numpy()
+        valid = (end != MISSING) & (start != MISSING)
+        ret = numpy.full(len(end), numpy.nan)
+        ret[valid] = (end[valid] - start[valid]) / 1e6
+        return ret
+
+    def queue_seconds(self):
+        """Return float array of times builds waited for worker, NaN if unknown"""
+        return self._seconds(self.started, self.created)
+
+    def run_seconds(self):
+        """Return float array of times builds were processed, NaN if unknown"""
+        numpy = _import_numpy()
+        start = numpy.where(self.started != MISSING, self.started, self.created)
+        return self._seconds(self.finished, start)
+
+    def total_seconds(self):
+        """Return float array of times from creation to terminal state"""
+        return self._seconds(self.finished, self.created)
+
+    def percentiles(self, metric="queue", q=(50, 90, 99)):
+        """
+        Compute percentiles of build durations per request type
+
+        Args:
+            metric (str)
+                One of "queue", "run" or "total"
+            q (tuple)
+                Percentiles to compute
+
+        Returns:
+            dict of request type: {percentile: seconds}. Request types
+            without any known duration are omitted.
+        """
+        numpy = _import_numpy()
+        metrics = {
+            "queue": self.queue_seconds,
+            "run": self.run_seconds,
+            "total": self.total_seconds,
+        }
+        if metric not in metrics:
+            raise ValueError(
+                "Unknown metric: %s. Known metrics: %s"
+                % (metric, ", ".join(sorted(metrics)))
+            )
+        values = metrics[metric]()
+        valid = ~numpy.isnan(values)
+        ret = {}
+        for code, label in enumerate(self.request_type_labels):
+            selected = values[valid & (self.request_types == code)]
+            if len(selected):
+                ret[label] = dict(
+                    zip(q, (float(value) for value in numpy.percentile(selected, q)))
+                )
+        return ret
+
+    def throughput_per_hour(self):
+        """
+        Count builds reaching terminal state in every hour
+
+        Returns:
+            tuple of (hours, counts) arrays. Hours are numpy.datetime64 values
+            of hour starts in UTC, hours without finished build are omitted.
+        """
+        numpy = _import_numpy()
+        finished = self.finished[self.finished != MISSING]
+        hours, counts = numpy.unique(finished // _HOUR, return_counts=True)
+        return hours.astype("datetime64[h]"), counts
+
+    def failure_rates(self):
+        """
+        Return ratio of failed builds among finished builds per request type
+
+        Build is finished when it's in terminal state or its state history
+        contains terminal entry.
+
+        Returns:
+            dict of request type: failure rate
+        """
+        numpy = _import_numpy()
+        if "failed" not in self.state_labels:
+            failed = numpy.zeros(len(self), dtype=bool)
+        else:
+            failed = self.states == self.state_labels.index("failed")
+        # builds in terminal state are finished even without state history
+        terminal_codes = [
+            code
+            for code, label in enumerate(self.state_labels)
+            if label in _TERMINAL_STATES
+        ]
+        finished = (self.finished != MISSING) | numpy.isin(self.states, terminal_codes)
+        failed &= finished
+        finished_counts = numpy.bincount(
+            self.request_types[finished], minlength=len(self.request_type_labels)
+        )
+        failed_counts = numpy.bincount(
+            self.request_types[failed], minlength=len(self.request_type_labels)
+        )
+        return dict(
+            (label, float(failed_counts[code] / finished_counts[code]))
+            for code, label in enumerate(self.request_type_labels)
+            if finished_counts[code]
+        )
+
+    def failure_reasons(self):
+        """
+        Return histogram of state reasons of failed builds
+
+        Returns:
+            list of (state_reason, count) tuples ordered by count descending
+        """
+        numpy = _import_numpy()
+        if "failed" not in self.state_labels:
+            return []
+        failed = numpy.flatnonzero(self.states == self.state_labels.index("failed"))
+        reasons = numpy.array(self.state_reasons, dtype=object)[failed]
+        labels, counts = numpy.unique(reasons.astype(str), return_counts=True)
+        order = numpy.lexsort((labels, -counts))
+        return [(str(labels[i]), int(counts[i])) for i in order]
+
+    def report(self, q=(50, 90, 99)):
+        """
+        Return capacity report of builds
+
+        Args:
+            q (tuple)
+                Percentiles of durations to compute
+
+        Returns:
+            dict with "builds", "queue_percentiles", "run_percentiles",
+            "failure_rates", "failure_reasons" and "throughput_per_hour" keys
+        """
+        hours, counts = self.throughput_per_hour()
+        return {
+            "builds": len(self),
+            "queue_percentiles": self.percentiles("queue", q),
+            "run_percentiles": self.percentiles("run", q),
+            "failure_rates": self.failure_rates(),
+            "failure_reasons": self.failure_reasons(),
+            "throughput_per_hour": [
+                (str(hour), int(count)) for hour, count in zip(hours, counts)
+            ],
+        }
@@ -1,13 +1,4 @@
 import os
-import kerberos
-import subprocess
-import tempfile
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    retry_if_exception_type,
-    wait_exponential,
-)
 
 
 # pylint: disable=bad-option-value,useless-object-inheritance
@@ -63,12 +54,31 @@ class IIBKrbAuth(IIBAuth):
         self.ktfile = ktfile
         self.service = service
 
-    @retry(
-        retry=retry_if_exception_type(kerberos.KrbError),
-        wait=wait_exponential(multiplier=10, exp_base=5),
-        stop=stop_after_attempt(3),
-    )
     def _krb_auth_header(self):
+        # kerberos and tenacity are imported on first use, so they aren't
+        # loaded by users of other authentication methods
+        # pylint: disable=import-outside-toplevel
+        import kerberos
+        from tenacity import (
+            retry,
+            stop_after_attempt,
+            retry_if_exception_type,
+            wait_exponential,
+        )
+
+        retrying = retry(
+            retry=retry_if_exception_type(kerberos.KrbError),
+            wait=wait_exponential(multiplier=10, exp_base=5),
+            stop=stop_after_attempt(3),
+        )
+        return retrying(self._krb_auth_header_once)()
+
+    def _krb_auth_header_once(self):
+        # pylint: disable=import-outside-toplevel
+        import kerberos
+        import subprocess
+        import tempfile
+
         retcode = subprocess.Popen(
             ["klist"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
         ).wait()
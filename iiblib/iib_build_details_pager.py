@@ -1,49 +1,153 @@
+import time
+from collections import OrderedDict
+
 from .iib_build_details_model import IIBBuildDetailsModel
 
+# Default number of pages kept by pager for prev and next navigation
+PAGE_CACHE_SIZE = 16
+
+# Default number of seconds after which cached page is fetched again
+PAGE_CACHE_TTL = 30
+
+
+def _models(iibclient, items):
+    """Create models of items, through the client to report instrumentation"""
+    if iibclient is None:
+        return [IIBBuildDetailsModel.from_dict(x) for x in items]
+    # pylint: disable=protected-access
+    return [iibclient._model(IIBBuildDetailsModel, x) for x in items]
+
 
 class IIBBuildDetailsPager(object):
-    def __init__(self, iibclient, page):
+    def __init__(
+        self,
+        iibclient,
+        page,
+        stream=False,
+        cache_size=PAGE_CACHE_SIZE,
+        cache_ttl=PAGE_CACHE_TTL,
+        max_cached_builds=None,
+        clock=time.monotonic,
+    ):
         """
         Args:
             iibclient (IIBClient)
                 IIBClient instance
             page (int)
                 page where start listing items
+            stream (bool)
+                optional. Parse items incrementally from response stream.
+                Items of current page are fetched every time items() is
+                iterated and meta is filled when iteration is finished.
+            cache_size (int)
+                optional. Number of parsed pages kept to be reused by next
+                and prev, least recently used pages are dropped first.
+                0 disables the cache. Pages aren't cached in stream mode.
+            cache_ttl (float)
+                optional. Seconds after which cached page is fetched again,
+                as new builds shift contents of pages. None keeps pages
+                until they are dropped.
+            max_cached_builds (int)
+                optional. Maximal number of builds in cached pages, bounds
+                memory used by the cache independently of page size
+            clock (callable)
+                optional. Monotonic clock used to expire cached pages
         """
         self.page = page
         self.iibclient = iibclient
+        self.stream = stream
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.max_cached_builds = max_cached_builds
+        self.clock = clock
         self._items = []
         self.meta = {}
+        # page: (time of fetch, meta, items)
+        self._cache = OrderedDict()
+        self._cached_builds = 0
 
     def reload_page(self):
-        """Reload items for current page"""
+        """Reload items for current page, cached page is fetched again"""
+
+        if self.stream:
+            # items are fetched lazily by items()
+            self.meta = {}
+            return
 
         ret = self.iibclient.get_builds(self.page, raw=True)
         self.meta = ret["meta"]
-        self._items = [IIBBuildDetailsModel.from_dict(x) for x in ret["items"]]
+        self._items = _models(self.iibclient, ret["items"])
+        self._cache_page()
+
+    def _load_page(self):
+        """Set current page from cache or fetch it when it isn't cached"""
+        entry = self._cache.get(self.page)
+        if entry is not None:
+            if self.cache_ttl is None or self.clock() - entry[0] < self.cache_ttl:
+                self._cache.move_to_end(self.page)
+                _, self.meta, self._items = entry
+                return
+            self._drop_page(self.page)
+        self.reload_page()
+
+    def _drop_page(self, page):
+        _, _, items = self._cache.pop(page)
+        self._cached_builds -= len(items)
+
+    def _cache_page(self):
+        """Store current page to the cache"""
+        if self.stream or not self.cache_size:
+            return
+        total = self.meta.get("total")
+        if any(entry[1].get("total") != total for entry in self._cache.values()):
+            # builds were added, cached pages are shifted
+            self._cache.clear()
+            self._cached_builds = 0
+        if self.page in self._cache:
+            self._drop_page(self.page)
+        self._cache[self.page] = (self.clock(), self.meta, self._items)
+        self._cached_builds += len(self._items)
+        while len(self._cache) > self.cache_size or (
+            self.max_cached_builds is not None
+            and self._cached_builds > self.max_cached_builds
+        ):
+            self._drop_page(next(iter(self._cache)))
 
     def next(self):
-        """Load items for next page and set it as current"""
+        """Load items for next page and set it as current
+
+        Page is reused from the cache when it was loaded recently.
+        """
 
         self.page += 1
-        self.reload_page()
+        self._load_page()
 
     def prev(self):
-        """Load items for previous page and set it as current"""
+        """Load items for previous page and set it as current
+
+        Page is reused from the cache when it was loaded recently.
+        """
 
         if self.page > 1:
             self.page -= 1
-        self.reload_page()
+        self._load_page()
 
     def items(self):
-        """Return items for current page"""
+        """Return items for current page
+
+        Returns:
+            list of IIBBuildDetailsModel or generator of them in stream mode
+        """
+        if self.stream:
+            return self.iibclient.iter_builds(self.page, meta=self.meta)
         return self._items
 
     @classmethod
-    def from_dict(cls, iibclient, _dict):
-        ret = cls(iibclient, _dict["meta"]["page"])
+    def from_dict(cls, iibclient, _dict, **kwargs):
+        ret = cls(iibclient, _dict["meta"]["page"], **kwargs)
         ret.meta = _dict["meta"]
-        ret._items = [IIBBuildDetailsModel.from_dict(x) for x in _dict["items"]]
+        ret._items = _models(iibclient, _dict["items"])
+        ret._cache_page()
         return ret
 
     def __eq__(self, other):
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Request was rejected without being sent because circuit is open"""
+
+    pass
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class IIBCircuitBreaker(object):
+    """
+    Circuit breaker around IIB service
+
+    Outcomes of last requests are kept in sliding window. When ratio of
+    failed requests in the window reaches failure_rate, circuit opens and
+    requests fail fast with CircuitOpenError. After reset_timeout circuit
+    becomes half-open and lets through limited number of probe requests.
+    Successful probe closes the circuit, failed one opens it again.
+
+    Connection errors, timeouts and 5xx or 429 responses are failures.
+    Single instance can be shared by many sessions and threads.
+    """
+
+    def __init__(
+        self,
+        failure_rate=0.5,
+        window=20,
+        min_requests=10,
+        reset_timeout=30,
+        half_open_probes=1,
+        clock=time.monotonic,
+    ):
+        """
+        Args:
+            failure_rate (float)
+                Ratio of failed requests in window which opens the circuit
+            window (int)
+                Number of last requests used to compute failure rate
+            min_requests (int)
+                Minimal number of requests in window needed to open circuit
+            reset_timeout (int)
+                Number of seconds circuit stays open before probe requests
+                are let through
+            half_open_probes (int)
+                Maximal number of concurrent probe requests in half-open state
+            clock (callable)
+                optional. Monotonic clock returning seconds
+        """
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._window = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "failures": 0,
+            "rejected": 0,
+            "opened": 0,
+        }
+
+    @property
+    def state(self):
+        """Current state: "closed", "open" or "half_open" """
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() >= self._opened_at + (
+            self.reset_timeout
+        ):
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._counters["opened"] += 1
+
+    def before_request(self):
+        """
+        Check whether request can be sent
+
+        Raises:
+            CircuitOpenError when circuit is open or all probes of half-open
+            circuit are in progress
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return
+            self._counters["rejected"] += 1
+        raise CircuitOpenError("Circuit breaker of IIB service is open.")
+
+    def record(self, success):
+        """
+        Record outcome of sent request
+
+        Args:
+            success (bool)
+                False when request failed
+        """
+        with self._lock:
+            self._counters["requests"] += 1
+            if not success:
+                self._counters["failures"] += 1
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+                if success:
+                    self._state = CLOSED
+                    self._window.clear()
+                else:
+                    self._open()
+                return
+            self._window.append(success)
+            if state == CLOSED and len(self._window) >= self.min_requests:
+                failures = self._window.count(False)
+                if failures >= self.failure_rate * len(self._window):
+                    self._open()
+
+    @staticmethod
+    def is_failure(response):
+        """
+        Check if response means IIB service is failing
+
+        Args:
+            response (requests.Response)
+                Received response
+
+        Returns:
+            bool
+        """
+        return response.status_code >= 500 or response.status_code == 429
+
+    def metrics(self):
+        """
+        Return state of the circuit breaker as metrics
+
+        Returns:
+            dict with "state", "state_code" (0 closed, 1 half-open, 2 open),
+            "window_failure_rate" and total "requests", "failures",
+            "rejected" and "opened" counts
+        """
+        with self._lock:
+            state = self._current_state()
+            ret = dict(self._counters)
+            ret["state"] = state
+            ret["state_code"] = _STATE_CODES[state]
+            ret["window_failure_rate"] = (
+                float(self._window.count(False)) / len(self._window)
+                if self._window
+                else 0.0
+            )
+        return ret
@@ -0,0 +1,492 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .iib_circuit_breaker import CircuitOpenError
+from .iib_client import MAX_SUBMIT_WORKERS, IIBClient, IIBException
+
+_TERMINAL_STATES = ("complete", "failed")
+
+# Submit commands: (IIBClient method, required arguments, options)
+# Options are tuples of (flag, method argument, argparse keyword arguments)
+_OVERWRITE_OPTIONS = (
+    (
+        "--overwrite-from-index",
+        "overwrite_from_index",
+        {"action": "store_true", "default": None},
+    ),
+    ("--overwrite-from-index-token", "overwrite_from_index_token", {}),
+)
+_SUBMIT_COMMANDS = {
+    "add": (
+        "add_bundles",
+        ("index_image", "bundles", "arches"),
+        (
+            ("--index", "index_image", {}),
+            ("--bundle", "bundles", {"action": "append"}),
+            ("--arch", "arches", {"action": "append"}),
+            ("--binary-image", "binary_image", {}),
+            ("--build-tag", "build_tags", {"action": "append"}),
+            ("--cnr-token", "cnr_token", {}),
+            (
+                "--check-related-images",
+                "check_related_images",
+                {"action": "store_true", "default": None},
+            ),
+            ("--deprecation", "deprecation_list", {"action": "append"}),
+            ("--organization", "organization", {}),
+        )
+        + _OVERWRITE_OPTIONS,
+    ),
+    "rm": (
+        "remove_operators",
+        ("index_image", "operators", "arches"),
+        (
+            ("--index", "index_image", {}),
+            ("--operator", "operators", {"action": "append"}),
+            ("--arch", "arches", {"action": "append"}),
+            ("--binary-image", "binary_image", {}),
+            ("--build-tag", "build_tags", {"action": "append"}),
+        )
+        + _OVERWRITE_OPTIONS,
+    ),
+    "regenerate-bundle": (
+        "regenerate_bundle",
+        ("bundle_image",),
+        (
+            ("--bundle", "bundle_image", {}),
+            ("--organization", "organization", {}),
+        ),
+    ),
+    "create-empty-index": (
+        "create_empty_index",
+        ("index_image",),
+        (
+            ("--index", "index_image", {}),
+            ("--binary-image", "binary_image", {}),
+            ("--label", "labels", {"action": "append", "metavar": "KEY=VALUE"}),
+        ),
+    ),
+    "add-deprecations": (
+        "add_deprecations",
+        ("index_image", "operator_package", "deprecation_schema"),
+        (
+            ("--index", "index_image", {}),
+            ("--operator-package", "operator_package", {}),
+            ("--deprecation-schema", "deprecation_schema", {}),
+            ("--binary-image", "binary_image", {}),
+            ("--build-tag", "build_tags", {"action": "append"}),
+        )
+        + _OVERWRITE_OPTIONS,
+    ),
+}
+
+
+def _labels(values):
+    labels = {}
+    for value in values:
+        key, sep, label = value.partition("=")
+        if not sep:
+            raise ValueError("Label %s isn't in KEY=VALUE format." % value)
+        labels[key] = label
+    return labels
+
+
+def build_parser():
+    """Return argument parser of iib command
+
+    Returns:
+        argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        prog="iib",
+        description="Submit and watch IIB builds. Builds are printed to "
+        "standard output as JSON lines.",
+    )
+    parser.add_argument(
+        "--hostname",
+        default=os.environ.get("IIB_HOSTNAME"),
+        help="IIB service hostname (default: $IIB_HOSTNAME)",
+    )
+    parser.add_argument(
+        "--krb-principal",
+        default=os.environ.get("IIB_KRB_PRINCIPAL"),
+        help="Authenticate by Kerberos as given principal "
+        "(default: $IIB_KRB_PRINCIPAL)",
+    )
+    parser.add_argument(
+        "--krb-keytab",
+        default=os.environ.get("IIB_KRB_KEYTAB"),
+        help="Kerberos keytab file (default: $IIB_KRB_KEYTAB)",
+    )
+    parser.add_argument(
+        "--user",
+        default=os.environ.get("IIB_USER"),
+        help="Authenticate by basic auth as given user, password is read "
+        "from $IIB_PASSWORD (default: $IIB_USER)",
+    )
+    parser.add_argument(
+        "--insecure", action="store_true", help="Don't verify SSL certificates"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=30,
+        help="Seconds between polls of unfinished builds (default: 30)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=7200,
+        help="Seconds to wait for builds to finish (default: 7200)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Send requests through running IIBDaemon",
+    )
+    parser.add_argument("--daemon-socket", help="Path of IIBDaemon socket")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    subparsers.required = True
+
+    for command, (method, required, options) in sorted(_SUBMIT_COMMANDS.items()):
+        sub = subparsers.add_parser(
+            command,
+            help="Submit %s request" % command,
+            description="Submit %s request. Required options: %s"
+            % (command, ", ".join(opt[0] for opt in options if opt[1] in required)),
+        )
+        for flag, dest, kwargs in options:
+            sub.add_argument(flag, dest=dest, **kwargs)
+        sub.add_argument(
+            "--from-file",
+            metavar="FILE",
+            help="Submit requests read from JSON lines file ('-' for standard "
+            "input). Every line is object of %s arguments, options given on "
+            "command line are used as defaults." % method,
+        )
+        sub.add_argument(
+            "--max-workers",
+            type=int,
+            default=MAX_SUBMIT_WORKERS,
+            help="Maximal number of concurrently submitted requests "
+            "(default: %d)" % MAX_SUBMIT_WORKERS,
+        )
+        _add_wait_arguments(sub)
+        sub.set_defaults(
+            handler=_submit,
+            method=method,
+            required=required,
+            arguments=[opt[1] for opt in options],
+        )
+
+    sub = subparsers.add_parser("get", help="Print builds")
+    sub.add_argument("ids", nargs="+", type=int, metavar="ID")
+    sub.set_defaults(handler=_get)
+
+    sub = subparsers.add_parser("list", help="Print historical builds")
+    sub.add_argument("--page", type=int, default=1, help="First listed page")
+    sub.add_argument(
+        "--all", action="store_true", help="List all pages starting with --page"
+    )
+    sub.set_defaults(handler=_list)
+
+    sub = subparsers.add_parser(
+        "wait",
+        help="Wait until builds are finished",
+        description="Wait until builds are finished. Exits with 1 when any "
+        "build failed.",
+    )
+    sub.add_argument(
+        "ids",
+        nargs="+",
+        metavar="ID",
+        help="Build id, '-' reads ids or JSON lines of builds from standard input",
+    )
+    sub.add_argument(
+        "--watch",
+        action="store_true",
+        help="Print build every time its state changes",
+    )
+    sub.set_defaults(handler=_wait)
+    return parser
+
+
+def _add_wait_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--wait",
+        action="store_true",
+        help="Wait until builds are finished and print finished builds",
+    )
+    group.add_argument(
+        "--watch",
+        action="store_true",
+        help="Wait until builds are finished and print build every time its "
+        "state changes",
+    )
+
+
+def _client(args):
+    if args.daemon:
+        # pylint: disable=import-outside-toplevel
+        from .iib_daemon import IIBDaemonClient
+
+        return IIBDaemonClient(args.hostname, socket_path=args.daemon_socket)
+    auth = None
+    if args.krb_principal:
+        # pylint: disable=import-outside-toplevel
+        from .iib_authentication import IIBKrbAuth
+
+        auth = IIBKrbAuth(args.krb_principal, args.hostname, ktfile=args.krb_keytab)
+    elif args.user:
+        # pylint: disable=import-outside-toplevel
+        from .iib_authentication import IIBBasicAuth
+
+        auth = IIBBasicAuth(args.user, os.environ.get("IIB_PASSWORD", ""))
+    return IIBClient(
+        args.hostname,
+        auth=auth,
+        ssl_verify=not args.insecure,
+        poll_interval=args.poll_interval,
+        wait_for_build_timeout=args.timeout,
+    )
+
+
+def _emit(out, record):
+    out.write(json.dumps(record, sort_keys=True) + "\n")
+    out.flush()
+
+
+def _error(exc):
+    return {"type": type(exc).__name__, "message": str(exc)}
+
+
+def _read_lines(path):
+    if path == "-":
+        return sys.stdin.readlines()
+    with open(path) as fobj:
+        return fobj.readlines()
+
+
+def _requests(args):
+    """Return list of (line number, keyword arguments) of submitted requests
+
+    Raises:
+        ValueError when any request is invalid, nothing is submitted then
+    """
+    defaults = {}
+    for name in args.arguments:
+        value = getattr(args, name)
+        if value is not None:
+            defaults[name] = value
+    if "labels" in defaults:
+        defaults["labels"] = _labels(defaults["labels"])
+
+    if not args.from_file:
+        lines = [(None, defaults)]
+    else:
+        lines = []
+        for number, line in enumerate(_read_lines(args.from_file), 1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as exc:
+                raise ValueError("Line %d isn't valid JSON: %s" % (number, exc))
+            if not isinstance(request, dict):
+                raise ValueError("Line %d isn't JSON object." % number)
+            kwargs = dict(defaults)
+            kwargs.update(request)
+            lines.append((number, kwargs))
+
+    for number, kwargs in lines:
+        where = "" if number is None else "Line %d: " % number
+        unknown = sorted(set(kwargs) - set(args.arguments))
+        if unknown:
+            raise ValueError("%sunknown arguments %s" % (where, ", ".join(unknown)))
+        missing = [name for name in args.required if not kwargs.get(name)]
+        if missing:
+            raise ValueError("%smissing arguments %s" % (where, ", ".join(missing)))
+    return lines
+
+
+def watch_builds(client, bids, emit, poll_interval, timeout, changes=False):
+    """Poll builds by single loop until all of them are finished
+
+    Args:
+        client (IIBClient or IIBDaemonClient)
+            Client used to fetch builds
+        bids (list)
+            Ids of watched builds
+        emit (callable)
+            Called with raw build when it's finished or, when changes is
+            set, every time its state changes
+        poll_interval (float)
+            Seconds between polls of unfinished builds
+        timeout (float)
+            Seconds to wait for builds to finish
+        changes (bool)
+            optional. Emit builds on every state change
+
+    Raises:
+        IIBException when timeout was reached
+
+    Returns:
+        dict of build id: final state
+    """
+    deadline = time.time() + timeout
+    states = {}
+    pending = list(dict.fromkeys(bids))
+    while True:
+        still_pending = []
+        for bid in pending:
+            try:
+                build = client.get_build(bid, raw=True)
+            except CircuitOpenError:
+                still_pending.append(bid)
+                continue
+            if changes and states.get(bid) != build["state"]:
+                emit(build)
+            elif not changes and build["state"] in _TERMINAL_STATES:
+                emit(build)
+            states[bid] = build["state"]
+            if build["state"] not in _TERMINAL_STATES:
+                still_pending.append(bid)
+        pending = still_pending
+        if not pending:
+            return states
+        if time.time() >= deadline:
+            raise IIBException(
+                "Timeout reached. Build requests %s were not processed in %d seconds."
+                % (", ".join(str(bid) for bid in pending), timeout)
+            )
+        time.sleep(poll_interval)
+
+
+def _watch(args, client, bids, out):
+    states = watch_builds(
+        client,
+        bids,
+        lambda build: _emit(out, build),
+        args.poll_interval,
+        args.timeout,
+        changes=args.watch,
+    )
+    return 1 if "failed" in states.values() else 0
+
+
+def _submit(args, client, out):
+    lines = _requests(args)
+    method = getattr(client, args.method)
+
+    def _call(line):
+        try:
+            return method(raw=True, **line[1]), None
+        except Exception as exc:  # pylint: disable=broad-except
+            return None, exc
+
+    workers = max(1, min(len(lines), args.max_workers))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_call, lines))
+
+    if not args.from_file and results[0][1] is not None:
+        raise results[0][1]
+    bids = []
+    ret = 0
+    for (number, _), (build, exc) in zip(lines, results):
+        if exc is not None:
+            _emit(out, {"line": number, "error": _error(exc)})
+            ret = 1
+            continue
+        bids.append(build["id"])
+        if not (args.wait or args.watch):
+            # builds are printed by watch_builds otherwise
+            _emit(out, build if number is None else dict(build, line=number))
+    if bids and (args.wait or args.watch):
+        ret = max(ret, _watch(args, client, bids, out))
+    return ret
+
+
+def _get(args, client, out):
+    ret = 0
+    for bid in args.ids:
+        try:
+            _emit(out, client.get_build(bid, raw=True))
+        except (IIBException, requests.exceptions.RequestException) as exc:
+            _emit(out, {"id": bid, "error": _error(exc)})
+            ret = 1
+    return ret
+
+
+def _list(args, client, out):
+    page = args.page
+    while True:
+        data = client.get_builds(page, raw=True)
+        for build in data["items"]:
+            _emit(out, build)
+        if not args.all or not data["items"]:
+            return 0
+        if page >= data["meta"].get("pages", page):
+            return 0
+        page += 1
+
+
+def _build_ids(values):
+    bids = []
+    for value in values:
+        if value != "-":
+            bids.append(int(value))
+            continue
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                if "id" in record:
+                    bids.append(int(record["id"]))
+            else:
+                bids.append(int(record))
+    return bids
+
+
+def _wait(args, client, out):
+    return _watch(args, client, _build_ids(args.ids), out)
+
+
+def main(argv=None, out=None):
+    """Run iib command
+
+    Args:
+        argv (list)
+            optional. Command line arguments, sys.argv is used by default
+        out (file)
+            optional. Output of JSON lines, standard output by default
+
+    Returns:
+        int exit code, 1 when any request failed or any build failed
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.hostname:
+        parser.error("--hostname or $IIB_HOSTNAME is required")
+    out = out or sys.stdout
+    client = None
+    try:
+        client = _client(args)
+        return args.handler(args, client, out)
+    except (IIBException, ValueError, requests.exceptions.RequestException) as exc:
+        sys.stderr.write("iib: error: %s\n" % exc)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        close = getattr(client, "close", None)
+        if close is not None:
+            close()
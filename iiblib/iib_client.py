@@ -1,4 +1,11 @@
+import copy
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+
+import requests
 
 from .iib_build_details_pager import IIBBuildDetailsPager
 from .iib_build_details_model import (
@@ -8,9 +15,30 @@ from .iib_build_details_model import (
     RegenerateBundleModel,
     CreateEmptyIndexModel,
     AddDeprecationsModel,
+    MergeIndexImageModel,
+    FBCOperationsModel,
+    RecursiveRelatedBundlesModel,
 )
+from .iib_compact_model import CompactBuildDetails
 from .iib_authentication import IIBAuth
-from .iib_session import IIBSession
+from .iib_circuit_breaker import CircuitOpenError
+from .iib_retry import RETRY_AFTER_STATUSES, request_was_sent
+from .iib_session import IIBSession, normalize_endpoint
+from .iib_json import get_decoder, iter_json_object
+from .iib_instrumentation import CompositeInstrumentation
+from .iib_timestamps import build_times
+
+# Size of chunks read from streamed responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Default maximal number of concurrently submitted requests
+MAX_SUBMIT_WORKERS = 8
+
+# Number of finished builds kept to be served while circuit breaker is open
+FINISHED_BUILDS_CACHE_SIZE = 1024
+
+# Default number of polled builds kept to answer 304 Not Modified responses
+CONDITIONAL_CACHE_SIZE = 1024
 
 
 class IIBException(Exception):
@@ -19,6 +47,62 @@ class IIBException(Exception):
     pass
 
 
+class IIBBatchSubmitError(IIBException):
+    """
+    Some requests of a batch failed to be submitted
+
+    Args:
+        builds (list)
+            Submitted builds in order of the requests, None for requests
+            which failed
+        errors (dict)
+            Index of failed request: exception raised by its submission
+    """
+
+    def __init__(self, builds, errors):
+        super(IIBBatchSubmitError, self).__init__(
+            "Failed to submit %d of %d requests: %s"
+            % (
+                len(errors),
+                len(builds),
+                "; ".join(
+                    "%d: %s" % (index, errors[index]) for index in sorted(errors)
+                ),
+            )
+        )
+        self.builds = builds
+        self.errors = errors
+
+    @property
+    def submitted(self):
+        """List of builds which were submitted"""
+        return [build for build in self.builds if build is not None]
+
+
+class IIBBatchGetError(IIBException):
+    """
+    Some builds of a batch failed to be fetched
+
+    Args:
+        builds (dict)
+            Build id: build for builds which were fetched
+        errors (dict)
+            Build id: exception raised by fetching the build
+    """
+
+    def __init__(self, builds, errors):
+        super(IIBBatchGetError, self).__init__(
+            "Failed to get %d of %d builds: %s"
+            % (
+                len(errors),
+                len(builds) + len(errors),
+                "; ".join("%s: %s" % (bid, errors[bid]) for bid in sorted(errors)),
+            )
+        )
+        self.builds = builds
+        self.errors = errors
+
+
 # pylint: disable=bad-option-value,useless-object-inheritance
 class IIBClient(object):
     """IIB requests wrapper"""
@@ -32,6 +116,14 @@ class IIBClient(object):
         ssl_verify=True,
         backoff_factor=2,
         wait_for_build_timeout=7200,
+        json_decoder=None,
+        result_cache=None,
+        rate_limiter=None,
+        retry_policy=None,
+        circuit_breaker=None,
+        instrumentation=None,
+        profile=False,
+        conditional_cache_size=CONDITIONAL_CACHE_SIZE,
     ):
         """
         Args:
@@ -49,40 +141,192 @@ class IIBClient(object):
                 backoff factor to apply between attempts after the second try
             wait_for_build_timeout (int)
                 maximum time which we should wait for build to be completed
+            json_decoder (str or callable)
+                optional. Name of JSON decoder ("orjson", "ujson" or "json") or
+                callable decoding response body. Fastest installed decoder
+                is used by default.
+            result_cache (IIBResultCache)
+                optional. Store of finished build results. Finished builds
+                fetched by get_build are stored in it and requests with
+                cached result are not submitted again.
+            rate_limiter (IIBRateLimiter)
+                optional. Rate limiter throttling requests and holding back
+                submissions while too many of submitted builds are not
+                finished.
+            retry_policy (IIBRetryPolicy)
+                optional. Retry policy of requests, created from retries and
+                backoff_factor by default.
+            circuit_breaker (IIBCircuitBreaker)
+                optional. Circuit breaker rejecting requests while IIB
+                service is failing. While it's open, get_build returns
+                previously fetched finished builds and wait_for_build(s)
+                skip polls instead of failing.
+            instrumentation (IIBInstrumentation)
+                optional. Hooks called with durations of requests, decoding,
+                model creation and with every poll of a build.
+            profile (bool or str)
+                optional. Record timeline of requests, authentication,
+                retries, sleeps and model parsing to IIBProfiler available
+                as profiler attribute. When path is given, the trace is
+                written there in Chrome trace event format by close.
+            conditional_cache_size (int)
+                optional. Number of builds fetched by get_build kept with
+                their ETag and Last-Modified validators. Builds are then
+                fetched by conditional requests and unchanged build is
+                served from the cache on 304 Not Modified response without
+                downloading and parsing it again. 0 disables conditional
+                requests.
         """
+        self.profiler = None
+        if profile:
+            # pylint: disable=import-outside-toplevel
+            from .iib_profile import IIBProfiler
+
+            self.profiler = IIBProfiler()
+            if instrumentation is None:
+                instrumentation = self.profiler
+            else:
+                instrumentation = CompositeInstrumentation(
+                    instrumentation, self.profiler
+                )
+        self.profile_path = profile if isinstance(profile, str) else None
         self.iib_session = IIBSession(
-            hostname, retries=retries, verify=ssl_verify, backoff_factor=backoff_factor
+            hostname,
+            retries=retries,
+            verify=ssl_verify,
+            backoff_factor=backoff_factor,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            instrumentation=instrumentation,
+            max_validators=conditional_cache_size,
         )
+        self.instrumentation = instrumentation
+        self.retry_policy = self.iib_session.retry_policy
+        self.circuit_breaker = circuit_breaker
+        # finished builds served while circuit breaker is open
+        self._finished_builds = OrderedDict()
+        self._finished_builds_lock = threading.Lock()
+        # user of builds submitted by the client
+        self._submitter = None
+        # build id: [data, model] of last build fetched by get_build
+        self._polled_builds = OrderedDict()
+        self._polled_builds_lock = threading.Lock()
+        self.conditional_cache_size = conditional_cache_size
+        self.rate_limiter = rate_limiter
         self.wait_for_build_timeout = wait_for_build_timeout
         self.poll_interval = poll_interval
+        self.json_loads = get_decoder(json_decoder)
+        self.result_cache = result_cache
+        # shared poller of build futures, started on first use
+        self._build_poller = None
+        self._build_poller_lock = threading.Lock()
         if auth:
+            if instrumentation is not None:
+                start = time.perf_counter()
             auth.make_auth(self.iib_session)
+            if instrumentation is not None:
+                instrumentation.auth(time.perf_counter() - start)
+
+    def close(self):
+        """Close connections of the client and write profile trace
+
+        Trace is written only when client was created with profile path.
+        Unfinished build futures fail with IIBException.
+        """
+        if self._build_poller is not None:
+            self._build_poller.stop()
+        if self.profiler is not None and self.profile_path:
+            self.profiler.write(self.profile_path)
+        self.iib_session.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     @staticmethod
-    def _check_response(response):
+    def _check_response(response, data=None):
         """
         Checks response for status and raises IIBException in case of error
 
         Args:
             response (requests.Response) response which will be checked for status
+            data (dict) optional. Already decoded response body
 
         Raises:
             IIBException when any error occurs
         """
         if response.status_code >= 400:
-            try:
-                resp_error = response.json().get("error")
+            if data is None:
+                try:
+                    data = response.json()
+                except ValueError:
+                    pass
+
+            if isinstance(data, dict):
+                resp_error = data.get("error")
                 if resp_error:
                     # raise exception only if error is specified
                     raise IIBException(resp_error)
 
-            except ValueError:
-                pass
-
             # check status in case no error is specified or response
             # does not contain valid json
             response.raise_for_status()
 
+    def _response_json(self, response):
+        """
+        Decode response body and check response for status
+
+        Response body is decoded only once with configured JSON decoder and
+        decoded data are used both for error checking and as return value.
+
+        Args:
+            response (requests.Response) response which will be decoded
+
+        Raises:
+            IIBException when any error occurs
+
+        Returns:
+            decoded response body
+        """
+        if self.instrumentation is not None:
+            start = time.perf_counter()
+        try:
+            data = self.json_loads(response.content)
+        except ValueError:
+            if response.status_code < 400:
+                raise
+            # body is not valid json, don't try to decode it again
+            data = False
+        self._check_response(response, data)
+        if self.instrumentation is not None:
+            self.instrumentation.decode(
+                time.perf_counter() - start, len(response.content)
+            )
+        return data
+
+    def _model(self, model, data):
+        """
+        Create model instance from decoded data
+
+        Args:
+            model (class)
+                Model class, e.g. AddModel or IIBBuildDetailsModel
+            data (dict)
+                Decoded build data
+
+        Returns:
+            model instance
+        """
+        if self.instrumentation is None:
+            return model.from_dict(data)
+        start = time.perf_counter()
+        ret = model.from_dict(data)
+        self.instrumentation.model(data["request_type"], time.perf_counter() - start)
+        return ret
+
     def add_bundles(
         self,
         index_image,
@@ -97,6 +341,7 @@ class IIBClient(object):
         overwrite_from_index=False,
         overwrite_from_index_token=None,
         raw=False,
+        future=False,
     ):
         """Rebuild index image with new bundles to be added.
 
@@ -130,6 +375,9 @@ class IIBClient(object):
                 this is provided, overwrite_from_index must be set to True.
             raw (bool)
                 Return raw json response instead of model instance
+            future (bool)
+                Return BuildFuture resolved with finished build instead
+                of model instance
 
         Returns:
             IIBBuildDetailsModel or dict
@@ -179,12 +427,13 @@ class IIBClient(object):
         if deprecation_list:
             post_data["deprecation_list"] = deprecation_list
 
-        resp = self.iib_session.post("builds/add", json=post_data)
-        self._check_response(resp)
+        data = self._post_build("builds/add", post_data)
 
+        if future:
+            return self.build_future(self._model(AddModel, data))
         if raw:
-            return resp.json()
-        return AddModel.from_dict(resp.json())
+            return data
+        return self._model(AddModel, data)
 
     def remove_operators(
         self,
@@ -196,6 +445,7 @@ class IIBClient(object):
         overwrite_from_index=False,
         overwrite_from_index_token=None,
         raw=False,
+        future=False,
     ):
         """Rebuild index image with existing operators to be removed.
 
@@ -220,6 +470,9 @@ class IIBClient(object):
                 this is provided, overwrite_from_index must be set to True.
             raw (bool)
                 Return raw json response instead of model instance
+            future (bool)
+                Return BuildFuture resolved with finished build instead
+                of model instance
 
         Returns:
             IIBBuildDetailsModel or dict
@@ -253,14 +506,15 @@ class IIBClient(object):
                 "overwrite-from-index-token should be specified."
             )
 
-        resp = self.iib_session.post("builds/rm", json=post_data)
-        self._check_response(resp)
+        data = self._post_build("builds/rm", post_data)
 
+        if future:
+            return self.build_future(self._model(RmModel, data))
         if raw:
-            return resp.json()
-        return RmModel.from_dict(resp.json())
+            return data
+        return self._model(RmModel, data)
 
-    def get_builds(self, page=1, raw=False):
+    def get_builds(self, page=1, raw=False, stream=False):
         """Get all historical builds of index image.
 
         Args:
@@ -268,19 +522,163 @@ class IIBClient(object):
                 Offset page to start listing results
             raw (bool)
                 Return raw json response instead of model instance
+            stream (bool)
+                optional. Parse items of the page incrementally from response
+                stream instead of decoding whole page at once. See iter_builds.
 
         Returns:
             IIBBuildDetailsPager or dict
               if raw == True return dict with json response otherwise
               return IIBBuildDetailsPager instance.
+              if stream == True return generator of raw items or
+              streaming IIBBuildDetailsPager instance.
         """
 
+        if stream:
+            if raw:
+                return self.iter_builds(page, raw=True)
+            return IIBBuildDetailsPager(self, page, stream=True)
+
         resp = self.iib_session.get("builds", params={"page": page})
-        self._check_response(resp)
+        data = self._response_json(resp)
 
         if raw:
-            return resp.json()
-        return IIBBuildDetailsPager.from_dict(self, resp.json())
+            return data
+        return IIBBuildDetailsPager.from_dict(self, data)
+
+    def iter_builds(self, page=1, raw=False, meta=None, compact=False):
+        """Iterate over builds of given page parsed incrementally from response stream
+
+        Only single item of the page is held in memory at once.
+
+        Args:
+            page (int)
+                Page to list builds from
+            raw (bool)
+                Yield raw json items instead of model instances
+            meta (dict)
+                optional. Dictionary updated with page meta data once
+                they are parsed. IIB sends meta data after items, so the
+                dictionary is complete when iteration is finished.
+            compact (bool)
+                optional. Yield memory compact CompactBuildDetails instances
+                instead of model instances
+
+        Yields:
+            IIBBuildDetailsModel, CompactBuildDetails or dict
+        """
+
+        model = CompactBuildDetails if compact else IIBBuildDetailsModel
+        resp = self.iib_session.get("builds", params={"page": page}, stream=True)
+        consumed = [0]
+
+        def chunks():
+            for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                consumed[0] += len(chunk)
+                yield chunk
+
+        with closing(resp):
+            try:
+                if resp.status_code >= 400:
+                    consumed[0] = len(resp.content)
+                    self._response_json(resp)
+
+                for key, value in iter_json_object(chunks(), "items"):
+                    if key == "items":
+                        yield value if raw else self._model(model, value)
+                    elif key == "meta" and meta is not None:
+                        meta.update(value)
+            finally:
+                self.iib_session.report_transfer("builds", resp, consumed[0])
+
+    def iter_all_builds(self, page=1, raw=False, compact=False):
+        """Iterate over builds of all pages starting with given page
+
+        Pages are parsed incrementally from response stream, see iter_builds.
+
+        Args:
+            page (int)
+                Offset page to start listing results
+            raw (bool)
+                Yield raw json items instead of model instances
+            compact (bool)
+                optional. Yield memory compact CompactBuildDetails instances
+                instead of model instances
+
+        Yields:
+            IIBBuildDetailsModel, CompactBuildDetails or dict
+        """
+
+        while True:
+            meta = {}
+            empty = True
+            for build in self.iter_builds(page, raw=raw, meta=meta, compact=compact):
+                empty = False
+                yield build
+            if empty or page >= meta.get("pages", page):
+                return
+            page += 1
+
+    def export_builds(self, destination, fmt=None, page=1, batch_size=10000):
+        """Export builds of all pages starting with given page to columnar table
+
+        Builds are streamed from IIB and written in batches, so memory usage
+        doesn't depend on number of exported builds. See iib_export.export_builds
+        for list of columns.
+
+        Args:
+            destination (str or file)
+                Path or file object of the created table
+            fmt (str)
+                optional. One of "csv", "parquet" or "arrow". Derived from
+                destination path when not specified.
+            page (int)
+                optional. Offset page to start exporting
+            batch_size (int)
+                optional. Number of rows written at once
+
+        Returns:
+            int number of exported builds
+        """
+        # pylint: disable=import-outside-toplevel
+        from .iib_export import export_builds
+
+        return export_builds(
+            self.iter_all_builds(page, raw=True),
+            destination,
+            fmt=fmt,
+            batch_size=batch_size,
+        )
+
+    def load_result_cache(self, page=1, max_pages=None):
+        """Store finished builds from builds history to result_cache
+
+        Args:
+            page (int)
+                optional. Offset page to start loading builds
+            max_pages (int)
+                optional. Maximal number of loaded pages, all pages are
+                loaded when not specified
+
+        Raises:
+            ValueError when result_cache is not set
+
+        Returns:
+            int number of newly stored builds
+        """
+
+        if self.result_cache is None:
+            raise ValueError("Result cache is not set.")
+        stored = 0
+        last_page = page + max_pages - 1 if max_pages else None
+        while True:
+            meta = {}
+            stored += self.result_cache.store_many(
+                self.iter_builds(page, raw=True, meta=meta)
+            )
+            if page >= meta.get("pages", page) or page == last_page:
+                return stored
+            page += 1
 
     def get_build(self, bid, raw=False):
         """Get specific index image build
@@ -291,18 +689,238 @@ class IIBClient(object):
             raw (bool)
                 Return raw json response instead of model instance
 
+        When the build was fetched before, it's requested conditionally and
+        build unchanged since then is returned from cache. Model of cached
+        build is shared by all callers, so it shouldn't be modified, raw
+        json is returned as a copy.
+
+        Raises:
+            CircuitOpenError when circuit breaker is open and the build
+            wasn't fetched finished before
+
         Returns:
             `IIBBuildDetailsModel` or dict
               if raw == True return dict with json response otherwise
               return `IIBBuildDetailsModel` instance.
         """
 
-        resp = self.iib_session.get("builds/%s" % bid)
-        self._check_response(resp)
+        endpoint = "builds/%s" % bid
+        cached = None
+        try:
+            resp = self.iib_session.get(
+                endpoint, conditional=bool(self.conditional_cache_size)
+            )
+            if resp.status_code == 304:
+                cached = self._polled_build(bid)
+                if cached is None:
+                    resp = self.iib_session.get(endpoint)
+        except CircuitOpenError:
+            with self._finished_builds_lock:
+                data = self._finished_builds.get(bid)
+            if data is None:
+                raise
+        else:
+            if cached is not None:
+                data = cached[0]
+            else:
+                data = self._response_json(resp)
+                cached = self._store_polled_build(bid, data)
+        self.track_build(data)
 
         if raw:
-            return resp.json()
-        return IIBBuildDetailsModel.from_dict(resp.json())
+            return copy.deepcopy(data)
+        if cached is None:
+            return self._model(IIBBuildDetailsModel, data)
+        if cached[1] is None:
+            cached[1] = self._model(IIBBuildDetailsModel, data)
+        return cached[1]
+
+    def get_builds_by_ids(self, ids, raw=False, max_workers=None):
+        """Get many builds by their ids
+
+        Ids are deduplicated. Finished builds fetched before by the client
+        are returned without requests, as they don't change anymore, other
+        builds are fetched concurrently by get_build.
+
+        Args:
+            ids (iterable)
+                Build ids of requested builds
+            raw (bool)
+                Return raw json responses instead of model instances
+            max_workers (int)
+                optional. Maximal number of concurrent requests, defaults
+                to MAX_SUBMIT_WORKERS
+
+        Raises:
+            IIBBatchGetError when any of the builds failed to be fetched,
+            it carries builds which were fetched
+
+        Returns:
+            dict of build id: `IIBBuildDetailsModel` or dict, in order of
+            the ids
+        """
+        builds = OrderedDict((bid, None) for bid in ids)
+        missing = []
+        for bid in builds:
+            cached = self._finished_build(bid)
+            if cached is None:
+                missing.append(bid)
+            elif raw:
+                builds[bid] = copy.deepcopy(cached[0])
+            else:
+                if cached[1] is None:
+                    cached[1] = self._model(IIBBuildDetailsModel, cached[0])
+                builds[bid] = cached[1]
+
+        errors = {}
+        if missing:
+            workers = min(len(missing), max_workers or MAX_SUBMIT_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = dict(
+                    (pool.submit(self.get_build, bid, raw=raw), bid) for bid in missing
+                )
+                for future in as_completed(futures):
+                    bid = futures[future]
+                    try:
+                        builds[bid] = future.result()
+                    except Exception as exc:  # pylint: disable=broad-except
+                        errors[bid] = exc
+                        del builds[bid]
+        if errors:
+            raise IIBBatchGetError(dict(builds), errors)
+        return dict(builds)
+
+    def _finished_build(self, bid):
+        """Return [data, model] of finished build fetched before or None"""
+        cached = self._polled_build(bid)
+        if cached is not None and cached[0]["state"] in ("complete", "failed"):
+            return cached
+        with self._finished_builds_lock:
+            data = self._finished_builds.get(bid)
+        if data is not None:
+            return [data, None]
+        return None
+
+    def _polled_build(self, bid):
+        """Return [data, model] of build cached by get_build or None"""
+        with self._polled_builds_lock:
+            cached = self._polled_builds.get(bid)
+            if cached is not None:
+                self._polled_builds.move_to_end(bid)
+            return cached
+
+    def _store_polled_build(self, bid, data):
+        """Cache data of build fetched by get_build and return its entry"""
+        if not self.conditional_cache_size:
+            return None
+        cached = [data, None]
+        with self._polled_builds_lock:
+            self._polled_builds[bid] = cached
+            self._polled_builds.move_to_end(bid)
+            while len(self._polled_builds) > self.conditional_cache_size:
+                self._polled_builds.popitem(last=False)
+        return cached
+
+    def track_build(self, data):
+        """Record fetched or received state of a build
+
+        Finished builds are stored to result cache and kept to be served
+        while circuit breaker is open, rate limiter stops tracking them.
+
+        Args:
+            data (dict)
+                Raw json data of a build
+        """
+        bid = data["id"]
+        if self.circuit_breaker is not None and data["state"] in (
+            "complete",
+            "failed",
+        ):
+            with self._finished_builds_lock:
+                self._finished_builds[bid] = data
+                self._finished_builds.move_to_end(bid)
+                if len(self._finished_builds) > FINISHED_BUILDS_CACHE_SIZE:
+                    self._finished_builds.popitem(last=False)
+        if self.result_cache is not None:
+            self.result_cache.store(data)
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(data)
+
+    def sleep(self, seconds, reason="poll", sleep=None):
+        """Sleep and report the sleep to instrumentation
+
+        Args:
+            seconds (float)
+                Number of seconds to sleep
+            reason (str)
+                optional. Reason of the sleep reported to instrumentation,
+                e.g. "poll" or "retry"
+            sleep (callable)
+                optional. Function sleeping given number of seconds,
+                time.sleep by default
+        """
+        sleep = sleep or time.sleep
+        if self.instrumentation is None:
+            sleep(seconds)
+            return
+        start = time.perf_counter()
+        sleep(seconds)
+        self.instrumentation.sleep(time.perf_counter() - start, reason)
+
+    def poll_build(self, bid):
+        """Fetch build in poll loops
+
+        Unlike get_build, poll is reported to instrumentation and open
+        circuit breaker doesn't raise, so poll loops can skip the turn.
+
+        Args:
+            bid (int)
+                Build id of polled build
+
+        Returns:
+            `IIBBuildDetailsModel` or None when circuit breaker is open
+        """
+        try:
+            build = self.get_build(bid)
+        except CircuitOpenError:
+            build = None
+        if self.instrumentation is not None:
+            self._instrument_poll(bid, build)
+        return build
+
+    def _instrument_poll(self, bid, build):
+        """Report poll of a build to instrumentation"""
+        self.instrumentation.poll(bid, build.state if build else None)
+        if build is not None and build.state in ("complete", "failed"):
+            created, _, finished = build_times(build.state_history)
+            seconds = None
+            if created is not None and finished is not None:
+                seconds = (finished - created) / 1e6
+            self.instrumentation.finished(bid, build.request_type, build.state, seconds)
+
+    def build_future(self, build):
+        """Return future resolved once the build is finished
+
+        All futures of the client are resolved by single background thread
+        polling unfinished builds once per poll_interval.
+
+        Args:
+            build (IIBBuildDetailsModel)
+                Instance of `IIBBuildDetailsModel` class
+
+        Returns:
+            BuildFuture resolved with finished `IIBBuildDetailsModel`
+            instance or with IIBException when timeout was reached
+        """
+        # pylint: disable=import-outside-toplevel
+        from .iib_futures import BuildFuture, BuildPoller
+
+        with self._build_poller_lock:
+            if self._build_poller is None:
+                self._build_poller = BuildPoller(self)
+        future = BuildFuture(build, time.time() + self.wait_for_build_timeout)
+        self._build_poller.track(future)
+        return future
 
     def wait_for_build(self, build):
         """Wait until specific build is finished
@@ -315,24 +933,279 @@ class IIBClient(object):
         """
         timeout = time.time() + self.wait_for_build_timeout
         while True:
-            build_details = self.get_build(build.id)
-            if build_details.state in ("complete", "failed"):
+            build_details = self.poll_build(build.id)
+            if build_details is not None and build_details.state in (
+                "complete",
+                "failed",
+            ):
                 return build_details
             if time.time() >= timeout:
                 raise IIBException(
                     "Timeout reached. Build request %s was not processed in %d seconds."
                     % (build.id, self.wait_for_build_timeout),
                 )
-            time.sleep(self.poll_interval)
+            self.sleep(self.poll_interval, "poll")
+
+    def wait_for_builds(self, builds):
+        """Wait until all given builds are finished
+
+        Builds are polled by single loop, every unfinished build is fetched
+        once per poll_interval.
+
+        Args:
+            builds (list)
+                List of `IIBBuildDetailsModel` instances
+        Raises:
+            IIBException when timeout for get build from IIB was reached
+        Returns:
+            list of finished `IIBBuildDetailsModel` instances in the same
+            order as given builds
+        """
+        timeout = time.time() + self.wait_for_build_timeout
+        results = [None] * len(builds)
+        pending = list(range(len(builds)))
+        while True:
+            still_pending = []
+            for index in pending:
+                build_details = self.poll_build(builds[index].id)
+                if build_details is not None and build_details.state in (
+                    "complete",
+                    "failed",
+                ):
+                    results[index] = build_details
+                else:
+                    still_pending.append(index)
+            pending = still_pending
+            if not pending:
+                return results
+            if time.time() >= timeout:
+                raise IIBException(
+                    "Timeout reached. Build requests %s were not processed in %d seconds."
+                    % (
+                        ", ".join(str(builds[index].id) for index in pending),
+                        self.wait_for_build_timeout,
+                    ),
+                )
+            self.sleep(self.poll_interval, "poll")
+
+    def _refresh_in_flight(self):
+        """Fetch builds tracked by rate limiter to free slots of finished ones"""
+        for bid in self.rate_limiter.in_flight():
+            self.get_build(bid, raw=True)
+
+    def _find_submitted_build(self, request_type, post_data, since):
+        """Look for build created by submission among recent builds
+
+        Builds of the request type (and of the user who submitted previous
+        builds of the client, when known) are scanned from the newest until
+        builds created before the first submission attempt are reached.
+
+        Args:
+            request_type (str)
+                Request type of the submission
+            post_data (dict)
+                Data of the submission
+            since (float)
+                Time of the first submission attempt in seconds since epoch
+
+        Returns:
+            dict with json data of the build or None when it wasn't found
+        """
+        policy = self.retry_policy
+        params = {"request_type": request_type, "verbose": True}
+        if self._submitter:
+            params["user"] = self._submitter
+        for page in range(1, policy.max_scan_pages + 1):
+            params["page"] = page
+            try:
+                resp = self.iib_session.get("builds", params=params)
+                data = self._response_json(resp)
+            except (IIBException, requests.exceptions.RequestException):
+                return None
+            items = data.get("items") or []
+            for build in items:
+                if policy.matches(request_type, post_data, build, since):
+                    return build
+            meta = data.get("meta") or {}
+            if (
+                not items
+                # builds are listed from the newest
+                or not policy.created_since(items[-1], since)
+                or page >= meta.get("pages", page)
+            ):
+                return None
+        return None
+
+    def _submit_build(self, endpoint, request_type, post_data):
+        """Submit build request and retry it according to retry_policy
+
+        Submission is repeated after 429 or 503 response, waiting for time
+        requested by Retry-After header. Failures to connect are retried
+        only by urllib3 (see IIBRetryPolicy), they are not repeated here.
+        When connection failed after the request was sent, it's not known
+        whether IIB received it, so recent builds are checked for matching
+        build first and the request is repeated only when there is none.
+
+        Args:
+            endpoint (str)
+                API endpoint of the request, e.g. "builds/add"
+            request_type (str)
+                Request type of submitted build
+            post_data (dict)
+                Request data
+
+        Raises:
+            IIBException when any error occurs
+
+        Returns:
+            dict with json response
+        """
+        policy = self.retry_policy
+        since = time.time()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                resp = self.iib_session.post(endpoint, json=post_data)
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ) as exc:
+                # connection failures were already retried by urllib3
+                if attempt > policy.post_retries or not request_was_sent(exc):
+                    raise
+                if self.instrumentation is not None:
+                    self.instrumentation.retry(
+                        normalize_endpoint(endpoint), attempt, "connection error"
+                    )
+                self.sleep(policy.backoff(attempt), "retry", policy.sleep)
+                build = self._find_submitted_build(request_type, post_data, since)
+                if build is not None:
+                    return build
+                continue
+            if (
+                resp.status_code in RETRY_AFTER_STATUSES
+                and attempt <= policy.post_retries
+            ):
+                if self.instrumentation is not None:
+                    self.instrumentation.retry(
+                        normalize_endpoint(endpoint),
+                        attempt,
+                        "status %s" % resp.status_code,
+                    )
+                delay = policy.retry_after(resp)
+                self.sleep(
+                    policy.backoff(attempt) if delay is None else delay,
+                    "retry",
+                    policy.sleep,
+                )
+                continue
+            data = self._response_json(resp)
+            self._submitter = data.get("user") or self._submitter
+            return data
+
+    def _post_build(self, endpoint, post_data):
+        """Submit build request
+
+        When rate_limiter is set, submission waits until there is free slot
+        for the request type.
+
+        Args:
+            endpoint (str)
+                API endpoint of the request, e.g. "builds/add"
+            post_data (dict)
+                Request data
+
+        Raises:
+            IIBException when any error occurs or timeout for free slot
+            was reached
+
+        Returns:
+            dict with json response
+        """
+        request_type = endpoint.rsplit("/", 1)[1]
+        if self.rate_limiter is None:
+            return self._submit_build(endpoint, request_type, post_data)
+
+        if not self.rate_limiter.reserve(
+            request_type,
+            refresh=self._refresh_in_flight,
+            timeout=self.wait_for_build_timeout,
+            poll_interval=self.poll_interval,
+        ):
+            raise IIBException(
+                "Timeout reached. No free slot for %s build in %d seconds."
+                % (request_type, self.wait_for_build_timeout)
+            )
+        try:
+            data = self._submit_build(endpoint, request_type, post_data)
+        except Exception:
+            self.rate_limiter.release(request_type)
+            raise
+        self.rate_limiter.submitted(request_type, data)
+        return data
+
+    def _post_builds(self, endpoint, posts_data, model, max_workers=None):
+        """Submit multiple build requests concurrently
+
+        All requests are submitted even when some of them fail.
+
+        Args:
+            endpoint (str)
+                API endpoint of the requests
+            posts_data (list)
+                List of requests data
+            model (class)
+                Model class of submitted builds
+            max_workers (int)
+                optional. Maximal number of concurrently submitted requests,
+                defaults to MAX_SUBMIT_WORKERS
+
+        Raises:
+            IIBBatchSubmitError when any of the submissions failed, it
+            carries builds which were submitted
+
+        Returns:
+            list of model instances in the same order as posts_data
+        """
+
+        def _post(post_data):
+            return self._model(model, self._post_build(endpoint, post_data))
+
+        if not posts_data:
+            return []
+        builds = [None] * len(posts_data)
+        errors = {}
+        workers = max_workers or min(len(posts_data), MAX_SUBMIT_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = dict(
+                (pool.submit(_post, post_data), index)
+                for index, post_data in enumerate(posts_data)
+            )
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    builds[index] = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    errors[index] = exc
+        if errors:
+            raise IIBBatchSubmitError(builds, errors)
+        return builds
 
     def regenerate_bundle(
         self,
         bundle_image,
         organization=None,
         raw=False,
+        future=False,
     ):
         """Regenerate bundle image.
 
+        When result_cache is set and it contains complete build which
+        regenerated bundle image of the same digest for the same organization,
+        the cached build with already regenerated bundle_image is returned
+        without submitting new request.
+
         Args:
             bundle_image (str)
                 The pull specification of the original bundle image
@@ -342,6 +1215,9 @@ class IIBClient(object):
                 regenerated for.
             raw (bool)
                 Return raw json response instead of model instance
+            future (bool)
+                Return BuildFuture resolved with finished build instead
+                of model instance
 
         Returns:
             `RegenerateBundleModel` or dict
@@ -349,21 +1225,31 @@ class IIBClient(object):
               return `RegenerateBundleModel` instance.
         """
 
+        if self.result_cache is not None:
+            cached = self.result_cache.lookup(
+                "regenerate-bundle", bundle_image, organization=organization
+            )
+            if cached is not None:
+                if future:
+                    return self.build_future(cached)
+                return cached.to_dict() if raw else cached
+
         post_data = {
             "from_bundle_image": bundle_image,
         }
         if organization:
             post_data["organization"] = organization
 
-        resp = self.iib_session.post("builds/regenerate-bundle", json=post_data)
-        self._check_response(resp)
+        data = self._post_build("builds/regenerate-bundle", post_data)
 
+        if future:
+            return self.build_future(self._model(RegenerateBundleModel, data))
         if raw:
-            return resp.json()
-        return RegenerateBundleModel.from_dict(resp.json())
+            return data
+        return self._model(RegenerateBundleModel, data)
 
     def create_empty_index(
-        self, index_image, binary_image=None, labels=None, raw=False
+        self, index_image, binary_image=None, labels=None, raw=False, future=False
     ):
         """Create and empty index image.
 
@@ -376,6 +1262,9 @@ class IIBClient(object):
                optional. A Dictionary of additional labels which belong to an index image
             raw (bool)
                Return raw json response instead of model instance
+            future (bool)
+               Return BuildFuture resolved with finished build instead
+               of model instance
 
         Returns:
            `CreateEmptyIndexModel` or dict
@@ -393,12 +1282,13 @@ class IIBClient(object):
         if labels:
             post_data["labels"] = labels
 
-        resp = self.iib_session.post("builds/create-empty-index", json=post_data)
-        self._check_response(resp)
+        data = self._post_build("builds/create-empty-index", post_data)
 
+        if future:
+            return self.build_future(self._model(CreateEmptyIndexModel, data))
         if raw:
-            return resp.json()
-        return CreateEmptyIndexModel.from_dict(resp.json())
+            return data
+        return self._model(CreateEmptyIndexModel, data)
 
     def rebuild_index(self, index_image):
         raise NotImplementedError
@@ -416,6 +1306,7 @@ class IIBClient(object):
         overwrite_from_index=False,
         overwrite_from_index_token=None,
         raw=False,
+        future=False,
     ):
         """Add deprecations of an operator package to index image.
 
@@ -440,6 +1331,9 @@ class IIBClient(object):
                 this is provided, overwrite_from_index must be set to True.
             raw (bool)
                Return raw json response instead of model instance
+            future (bool)
+               Return BuildFuture resolved with finished build instead
+               of model instance
 
         Returns:
             AddDeprecationsModel or dict
@@ -474,9 +1368,382 @@ class IIBClient(object):
                 "overwrite-from-index-token should be specified."
             )
 
-        resp = self.iib_session.post("builds/add-deprecations", json=post_data)
-        self._check_response(resp)
+        data = self._post_build("builds/add-deprecations", post_data)
+
+        if future:
+            return self.build_future(self._model(AddDeprecationsModel, data))
+        if raw:
+            return data
+        return self._model(AddDeprecationsModel, data)
+
+    @staticmethod
+    def _merge_index_image_post_data(
+        source_from_index,
+        target_index,
+        binary_image=None,
+        build_tags=None,
+        deprecation_list=None,
+        distribution_scope=None,
+        overwrite_target_index=False,
+        overwrite_target_index_token=None,
+    ):
+        post_data = {
+            "source_from_index": source_from_index,
+            "target_index": target_index,
+        }
+
+        if binary_image:
+            post_data["binary_image"] = binary_image
+
+        if build_tags:
+            post_data["build_tags"] = build_tags
+
+        if deprecation_list:
+            post_data["deprecation_list"] = deprecation_list
+
+        if distribution_scope:
+            post_data["distribution_scope"] = distribution_scope
+
+        if overwrite_target_index:
+            if overwrite_target_index_token:
+                post_data["overwrite_target_index"] = overwrite_target_index
+                post_data["overwrite_target_index_token"] = overwrite_target_index_token
+            else:
+                raise ValueError(
+                    "Either both or neither of overwrite-target-index and "
+                    "overwrite-target-index-token should be specified."
+                )
+        elif overwrite_target_index_token:
+            raise ValueError(
+                "Either both or neither of overwrite-target-index and "
+                "overwrite-target-index-token should be specified."
+            )
+
+        return post_data
+
+    def merge_index_images(
+        self,
+        source_from_index,
+        target_index=None,
+        binary_image=None,
+        build_tags=None,
+        deprecation_list=None,
+        distribution_scope=None,
+        overwrite_target_index=False,
+        overwrite_target_index_token=None,
+        raw=False,
+        future=False,
+    ):
+        """Merge bundles of source index image to target index image.
+
+        Args:
+            source_from_index (str)
+                Index image ref used as base for the new index image
+            target_index (str)
+                optional. Index image ref whose bundles are added to content
+                of source_from_index. The resulting index image uses
+                ocp_version label of this index image.
+            binary_image (str)
+                optional. Image with binary used to rebuild existing index image
+            build_tags (list)
+                optional. List of extra tags applied to built index image in temp namespace
+            deprecation_list (list)
+                optional. A list of bundles to be deprecated from the new index image
+            distribution_scope (str)
+                optional. Scope of distribution of the new index image
+                (prod, stage or dev)
+            overwrite_target_index (bool)
+                optional. Indicates if resulting index_image needs to be
+                overwritten at the location of target_index. If this is
+                provided, overwrite_target_index_token needs to be specified too.
+            overwrite_target_index_token (str)
+                optional. Token of the destination registry repo where the
+                resulting index image built by IIB has to be overwritten. If
+                this is provided, overwrite_target_index must be set to True.
+            raw (bool)
+                Return raw json response instead of model instance
+            future (bool)
+                Return BuildFuture resolved with finished build instead
+                of model instance
+
+        Returns:
+            MergeIndexImageModel or dict
+              if raw == True return dict with json response otherwise
+              return MergeIndexImageModel instance.
+        """
+
+        post_data = self._merge_index_image_post_data(
+            source_from_index,
+            target_index,
+            binary_image=binary_image,
+            build_tags=build_tags,
+            deprecation_list=deprecation_list,
+            distribution_scope=distribution_scope,
+            overwrite_target_index=overwrite_target_index,
+            overwrite_target_index_token=overwrite_target_index_token,
+        )
+
+        data = self._post_build("builds/merge-index-image", post_data)
+
+        if future:
+            return self.build_future(self._model(MergeIndexImageModel, data))
+        if raw:
+            return data
+        return self._model(MergeIndexImageModel, data)
+
+    def merge_index_images_to_targets(
+        self, source_from_index, target_indexes, wait=True, max_workers=None, **kwargs
+    ):
+        """Merge source index image to many target index images at once.
+
+        All requests are validated before any of them is submitted, then
+        they are submitted concurrently and, if requested, waited for by
+        single poller. See wait_for_builds.
+
+        Args:
+            source_from_index (str)
+                Index image ref used as base for the new index images
+            target_indexes (list)
+                List of target index image refs
+            wait (bool)
+                optional. Wait until all builds are finished
+            max_workers (int)
+                optional. Maximal number of concurrently submitted requests
+            kwargs
+                optional. Other arguments of merge_index_images, except raw
+
+        Raises:
+            ValueError when any of requests is invalid
+            IIBBatchSubmitError when some requests failed to be submitted,
+            submitted builds are not waited for
+
+        Returns:
+            list of MergeIndexImageModel instances in the same order as
+            target_indexes
+        """
+
+        posts_data = [
+            self._merge_index_image_post_data(source_from_index, target, **kwargs)
+            for target in target_indexes
+        ]
+        builds = self._post_builds(
+            "builds/merge-index-image",
+            posts_data,
+            MergeIndexImageModel,
+            max_workers=max_workers,
+        )
+        if wait:
+            return self.wait_for_builds(builds)
+        return builds
+
+    @staticmethod
+    def _fbc_operations_post_data(
+        index_image,
+        fbc_fragment,
+        arches=None,
+        binary_image=None,
+        build_tags=None,
+        overwrite_from_index=False,
+        overwrite_from_index_token=None,
+    ):
+        if not index_image:
+            raise ValueError("Index image has to be specified.")
+        if not fbc_fragment:
+            raise ValueError("FBC fragment has to be specified.")
+
+        post_data = {
+            "from_index": index_image,
+            "fbc_fragment": fbc_fragment,
+        }
+
+        if arches:
+            post_data["add_arches"] = arches
+
+        if binary_image:
+            post_data["binary_image"] = binary_image
+
+        if build_tags:
+            post_data["build_tags"] = build_tags
+
+        if overwrite_from_index:
+            if overwrite_from_index_token:
+                post_data["overwrite_from_index"] = overwrite_from_index
+                post_data["overwrite_from_index_token"] = overwrite_from_index_token
+            else:
+                raise ValueError(
+                    "Either both or neither of overwrite-from-index and "
+                    "overwrite-from-index-token should be specified."
+                )
+        elif overwrite_from_index_token:
+            raise ValueError(
+                "Either both or neither of overwrite-from-index and "
+                "overwrite-from-index-token should be specified."
+            )
+
+        return post_data
+
+    def fbc_operations(
+        self,
+        index_image,
+        fbc_fragment,
+        arches=None,
+        binary_image=None,
+        build_tags=None,
+        overwrite_from_index=False,
+        overwrite_from_index_token=None,
+        raw=False,
+        future=False,
+    ):
+        """Rebuild index image with FBC fragment added.
+
+        Args:
+            index_image (str)
+                Index image ref used as source to rebuild
+            fbc_fragment (str)
+                Image ref of file-based catalog fragment to be added
+            arches (list)
+                optional. List of architectures supported in new index image
+            binary_image (str)
+                optional. Image with binary used to rebuild existing index image
+            build_tags (list)
+                optional. List of extra tags applied to built index image in temp namespace
+            overwrite_from_index (bool)
+                optional. Indicates if resulting index_image needs to be
+                overwritten at the location of from_index. If this is provided,
+                overwrite_from_index_token needs to be specified too.
+            overwrite_from_index_token (str)
+                optional. Token of the destination registry repo where the
+                resulting index image built by IIB has to be overwritten. If
+                this is provided, overwrite_from_index must be set to True.
+            raw (bool)
+                Return raw json response instead of model instance
+            future (bool)
+                Return BuildFuture resolved with finished build instead
+                of model instance
+
+        Returns:
+            FBCOperationsModel or dict
+              if raw == True return dict with json response otherwise
+              return FBCOperationsModel instance.
+        """
+
+        post_data = self._fbc_operations_post_data(
+            index_image,
+            fbc_fragment,
+            arches=arches,
+            binary_image=binary_image,
+            build_tags=build_tags,
+            overwrite_from_index=overwrite_from_index,
+            overwrite_from_index_token=overwrite_from_index_token,
+        )
+
+        data = self._post_build("builds/fbc-operations", post_data)
+
+        if future:
+            return self.build_future(self._model(FBCOperationsModel, data))
+        if raw:
+            return data
+        return self._model(FBCOperationsModel, data)
+
+    def fbc_operations_batch(self, operations, wait=True, max_workers=None, **kwargs):
+        """Add FBC fragments to many index images at once.
+
+        All requests are validated before any of them is submitted, then
+        they are submitted concurrently and, if requested, waited for by
+        single poller. See wait_for_builds.
+
+        Args:
+            operations (list)
+                List of (index_image, fbc_fragment) tuples
+            wait (bool)
+                optional. Wait until all builds are finished
+            max_workers (int)
+                optional. Maximal number of concurrently submitted requests
+            kwargs
+                optional. Other arguments of fbc_operations applied to all
+                requests, except raw
+
+        Raises:
+            ValueError when any of requests is invalid or requested
+            more than once
+            IIBBatchSubmitError when some requests failed to be submitted,
+            submitted builds are not waited for
+
+        Returns:
+            list of FBCOperationsModel instances in the same order as
+            operations
+        """
+
+        posts_data = []
+        requested = set()
+        for index_image, fbc_fragment in operations:
+            if (index_image, fbc_fragment) in requested:
+                raise ValueError(
+                    "FBC fragment %s is requested for index image %s more than once."
+                    % (fbc_fragment, index_image)
+                )
+            requested.add((index_image, fbc_fragment))
+            posts_data.append(
+                self._fbc_operations_post_data(index_image, fbc_fragment, **kwargs)
+            )
+        builds = self._post_builds(
+            "builds/fbc-operations",
+            posts_data,
+            FBCOperationsModel,
+            max_workers=max_workers,
+        )
+        if wait:
+            return self.wait_for_builds(builds)
+        return builds
+
+    def recursive_related_bundles(
+        self, parent_bundle_image, organization=None, raw=False, future=False
+    ):
+        """Get nested bundles of parent bundle image.
+
+        When result_cache is set and it contains result of finished build for
+        the same parent bundle image digest, the cached build is returned
+        without submitting new request.
+
+        Args:
+            parent_bundle_image (str)
+                The pull specification of the parent bundle image
+            organization (str)
+                optional. The name of the organization the nested bundles
+                should be resolved for.
+            raw (bool)
+                Return raw json response instead of model instance
+            future (bool)
+                Return BuildFuture resolved with finished build instead
+                of model instance
+
+        Returns:
+            `RecursiveRelatedBundlesModel` or dict
+              if raw == True return dict with json response otherwise
+              return `RecursiveRelatedBundlesModel` instance.
+        """
+
+        if self.result_cache is not None:
+            cached = self.result_cache.lookup(
+                "recursive-related-bundles",
+                parent_bundle_image,
+                organization=organization,
+            )
+            if cached is not None:
+                if future:
+                    return self.build_future(cached)
+                return cached.to_dict() if raw else cached
+
+        post_data = {
+            "parent_bundle_image": parent_bundle_image,
+        }
+        if organization:
+            post_data["organization"] = organization
+
+        data = self._post_build("builds/recursive-related-bundles", post_data)
 
+        if future:
+            return self.build_future(self._model(RecursiveRelatedBundlesModel, data))
         if raw:
-            return resp.json()
-        return AddDeprecationsModel.from_dict(resp.json())
+            return data
+        return self._model(RecursiveRelatedBundlesModel, data)
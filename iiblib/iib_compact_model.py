@@ -0,0 +1,306 @@
+import sys
+from types import MappingProxyType
+
+from .iib_build_details_model import IIBBuildDetailsModel
+from .iib_timestamps import format_timestamp, parse_timestamp
+
+# Fields which values repeat a lot across builds
+INTERNED_FIELDS = frozenset(
+    [
+        "arches",
+        "binary_image",
+        "binary_image_resolved",
+        "build_tags",
+        "bundles",
+        "distribution_scope",
+        "fbc_fragment",
+        "from_bundle_image",
+        "from_index",
+        "from_index_resolved",
+        "operator_package",
+        "organization",
+        "parent_bundle_image",
+        "removed_operators",
+        "request_type",
+        "source_from_index",
+        "source_from_index_resolved",
+        "state",
+        "state_reason",
+        "target_index",
+        "target_index_resolved",
+        "user",
+    ]
+)
+
+_EMPTY_DICT = MappingProxyType({})
+_EMPTY_TUPLE = ()
+
+# request type: (field names, field name -> position in values, defaults)
+_LAYOUTS = {}
+
+
+def _layout(request_type):
+    layout = _LAYOUTS.get(request_type)
+    if layout is None:
+        model = None
+        for sub_cls in IIBBuildDetailsModel.__subclasses__():
+            if sub_cls._accepted_request_type == request_type:
+                model = sub_cls
+        if model is None:
+            raise KeyError("Unsupported request type: %s" % request_type)
+        defaults = dict(
+            (field, default_maker)
+            for field, default_maker in model._optional_attrs.items()
+            if field != "state_history"
+        )
+        fields = tuple(sorted(defaults) + list(model._operation_attrs))
+        layout = (
+            fields,
+            dict((field, pos) for pos, field in enumerate(fields)),
+            defaults,
+        )
+        _LAYOUTS[request_type] = layout
+    return layout
+
+
+def _freeze(value, intern=False):
+    """Convert value to compact immutable form"""
+    if isinstance(value, str):
+        return sys.intern(value) if intern else value
+    if isinstance(value, list):
+        if not value:
+            return _EMPTY_TUPLE
+        return tuple(_freeze(item, intern) for item in value)
+    if isinstance(value, dict):
+        if not value:
+            return _EMPTY_DICT
+        return dict(
+            (sys.intern(key), _freeze(item, intern)) for key, item in value.items()
+        )
+    return value
+
+
+def _thaw(value):
+    """Convert compact value back to json form"""
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    if isinstance(value, (dict, MappingProxyType)):
+        return dict((key, _thaw(item)) for key, item in value.items())
+    return value
+
+
+class CompactBuildDetails(object):
+    """
+    Memory compact read-only representation of build details
+
+    Repeating strings (see INTERNED_FIELDS) are interned, lists are stored as
+    tuples, timestamps as number of microseconds since epoch and state
+    history as tuple of (state, state_reason, updated) tuples. Attributes
+    specific to request type are stored in single tuple which layout is
+    shared by all builds of the same request type.
+
+    Args:
+        id (int)
+            An id of build
+        request_type (str)
+            A type of iib build task
+        state (str)
+            A state of build
+        state_reason (str)
+            A reason for state change
+        batch (int)
+            A number of batches included in the request
+        updated (int)
+            Time when was the request updated in microseconds since epoch
+        user (str)
+            A user kerberos (email)
+        arches (tuple)
+            A tuple of architectures supported in new index image
+        state_history (tuple)
+            A tuple of (state, state_reason, updated) tuples
+    """
+
+    __slots__ = [
+        "id",
+        "request_type",
+        "state",
+        "state_reason",
+        "batch",
+        "updated",
+        "user",
+        "arches",
+        "state_history",
+        "_values",
+    ]
+
+    def __init__(
+        self,
+        id,
+        request_type,
+        state,
+        state_reason,
+        batch,
+        updated,
+        user,
+        arches,
+        state_history,
+        values,
+    ):
+        # pylint: disable=redefined-builtin
+        self.id = id
+        self.request_type = request_type
+        self.state = state
+        self.state_reason = state_reason
+        self.batch = batch
+        self.updated = updated
+        self.user = user
+        self.arches = arches
+        self.state_history = state_history
+        self._values = values
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create compact object from a dictionary
+
+        Args:
+            data (dict)
+                JSON dictionary with response data
+
+        Raises:
+            KeyError
+                The request type is not supported
+
+        Returns:
+            CompactBuildDetails
+        """
+        request_type = sys.intern(data["request_type"])
+        fields, _, defaults = _layout(request_type)
+        values = []
+        for field in fields:
+            if field in data or field not in defaults:
+                value = data[field]
+            else:
+                value = defaults[field]()
+            values.append(_freeze(value, field in INTERNED_FIELDS))
+        state_history = tuple(
+            (
+                sys.intern(entry["state"]),
+                _freeze(entry["state_reason"], True),
+                parse_timestamp(entry["updated"]),
+            )
+            for entry in data.get("state_history") or ()
+        )
+        return cls(
+            data["id"],
+            request_type,
+            sys.intern(data["state"]),
+            _freeze(data["state_reason"], True),
+            data["batch"],
+            parse_timestamp(data["updated"]),
+            _freeze(data["user"], True),
+            _freeze(data["arches"], True),
+            state_history or _EMPTY_TUPLE,
+            tuple(values),
+        )
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Create compact object from IIBBuildDetailsModel
+
+        Args:
+            model (IIBBuildDetailsModel)
+                Model to compact
+
+        Returns:
+            CompactBuildDetails
+        """
+        return cls.from_dict(model.to_dict())
+
+    def to_dict(self):
+        """
+        Return a dictionary in the same form as returned by IIB API
+
+        Timestamps are formatted with microseconds precision, which may
+        differ from format of the original data.
+
+        Returns:
+            A dictionary from the object
+        """
+        fields = _layout(self.request_type)[0]
+        data = dict((field, _thaw(value)) for field, value in zip(fields, self._values))
+        data.update(
+            {
+                "id": self.id,
+                "request_type": self.request_type,
+                "state": self.state,
+                "state_reason": self.state_reason,
+                "batch": self.batch,
+                "updated": format_timestamp(self.updated),
+                "user": self.user,
+                "arches": list(self.arches),
+                "state_history": [
+                    {
+                        "state": state,
+                        "state_reason": state_reason,
+                        "updated": format_timestamp(updated),
+                    }
+                    for state, state_reason, updated in self.state_history
+                ],
+            }
+        )
+        return data
+
+    def to_model(self):
+        """
+        Return IIBBuildDetailsModel for the object
+
+        Returns:
+            Specific model (AddModel, RmModel, ...) instance
+        """
+        return IIBBuildDetailsModel.from_dict(self.to_dict())
+
+    def __getattr__(self, name):
+        """
+        Return value of attribute specific to request type
+
+        Args:
+            name (str)
+                A name of variable
+        Returns:
+            An expected variable
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+        index = _layout(self.request_type)[1]
+        if name not in index:
+            raise AttributeError(
+                "%s has no attribute %s" % (self.__class__.__name__, name)
+            )
+        return self._values[index[name]]
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and all(
+            getattr(self, attr) == getattr(other, attr) for attr in self.__slots__
+        )
+
+    __hash__ = None
+
+
+def compact_builds(builds):
+    """
+    Convert builds to compact representation
+
+    Args:
+        builds (iterable)
+            Iterable of IIBBuildDetailsModel instances or raw json build data
+
+    Yields:
+        CompactBuildDetails
+    """
+    for build in builds:
+        if isinstance(build, IIBBuildDetailsModel):
+            yield CompactBuildDetails.from_model(build)
+        else:
+            yield CompactBuildDetails.from_dict(build)
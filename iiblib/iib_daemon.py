@@ -0,0 +1,375 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from functools import partial
+
+import requests
+
+from .iib_build_details_model import IIBBuildDetailsModel
+from .iib_build_details_pager import IIBBuildDetailsPager
+from .iib_circuit_breaker import CircuitOpenError
+from .iib_client import IIBClient, IIBException
+
+# IIBClient methods served by the daemon
+SERVED_METHODS = frozenset(
+    [
+        "add_bundles",
+        "remove_operators",
+        "regenerate_bundle",
+        "create_empty_index",
+        "add_deprecations",
+        "merge_index_images",
+        "merge_index_images_to_targets",
+        "fbc_operations",
+        "fbc_operations_batch",
+        "recursive_related_bundles",
+        "get_build",
+        "get_builds",
+        "wait_for_build",
+        "wait_for_builds",
+    ]
+)
+
+# Arguments which results can't be sent over the socket
+_LOCAL_ARGUMENTS = ("future", "stream")
+
+# Exceptions re-raised by proxy client, other exceptions become IIBException
+_ERRORS = {
+    "IIBException": IIBException,
+    "IIBBatchSubmitError": IIBException,
+    "ValueError": ValueError,
+    "KeyError": KeyError,
+    "TypeError": TypeError,
+    "CircuitOpenError": CircuitOpenError,
+    "HTTPError": requests.exceptions.HTTPError,
+    "ConnectionError": requests.exceptions.ConnectionError,
+    "Timeout": requests.exceptions.Timeout,
+}
+
+
+def default_socket_path():
+    """Return path of daemon socket in user's runtime directory
+
+    When XDG_RUNTIME_DIR isn't set, the socket is placed in private
+    directory of the user created in temporary directory.
+
+    Returns:
+        str
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "iiblib-%s.sock" % os.getuid())
+    # pylint: disable=import-outside-toplevel
+    import tempfile
+
+    private_dir = os.path.join(tempfile.gettempdir(), "iiblib-%s" % os.getuid())
+    try:
+        os.mkdir(private_dir, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(private_dir)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or stat.S_IMODE(info.st_mode) & 0o077
+    ):
+        raise IIBException("%s isn't private directory of current user." % private_dir)
+    return os.path.join(private_dir, "daemon.sock")
+
+
+def _check_owner(path):
+    """Raise IIBException when path isn't owned by current user"""
+    if os.stat(path).st_uid != os.getuid():
+        raise IIBException("%s isn't owned by current user." % path)
+
+
+def _encode(value):
+    """Replace models in value by tagged dictionaries"""
+    if isinstance(value, IIBBuildDetailsModel):
+        return {"__build__": value.to_dict()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value):
+    """Replace tagged dictionaries in value by models"""
+    if isinstance(value, dict) and "__build__" in value:
+        return IIBBuildDetailsModel.from_dict(value["__build__"])
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    """Handler of JSON lines requests of proxy clients"""
+
+    def handle(self):
+        for line in self.rfile:
+            self.wfile.write(self.server.daemon.handle_request(line))
+            self.wfile.flush()
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class IIBDaemon(object):
+    """
+    Local daemon serving IIBClient API over unix socket
+
+    Daemon keeps IIBClient per IIB hostname, so connections, Kerberos
+    authentication, result cache and watchers of builds are shared by all
+    processes using IIBDaemonClient. The socket is accessible only by user
+    running the daemon.
+
+    Example:
+        daemon = IIBDaemon(auth=IIBKrbAuth(...), result_cache=cache)
+        daemon.serve_forever()
+    """
+
+    def __init__(
+        self, socket_path=None, client_factory=None, watcher_factory=None, **kwargs
+    ):
+        """
+        Args:
+            socket_path (str)
+                optional. Path of the unix socket, see default_socket_path
+            client_factory (callable)
+                optional. Function creating IIBClient from hostname,
+                IIBClient(hostname, **kwargs) is used by default
+            watcher_factory (callable)
+                optional. Function creating started IIBBuildWatcher from
+                client. When set, wait_for_build(s) wait by the watcher.
+            kwargs
+                Arguments of IIBClient used by default client_factory
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.client_factory = client_factory or partial(IIBClient, **kwargs)
+        self.watcher_factory = watcher_factory
+        self._lock = threading.Lock()
+        # hostname: (IIBClient, IIBBuildWatcher or None)
+        self._clients = {}
+        self._server = None
+        self._thread = None
+
+    def client(self, hostname):
+        """
+        Return client of IIB service, create it on first use
+
+        Args:
+            hostname (str)
+                IIB service hostname
+
+        Returns:
+            tuple of (IIBClient, IIBBuildWatcher or None)
+        """
+        with self._lock:
+            if hostname not in self._clients:
+                client = self.client_factory(hostname)
+                watcher = None
+                if self.watcher_factory is not None:
+                    watcher = self.watcher_factory(client)
+                self._clients[hostname] = (client, watcher)
+            return self._clients[hostname]
+
+    def call(self, hostname, method, args, kwargs):
+        """
+        Call method of client of given IIB service
+
+        Args:
+            hostname (str)
+                IIB service hostname
+            method (str)
+                Name of IIBClient method, one of SERVED_METHODS
+            args (list)
+                Positional arguments of the method
+            kwargs (dict)
+                Keyword arguments of the method
+
+        Raises:
+            ValueError when method isn't served or arguments can't be sent
+            over the socket
+
+        Returns:
+            Result of the method
+        """
+        if method not in SERVED_METHODS:
+            raise ValueError("Unsupported method: %s" % method)
+        for name in _LOCAL_ARGUMENTS:
+            if kwargs.get(name):
+                raise ValueError("Argument %s isn't supported by daemon." % name)
+        client, watcher = self.client(hostname)
+        if method == "get_builds":
+            kwargs["raw"] = True
+        target = client
+        if watcher is not None and method in ("wait_for_build", "wait_for_builds"):
+            target = watcher
+        return getattr(target, method)(*args, **kwargs)
+
+    def handle_request(self, line):
+        """
+        Process single request of proxy client
+
+        Args:
+            line (bytes)
+                JSON encoded request with hostname, method, args and kwargs
+
+        Returns:
+            bytes with JSON encoded response, object with "result" or
+            "error" with type and message of raised exception
+        """
+        try:
+            request = json.loads(line)
+            result = self.call(
+                request["hostname"],
+                request["method"],
+                _decode(request.get("args", [])),
+                dict(
+                    (key, _decode(value))
+                    for key, value in request.get("kwargs", {}).items()
+                ),
+            )
+            response = json.dumps({"result": _encode(result)})
+        except Exception as exc:  # pylint: disable=broad-except
+            response = json.dumps(
+                {"error": {"type": type(exc).__name__, "message": str(exc)}}
+            )
+        return response.encode("utf-8") + b"\n"
+
+    def _bind(self):
+        if os.path.exists(self.socket_path):
+            if not stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                raise IIBException("%s isn't a socket." % self.socket_path)
+            _check_owner(self.socket_path)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # socket of daemon which didn't exit cleanly
+                os.unlink(self.socket_path)
+            else:
+                raise IIBException("Daemon is already running: %s" % self.socket_path)
+            finally:
+                probe.close()
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _DaemonServer(self.socket_path, _DaemonHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+
+    def serve_forever(self):
+        """Serve requests until stop is called"""
+        self._bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._close()
+
+    def start(self):
+        """Serve requests in background thread"""
+        self._bind()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="iib-daemon", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving requests and close clients"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._close()
+
+    def _close(self):
+        self._server.server_close()
+        self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients = {}
+        for client, watcher in clients:
+            if watcher is not None:
+                watcher.stop()
+            client.close()
+
+
+class IIBDaemonClient(object):
+    """
+    Proxy of IIBClient running in IIBDaemon
+
+    Methods listed in SERVED_METHODS have the same arguments and return
+    values as IIBClient methods, except future and stream arguments which
+    aren't supported. Exceptions raised in the daemon are re-raised with
+    the same type when it's known, otherwise as IIBException.
+    """
+
+    def __init__(self, hostname, socket_path=None, timeout=None):
+        """
+        Args:
+            hostname (str)
+                IIB service hostname
+            socket_path (str)
+                optional. Path of daemon socket, see default_socket_path
+            timeout (float)
+                optional. Timeout of socket operations in seconds, calls
+                can take as long as the called method by default
+        """
+        self.hostname = hostname
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+
+    def _call(self, method, *args, **kwargs):
+        request = {
+            "hostname": self.hostname,
+            "method": method,
+            "args": _encode(list(args)),
+            "kwargs": dict((key, _encode(value)) for key, value in kwargs.items()),
+        }
+        # don't send requests to daemon of other user
+        _check_owner(self.socket_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps(request).encode("utf-8") + b"\n")
+                stream.flush()
+                line = stream.readline()
+        finally:
+            sock.close()
+        if not line:
+            raise IIBException("Daemon closed connection without response.")
+        response = json.loads(line)
+        if "error" in response:
+            error = response["error"]
+            exc_class = _ERRORS.get(error["type"])
+            if exc_class is None:
+                raise IIBException("%s: %s" % (error["type"], error["message"]))
+            raise exc_class(error["message"])
+        return _decode(response["result"])
+
+    def __getattr__(self, name):
+        if name in SERVED_METHODS:
+            return partial(self._call, name)
+        raise AttributeError(name)
+
+    @staticmethod
+    def _model(model, data):
+        return model.from_dict(data)
+
+    def get_builds(self, page=1, raw=False):
+        """Get all historical builds of index image, see IIBClient.get_builds"""
+        data = self._call("get_builds", page)
+        if raw:
+            return data
+        return IIBBuildDetailsPager.from_dict(self, data)
@@ -0,0 +1,214 @@
+import csv
+import os
+
+from .iib_build_details_model import IIBBuildDetailsModel
+from .iib_timestamps import build_durations, format_timestamp, parse_timestamp
+
+FORMATS = ("csv", "parquet", "arrow")
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+def _resolved_image_columns():
+    columns = set()
+    for model in IIBBuildDetailsModel.__subclasses__():
+        columns.update(
+            attr for attr in model._operation_attrs if attr.endswith("_resolved")
+        )
+    return sorted(columns)
+
+
+RESOLVED_IMAGE_COLUMNS = _resolved_image_columns()
+
+COLUMNS = (
+    [
+        "id",
+        "state",
+        "request_type",
+        "arches",
+        "updated",
+        "user",
+    ]
+    + RESOLVED_IMAGE_COLUMNS
+    + ["queue_seconds", "run_seconds"]
+)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("pyarrow is required for parquet and arrow export formats")
+    return pyarrow
+
+
+def build_row(build):
+    """Return export row of a build
+
+    Args:
+        build (IIBBuildDetailsModel or dict)
+            Build model or raw json build data
+
+    Returns:
+        dict with keys defined by COLUMNS. Value of "updated" column is
+        number of microseconds since epoch, "arches" is a list.
+    """
+    data = build.to_dict() if isinstance(build, IIBBuildDetailsModel) else build
+    queue, run = build_durations(data.get("state_history") or [])
+    row = {
+        "id": data["id"],
+        "state": data["state"],
+        "request_type": data["request_type"],
+        "arches": list(data.get("arches") or []),
+        "updated": parse_timestamp(data.get("updated")),
+        "user": data.get("user"),
+        "queue_seconds": queue,
+        "run_seconds": run,
+    }
+    for column in RESOLVED_IMAGE_COLUMNS:
+        row[column] = data.get(column)
+    return row
+
+
+class _CSVWriter(object):
+    def __init__(self, fileobj):
+        self._writer = csv.writer(fileobj)
+        self._writer.writerow(COLUMNS)
+
+    def write_batch(self, columns):
+        columns = dict(columns)
+        columns["arches"] = [" ".join(arches) for arches in columns["arches"]]
+        columns["updated"] = [format_timestamp(value) for value in columns["updated"]]
+        self._writer.writerows(zip(*[columns[name] for name in COLUMNS]))
+
+    def close(self):
+        pass
+
+
+class _ArrowWriter(object):
+    def __init__(self, fileobj, fmt):
+        pyarrow = _import_pyarrow()
+        self._pyarrow = pyarrow
+        string = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        types = {
+            "id": pyarrow.int64(),
+            "state": string,
+            "request_type": string,
+            "arches": pyarrow.list_(pyarrow.string()),
+            "updated": pyarrow.timestamp("us", tz="UTC"),
+            "user": string,
+            "queue_seconds": pyarrow.float64(),
+            "run_seconds": pyarrow.float64(),
+        }
+        self.schema = pyarrow.schema(
+            [(name, types.get(name, pyarrow.string())) for name in COLUMNS]
+        )
+        if fmt == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(fileobj, self.schema)
+        else:
+            # stream format allows dictionaries to differ between batches
+            self._writer = pyarrow.ipc.new_stream(fileobj, self.schema)
+
+    def write_batch(self, columns):
+        batch = self._pyarrow.RecordBatch.from_pydict(columns, schema=self.schema)
+        if isinstance(self._writer, self._pyarrow.ipc.RecordBatchStreamWriter):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(self._pyarrow.Table.from_batches([batch]))
+
+    def close(self):
+        self._writer.close()
+
+
+def default_format(path=None):
+    """Return export format for given path
+
+    Args:
+        path (str)
+            optional. Path of exported file
+
+    Returns:
+        Format matching extension of path. If path has unknown extension
+        "parquet" is returned when pyarrow is installed, "csv" otherwise.
+    """
+    if path:
+        ext = os.path.splitext(path)[1].lower()
+        if ext in _EXTENSIONS:
+            return _EXTENSIONS[ext]
+    try:
+        _import_pyarrow()
+    except ImportError:
+        return "csv"
+    return "parquet"
+
+
+def export_builds(builds, destination, fmt=None, batch_size=10000):
+    """Export builds to columnar table
+
+    Builds are consumed and written in batches, so memory usage is bounded
+    by batch_size regardless of number of exported builds.
+
+    Args:
+        builds (iterable)
+            Iterable of IIBBuildDetailsModel instances or raw json build data
+        destination (str or file)
+            Path or file object of the created table. File object has to be
+            opened in text mode for "csv" format, binary mode otherwise.
+        fmt (str)
+            optional. One of "csv", "parquet" or "arrow" (Arrow IPC stream).
+            Derived from destination path when not specified.
+            See default_format.
+        batch_size (int)
+            optional. Number of rows written at once
+
+    Raises:
+        ValueError when format is not supported
+        ImportError when pyarrow is required but not installed
+
+    Returns:
+        int number of exported builds
+    """
+    path = destination if isinstance(destination, str) else None
+    fmt = fmt or default_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(
+            "Unsupported export format: %s. Supported formats: %s"
+            % (fmt, ", ".join(FORMATS))
+        )
+
+    fileobj = destination
+    if path:
+        if fmt == "csv":
+            fileobj = open(path, "w", newline="")
+        else:
+            fileobj = open(path, "wb")
+
+    try:
+        if fmt == "csv":
+            writer = _CSVWriter(fileobj)
+        else:
+            writer = _ArrowWriter(fileobj, fmt)
+        count = 0
+        columns = dict((name, []) for name in COLUMNS)
+        for build in builds:
+            row = build_row(build)
+            for name in COLUMNS:
+                columns[name].append(row[name])
+            count += 1
+            if count % batch_size == 0:
+                writer.write_batch(columns)
+                columns = dict((name, []) for name in COLUMNS)
+        if columns["id"] or count == 0:
+            writer.write_batch(columns)
+        writer.close()
+    finally:
+        if path:
+            fileobj.close()
+    return count
@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from .iib_client import IIBException
+
+_TERMINAL_STATES = ("complete", "failed")
+
+
+class BuildFuture(Future):
+    """
+    Future of submitted IIB build
+
+    Future is resolved with finished IIBBuildDetailsModel once the build
+    reaches terminal state, or with IIBException when the build isn't
+    finished in client's wait_for_build_timeout. It works with
+    concurrent.futures.as_completed and wait. Future is running since the
+    build was submitted, so it can't be cancelled.
+
+    Args:
+        bid (int)
+            Build id
+        build (IIBBuildDetailsModel)
+            Last known state of the build
+        deadline (float)
+            Time in seconds since epoch when waiting for the build times out
+    """
+
+    def __init__(self, build, deadline):
+        super(BuildFuture, self).__init__()
+        self.set_running_or_notify_cancel()
+        self.bid = build.id
+        self.build = build
+        self.deadline = deadline
+
+    def __repr__(self):
+        return "<BuildFuture %s %s>" % (self.bid, self._state.lower())
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class BuildPoller(object):
+    """
+    Shared background poller resolving BuildFutures of a client
+
+    Single thread polls all unfinished builds once per client's
+    poll_interval. The thread is started when first future is tracked and
+    exits when no future is left.
+    """
+
+    def __init__(self, client):
+        """
+        Args:
+            client (IIBClient)
+                Client used to poll builds
+        """
+        self.client = client
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        # build id: list of unfinished futures of the build
+        self._futures = {}
+        self._thread = None
+
+    def track(self, future):
+        """
+        Resolve future once its build is finished
+
+        Args:
+            future (BuildFuture)
+                Future of submitted build
+        """
+        if future.build.state in _TERMINAL_STATES:
+            future.set_result(future.build)
+            return
+        with self._lock:
+            if self._stopped.is_set():
+                raise IIBException("Build poller was stopped.")
+            self._futures.setdefault(future.bid, []).append(future)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="iib-build-poller", daemon=True
+                )
+                self._thread.start()
+
+    def pending(self):
+        """
+        Return number of unfinished futures
+
+        Returns:
+            int
+        """
+        with self._lock:
+            return sum(len(futures) for futures in self._futures.values())
+
+    def stop(self):
+        """Stop polling and fail all unfinished futures"""
+        with self._lock:
+            self._stopped.set()
+            thread = self._thread
+            futures = [f for fs in self._futures.values() for f in fs]
+            self._futures = {}
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        for future in futures:
+            if not future.done():
+                future.set_exception(
+                    IIBException(
+                        "Build poller was stopped before build %s finished."
+                        % future.bid
+                    )
+                )
+
+    def _pop(self, bid):
+        with self._lock:
+            return self._futures.pop(bid, [])
+
+    def _poll(self, bid):
+        try:
+            build = self.client.poll_build(bid)
+        except Exception as exc:  # pylint: disable=broad-except
+            for future in self._pop(bid):
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        if build is None:
+            # circuit breaker is open
+            return
+        if build.state in _TERMINAL_STATES:
+            for future in self._pop(bid):
+                future.build = build
+                if not future.done():
+                    future.set_result(build)
+            return
+        with self._lock:
+            futures = list(self._futures.get(bid, []))
+        for future in futures:
+            future.build = build
+
+    def _expire(self):
+        """Fail timed out futures and return ids of unfinished builds"""
+        now = time.time()
+        expired = []
+        with self._lock:
+            for bid in list(self._futures):
+                futures = []
+                for future in self._futures[bid]:
+                    if now >= future.deadline:
+                        expired.append(future)
+                    else:
+                        futures.append(future)
+                if futures:
+                    self._futures[bid] = futures
+                else:
+                    del self._futures[bid]
+            bids = list(self._futures)
+            if not bids:
+                self._thread = None
+        for future in expired:
+            future.set_exception(
+                IIBException(
+                    "Timeout reached. Build request %s was not processed in %d seconds."
+                    % (future.bid, self.client.wait_for_build_timeout)
+                )
+            )
+        return bids
+
+    def _run(self):
+        while not self._stopped.wait(self.client.poll_interval):
+            bids = self._expire()
+            if not bids:
+                return
+            for bid in bids:
+                if self._stopped.is_set():
+                    return
+                self._poll(bid)
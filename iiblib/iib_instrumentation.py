@@ -0,0 +1,416 @@
+import threading
+from collections import OrderedDict
+
+# Upper bounds of histogram buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Upper bounds of buckets of time to terminal state in seconds
+BUILD_DURATION_BUCKETS = (60, 120, 300, 600, 900, 1800, 3600, 7200)
+
+# Upper bounds of buckets of number of polls per build
+POLL_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# Maximal number of unfinished builds which polls are counted
+MAX_TRACKED_BUILDS = 10000
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class IIBInstrumentation(object):
+    """
+    Instrumentation hooks of IIBSession and IIBClient
+
+    All hooks do nothing, subclasses override hooks they are interested in.
+    Hooks are called only when instrumentation is passed to the client, so
+    there is no cost when instrumentation is not used.
+    """
+
+    def request(self, method, endpoint, status, seconds, retries, size):
+        """
+        Called after HTTP request finished
+
+        Args:
+            method (str)
+                HTTP method of the request
+            endpoint (str)
+                Normalized endpoint of the request, e.g. "builds/<id>"
+            status (int)
+                Status code of the response, None when request failed
+            seconds (float)
+                Duration of the request including retries
+            retries (int)
+                Number of retries done by urllib3
+            size (int)
+                Size of response body from Content-Length header, None when
+                it's unknown
+        """
+
+    def transfer(self, endpoint, encoding, compressed, uncompressed):
+        """
+        Called after body of response which isn't streamed was received,
+        or after streamed response was closed. Sizes of streamed response
+        cover only the part of body consumed before closing.
+
+        Args:
+            endpoint (str)
+                Normalized endpoint of the request, e.g. "builds"
+            encoding (str)
+                Content-Encoding of the response, "identity" when body
+                wasn't compressed
+            compressed (int)
+                Number of body bytes received over the wire
+            uncompressed (int)
+                Size of decompressed body in bytes
+        """
+
+    def decode(self, seconds, size):
+        """
+        Called after response body was decoded and checked
+
+        Args:
+            seconds (float)
+                Duration of decoding
+            size (int)
+                Size of decoded body in bytes
+        """
+
+    def model(self, request_type, seconds):
+        """
+        Called after model was created from decoded data
+
+        Args:
+            request_type (str)
+                Request type of the build
+            seconds (float)
+                Duration of from_dict
+        """
+
+    def auth(self, seconds):
+        """
+        Called after authentication of session was set up
+
+        Args:
+            seconds (float)
+                Duration of authentication, e.g. obtaining Kerberos ticket
+        """
+
+    def retry(self, endpoint, attempt, reason):
+        """
+        Called before build submission is repeated
+
+        Retries of idempotent requests done by urllib3 are reported by
+        retries argument of request hook.
+
+        Args:
+            endpoint (str)
+                Normalized endpoint of the request
+            attempt (int)
+                Number of failed attempts
+            reason (str)
+                Reason of the retry, e.g. "connection error" or "status 429"
+        """
+
+    def sleep(self, seconds, reason):
+        """
+        Called after client slept
+
+        Args:
+            seconds (float)
+                Duration of the sleep
+            reason (str)
+                Reason of the sleep, e.g. "poll" or "retry"
+        """
+
+    def poll(self, bid, state):
+        """
+        Called on every turn of poll loop for every polled build
+
+        Args:
+            bid (int)
+                Build id
+            state (str)
+                Fetched state of the build, None when it couldn't be fetched
+        """
+
+    def finished(self, bid, request_type, state, seconds):
+        """
+        Called when poll loop sees build in terminal state
+
+        Args:
+            bid (int)
+                Build id
+            request_type (str)
+                Request type of the build
+            state (str)
+                Terminal state of the build
+            seconds (float)
+                Time from creation of the build to terminal state, None when
+                it's not known
+        """
+
+
+class CompositeInstrumentation(IIBInstrumentation):
+    """Instrumentation calling hooks of many instrumentations"""
+
+    def __init__(self, *instrumentations):
+        """
+        Args:
+            instrumentations (IIBInstrumentation)
+                Instrumentations which hooks are called in given order
+        """
+        self.instrumentations = instrumentations
+
+    def request(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.request(*args)
+
+    def transfer(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.transfer(*args)
+
+    def decode(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.decode(*args)
+
+    def model(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.model(*args)
+
+    def auth(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.auth(*args)
+
+    def retry(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.retry(*args)
+
+    def sleep(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.sleep(*args)
+
+    def poll(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.poll(*args)
+
+    def finished(self, *args):
+        for instrumentation in self.instrumentations:
+            instrumentation.finished(*args)
+
+
+class Histogram(object):
+    """Cumulative histogram with fixed buckets"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add value to the histogram"""
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join(
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+
+
+def _format_value(value):
+    if isinstance(value, float) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class IIBMetrics(IIBInstrumentation):
+    """
+    Instrumentation collecting Prometheus style metrics
+
+    Collected metrics:
+        iib_request_duration_seconds (histogram) by method, endpoint, status
+        iib_request_retries_total (counter) by method, endpoint
+        iib_response_bytes_total (counter) by endpoint
+        iib_response_compressed_bytes_total (counter) by endpoint, encoding
+        iib_response_uncompressed_bytes_total (counter) by endpoint, encoding
+        iib_decode_duration_seconds (histogram)
+        iib_model_duration_seconds (histogram) by request_type
+        iib_polls_total (counter) by state
+        iib_build_polls (histogram) by request_type
+        iib_build_duration_seconds (histogram) by request_type, state
+    """
+
+    _HELP = {
+        "iib_request_duration_seconds": (
+            "histogram",
+            "Duration of HTTP requests to IIB including retries",
+        ),
+        "iib_request_retries_total": ("counter", "Number of retried HTTP requests"),
+        "iib_response_bytes_total": ("counter", "Size of received response bodies"),
+        "iib_response_compressed_bytes_total": (
+            "counter",
+            "Size of response bodies received over the wire",
+        ),
+        "iib_response_uncompressed_bytes_total": (
+            "counter",
+            "Size of decompressed response bodies",
+        ),
+        "iib_decode_duration_seconds": (
+            "histogram",
+            "Duration of decoding response bodies",
+        ),
+        "iib_model_duration_seconds": (
+            "histogram",
+            "Duration of creating models from decoded data",
+        ),
+        "iib_polls_total": ("counter", "Number of build polls"),
+        "iib_build_polls": ("histogram", "Number of polls until build finished"),
+        "iib_build_duration_seconds": (
+            "histogram",
+            "Time from creation of build to terminal state",
+        ),
+    }
+
+    def __init__(self, max_tracked_builds=MAX_TRACKED_BUILDS):
+        """
+        Args:
+            max_tracked_builds (int)
+                optional. Maximal number of unfinished builds which polls
+                are counted, polls of least recently polled builds are
+                forgotten first
+        """
+        self._lock = threading.Lock()
+        # (name, labels): value
+        self._counters = {}
+        # (name, labels): Histogram
+        self._histograms = {}
+        # build id: number of polls of unfinished build, least recently
+        # polled first
+        self._polls = OrderedDict()
+        self.max_tracked_builds = max_tracked_builds
+
+    def _inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name, labels, value, buckets=DEFAULT_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def counter(self, name, **labels):
+        """Return value of counter with given labels"""
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name, **labels):
+        """Return Histogram with given labels or None"""
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def request(self, method, endpoint, status, seconds, retries, size):
+        self._observe(
+            "iib_request_duration_seconds",
+            {
+                "method": method,
+                "endpoint": endpoint,
+                "status": str(status) if status else "error",
+            },
+            seconds,
+        )
+        if retries:
+            self._inc(
+                "iib_request_retries_total",
+                {"method": method, "endpoint": endpoint},
+                retries,
+            )
+        if size:
+            self._inc("iib_response_bytes_total", {"endpoint": endpoint}, size)
+
+    def transfer(self, endpoint, encoding, compressed, uncompressed):
+        labels = {"endpoint": endpoint, "encoding": encoding}
+        self._inc("iib_response_compressed_bytes_total", labels, compressed)
+        self._inc("iib_response_uncompressed_bytes_total", labels, uncompressed)
+
+    def decode(self, seconds, size):
+        self._observe("iib_decode_duration_seconds", {}, seconds)
+
+    def model(self, request_type, seconds):
+        self._observe(
+            "iib_model_duration_seconds", {"request_type": request_type}, seconds
+        )
+
+    def poll(self, bid, state):
+        self._inc("iib_polls_total", {"state": state or "error"})
+        with self._lock:
+            self._polls[bid] = self._polls.pop(bid, 0) + 1
+            while len(self._polls) > self.max_tracked_builds:
+                self._polls.popitem(last=False)
+
+    def finished(self, bid, request_type, state, seconds):
+        with self._lock:
+            polls = self._polls.pop(bid, 0)
+        self._observe(
+            "iib_build_polls", {"request_type": request_type}, polls, POLL_BUCKETS
+        )
+        if seconds is not None:
+            self._observe(
+                "iib_build_duration_seconds",
+                {"request_type": request_type, "state": state},
+                seconds,
+                BUILD_DURATION_BUCKETS,
+            )
+
+    def prometheus_text(self):
+        """
+        Return metrics in Prometheus text exposition format
+
+        Returns:
+            str
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.count, h.sum))
+                for key, h in self._histograms.items()
+            )
+        lines = []
+        described = set()
+
+        def _describe(name):
+            if name not in described:
+                described.add(name)
+                kind, text = self._HELP[name]
+                lines.append("# HELP %s %s" % (name, text))
+                lines.append("# TYPE %s %s" % (name, kind))
+
+        for (name, labels), value in counters:
+            _describe(name)
+            lines.append("%s%s %s" % (name, _format_labels(labels), value))
+        for (name, labels), (buckets, counts, count, total) in histograms:
+            _describe(name)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(
+                    "%s_bucket%s %d"
+                    % (name, _format_labels(labels, [("le", bound)]), bucket_count)
+                )
+            lines.append(
+                "%s_bucket%s %d"
+                % (name, _format_labels(labels, [("le", "+Inf")]), count)
+            )
+            lines.append(
+                "%s_sum%s %s" % (name, _format_labels(labels), _format_value(total))
+            )
+            lines.append("%s_count%s %d" % (name, _format_labels(labels), count))
+        return "\n".join(lines) + "\n"
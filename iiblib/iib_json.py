@@ -0,0 +1,197 @@
+import codecs
+import importlib
+import json
+import threading
+
+
+def _stdlib_loads(content):
+    if isinstance(content, bytes):
+        content = content.decode("utf-8")
+    return json.loads(content)
+
+
+# Decoders in order of preference
+_PREFERRED = ("orjson", "ujson", "json")
+
+# Available decoders, optional decoders are imported on first use
+_DECODERS = {}
+_DECODERS_LOCK = threading.Lock()
+
+
+def _decoders():
+    with _DECODERS_LOCK:
+        if not _DECODERS:
+            for name in _PREFERRED[:-1]:
+                try:
+                    _DECODERS[name] = importlib.import_module(name).loads
+                except ImportError:  # pragma: no cover
+                    pass
+            _DECODERS["json"] = _stdlib_loads
+    return _DECODERS
+
+
+def available_decoders():
+    """Return names of JSON decoders usable in current environment
+
+    Returns:
+        list of decoder names ordered by preference
+    """
+    decoders = _decoders()
+    return [name for name in _PREFERRED if name in decoders]
+
+
+def get_decoder(decoder=None):
+    """Return callable decoding JSON document from bytes or str
+
+    Args:
+        decoder (str or callable)
+            optional. Name of decoder ("orjson", "ujson" or "json") or
+            callable accepting bytes and returning decoded document.
+            The fastest installed decoder is used when not specified.
+
+    Raises:
+        ValueError when requested decoder is not available
+
+    Returns:
+        callable
+    """
+    if callable(decoder):
+        return decoder
+    if decoder is None:
+        decoder = available_decoders()[0]
+    decoders = _decoders()
+    if decoder not in decoders:
+        raise ValueError(
+            "JSON decoder %s is not available. Available decoders: %s"
+            % (decoder, ", ".join(available_decoders()))
+        )
+    return decoders[decoder]
+
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class _StreamReader(object):
+    """Reader of JSON tokens from iterable of byte chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self, size):
+        """Read chunks until buffer holds at least size unconsumed characters"""
+        parts = [self.buf[self.pos :]]
+        length = len(parts[0])
+        while length < size and not self.eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                parts.append(self._text_decoder.decode(b"", final=True))
+                self.eof = True
+            else:
+                text = self._text_decoder.decode(chunk)
+                parts.append(text)
+                length += len(text)
+        # drop already consumed data
+        self.buf = "".join(parts)
+        self.pos = 0
+
+    def peek(self):
+        """Return next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._read(1)
+
+    def next_char(self):
+        """Consume and return next non-whitespace character"""
+        char = self.peek()
+        if not char:
+            raise ValueError("Unexpected end of JSON document")
+        self.pos += 1
+        return char
+
+    def expect(self, expected):
+        char = self.next_char()
+        if char != expected:
+            raise ValueError(
+                "Expected %r at position %d, found %r" % (expected, self.pos - 1, char)
+            )
+
+    def value(self):
+        """Consume and return next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                self._read((len(self.buf) - self.pos) * 2)
+                continue
+            # value not followed by a delimiter may be a truncated number
+            if not self.eof and (
+                end == len(self.buf) or self.buf[end] not in _DELIMITERS
+            ):
+                self._read((len(self.buf) - self.pos) * 2)
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_object(chunks, stream_key):
+    """Incrementally parse top level JSON object from chunks of bytes
+
+    Values of the object are yielded as (key, value) tuples. If value of
+    stream_key is an array, its elements are yielded one by one as
+    (stream_key, element) tuples instead, so only single element is held in
+    memory at once.
+
+    Args:
+        chunks (iterable)
+            Iterable of bytes, e.g. requests.Response.iter_content()
+        stream_key (str)
+            Key of array which elements should be yielded one by one
+
+    Raises:
+        ValueError when chunks don't contain valid JSON object
+
+    Yields:
+        tuple of (key, value)
+    """
+    reader = _StreamReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError("Expected object key, found %r" % (key,))
+        reader.expect(":")
+        if key == stream_key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.value()
+                    char = reader.next_char()
+                    if char == "]":
+                        break
+                    if char != ",":
+                        raise ValueError("Expected ',' or ']', found %r" % char)
+        else:
+            yield key, reader.value()
+        char = reader.next_char()
+        if char == "}":
+            return
+        if char != ",":
+            raise ValueError("Expected ',' or '}', found %r" % char)
@@ -0,0 +1,349 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+
+from .iib_build_details_model import IIBBuildDetailsModel
+from .iib_client import IIBException
+
+_TERMINAL_STATES = ("complete", "failed")
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class IIBNotificationSource(object):
+    """
+    Source of build state change notifications
+
+    Subclasses deliver raw json data of builds, e.g. consumed from message
+    bus, received by webhook or returned by long-poll endpoint, to the
+    callback given to start. Callback may be called from any thread and
+    raises ValueError or KeyError when data isn't valid build.
+    """
+
+    def start(self, callback):
+        """
+        Start delivering notifications
+
+        Args:
+            callback (callable)
+                Function called with raw json data of every changed build
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        """Stop delivering notifications"""
+        raise NotImplementedError
+
+
+class LocalBroker(IIBNotificationSource):
+    """
+    In-process notification broker
+
+    Notifications published to the broker are delivered synchronously to
+    all started consumers. Useful in tests and as a bridge from notification
+    transports which are not implemented by iiblib.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def start(self, callback):
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def stop(self):
+        with self._lock:
+            self._callbacks = []
+
+    def publish(self, data):
+        """
+        Deliver notification to all consumers
+
+        Args:
+            data (dict or IIBBuildDetailsModel)
+                Raw json data or model of changed build
+        """
+        if isinstance(data, IIBBuildDetailsModel):
+            data = data.to_dict()
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(data)
+
+
+class IIBBuildWatcher(object):
+    """
+    Waiter for builds resolved by notifications
+
+    Waiters are woken as soon as notification with terminal state of the
+    build arrives. Notifications aren't trusted, the terminal state is
+    confirmed by IIBClient.get_build before waiters are resolved and only
+    confirmed builds are recorded by the client. While the notification channel is quiet, builds are
+    polled by IIBClient.poll_build once per quiet_interval, so a broken
+    channel only delays the waiters. Builds are also polled at least once
+    per max_poll_interval even when notifications of other builds keep
+    coming, to pick up lost notifications.
+
+    Example:
+        broker = LocalBroker()
+        with IIBBuildWatcher(client, broker) as watcher:
+            build = watcher.wait_for_build(client.add_bundles(...))
+    """
+
+    def __init__(
+        self,
+        client,
+        source,
+        quiet_interval=None,
+        max_poll_interval=None,
+        clock=time.monotonic,
+    ):
+        """
+        Args:
+            client (IIBClient)
+                Client used to poll builds and create models
+            source (IIBNotificationSource)
+                Source of notifications
+            quiet_interval (int)
+                optional. Number of seconds without any notification after
+                which the channel is considered quiet and builds are polled.
+                Defaults to client's poll_interval.
+            max_poll_interval (int)
+                optional. Maximal number of seconds between polls of waited
+                builds, defaults to ten quiet intervals
+            clock (callable)
+                optional. Monotonic clock returning seconds
+        """
+        self.client = client
+        self.source = source
+        if quiet_interval is None:
+            quiet_interval = client.poll_interval
+        self.quiet_interval = quiet_interval
+        if max_poll_interval is None:
+            max_poll_interval = 10 * quiet_interval
+        self.max_poll_interval = max_poll_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # build id: list of callbacks waiting for terminal state
+        self._subscribers = {}
+        self._last_notification = None
+
+    def start(self):
+        """Start receiving notifications from the source"""
+        self.source.start(self.notify)
+
+    def stop(self):
+        """Stop receiving notifications from the source"""
+        self.source.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def notify(self, data):
+        """
+        Process notification about changed build
+
+        Notified data only wakes waiters of the build, the build is fetched
+        from IIB and waiters are resolved when it's really finished.
+
+        Args:
+            data (dict)
+                Raw json data of the build
+
+        Raises:
+            KeyError or ValueError when data isn't valid build
+        """
+        # pylint: disable=protected-access
+        build = self.client._model(IIBBuildDetailsModel, data)
+        with self._lock:
+            self._last_notification = self._clock()
+            waited = build.id in self._subscribers
+        if waited and build.state in _TERMINAL_STATES:
+            self._confirm(build.id)
+
+    def _confirm(self, bid):
+        """Fetch notified build and resolve its waiters when it's finished"""
+        try:
+            build = self.client.get_build(bid)
+        except (IIBException, requests.exceptions.RequestException):
+            # waiters are resolved by polling fallback
+            return
+        if build.state in _TERMINAL_STATES:
+            self.resolve(build)
+
+    def quiet(self):
+        """
+        Check if no notification arrived for quiet_interval
+
+        Returns:
+            bool
+        """
+        with self._lock:
+            last = self._last_notification
+        return last is None or self._clock() - last >= self.quiet_interval
+
+    def subscribe(self, bid, callback):
+        """
+        Call callback once the build reaches terminal state
+
+        Args:
+            bid (int)
+                Build id
+            callback (callable)
+                Function called with finished IIBBuildDetailsModel
+        """
+        with self._lock:
+            self._subscribers.setdefault(bid, []).append(callback)
+
+    def unsubscribe(self, bid, callback):
+        """
+        Remove callback registered by subscribe
+
+        Args:
+            bid (int)
+                Build id
+            callback (callable)
+                Registered callback
+        """
+        with self._lock:
+            callbacks = self._subscribers.get(bid, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscribers.pop(bid, None)
+
+    def future(self, bid):
+        """
+        Return future resolved once the build reaches terminal state
+
+        Future is resolved only by notifications and resolve, the build
+        isn't polled.
+
+        Args:
+            bid (int)
+                Build id
+
+        Returns:
+            concurrent.futures.Future with finished IIBBuildDetailsModel
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.subscribe(bid, future.set_result)
+        return future
+
+    def resolve(self, build):
+        """
+        Resolve waiters of finished build fetched by other means
+
+        Args:
+            build (IIBBuildDetailsModel)
+                Build in terminal state
+        """
+        with self._lock:
+            callbacks = self._subscribers.pop(build.id, [])
+        for callback in callbacks:
+            callback(build)
+
+    def _poll(self, bids):
+        for bid in bids:
+            build = self.client.poll_build(bid)
+            if build is not None and build.state in _TERMINAL_STATES:
+                self.resolve(build)
+
+    def _wait(self, event, seconds):
+        """Wait for event and report the wait to client's instrumentation"""
+        if self.client.instrumentation is None:
+            return event.wait(seconds)
+        start = time.perf_counter()
+        ret = event.wait(seconds)
+        self.client.instrumentation.sleep(time.perf_counter() - start, "notification")
+        return ret
+
+    def wait_for_builds(self, builds, timeout=None):
+        """
+        Wait until all given builds are finished
+
+        Builds are polled once when waiting starts, then only while the
+        notification channel is quiet or once per max_poll_interval.
+
+        Args:
+            builds (list)
+                List of `IIBBuildDetailsModel` instances
+            timeout (int)
+                optional. Maximal number of seconds to wait, defaults to
+                client's wait_for_build_timeout
+
+        Raises:
+            IIBException when timeout was reached
+
+        Returns:
+            list of finished `IIBBuildDetailsModel` instances in the same
+            order as given builds
+        """
+        if timeout is None:
+            timeout = self.client.wait_for_build_timeout
+        deadline = time.time() + timeout
+        bids = []
+        for build in builds:
+            if build.id not in bids:
+                bids.append(build.id)
+        results = {}
+        event = threading.Event()
+        lock = threading.Lock()
+
+        def _resolved(build):
+            with lock:
+                results[build.id] = build
+            event.set()
+
+        # subscribe before the first poll, so no notification is missed
+        for bid in bids:
+            self.subscribe(bid, _resolved)
+        try:
+            self._poll(bids)
+            polled = self._clock()
+            while True:
+                event.clear()
+                with lock:
+                    pending = [bid for bid in bids if bid not in results]
+                if not pending:
+                    return [results[build.id] for build in builds]
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise IIBException(
+                        "Timeout reached. Build requests %s were not processed in %d seconds."
+                        % (", ".join(str(bid) for bid in pending), timeout),
+                    )
+                if self._wait(event, min(remaining, self.quiet_interval)):
+                    continue
+                if self.quiet() or (self._clock() - polled >= self.max_poll_interval):
+                    self._poll(pending)
+                    polled = self._clock()
+        finally:
+            for bid in bids:
+                self.unsubscribe(bid, _resolved)
+
+    def wait_for_build(self, build, timeout=None):
+        """
+        Wait until specific build is finished
+
+        Args:
+            build (IIBBuildDetailsModel)
+                Instance of `IIBBuildDetailsModel` class
+            timeout (int)
+                optional. Maximal number of seconds to wait, defaults to
+                client's wait_for_build_timeout
+
+        Raises:
+            IIBException when timeout was reached
+
+        Returns:
+            finished `IIBBuildDetailsModel` instance
+        """
+        return self.wait_for_builds([build], timeout)[0]
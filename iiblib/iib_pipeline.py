@@ -0,0 +1,278 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .iib_client import MAX_SUBMIT_WORKERS, IIBException
+
+# IIBClient method: request type of submitted build
+OPERATIONS = {
+    "add_bundles": "add",
+    "remove_operators": "rm",
+    "regenerate_bundle": "regenerate-bundle",
+    "create_empty_index": "create-empty-index",
+    "add_deprecations": "add-deprecations",
+    "merge_index_images": "merge-index-image",
+    "fbc_operations": "fbc-operations",
+    "recursive_related_bundles": "recursive-related-bundles",
+}
+
+_TERMINAL_STATES = ("complete", "failed")
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class Upstream(object):
+    """
+    Placeholder of request argument filled from build of upstream node
+
+    Args:
+        node (str)
+            Name of upstream node
+        attr (str)
+            Attribute of upstream build model used as the value, e.g.
+            "index_image_resolved" or "bundle_image"
+    """
+
+    def __init__(self, node, attr):
+        self.node = node
+        self.attr = attr
+
+    def __repr__(self):
+        return "Upstream(%r, %r)" % (self.node, self.attr)
+
+
+def _upstream_nodes(value):
+    """Return names of nodes referenced by Upstream placeholders in value"""
+    if isinstance(value, Upstream):
+        return [value.node]
+    if isinstance(value, (list, tuple)):
+        return [node for item in value for node in _upstream_nodes(item)]
+    if isinstance(value, dict):
+        return [node for item in value.values() for node in _upstream_nodes(item)]
+    return []
+
+
+def _resolve(value, builds):
+    """Replace Upstream placeholders in value by attributes of upstream builds"""
+    if isinstance(value, Upstream):
+        return getattr(builds[value.node], value.attr)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_resolve(item, builds) for item in value)
+    if isinstance(value, dict):
+        return dict((key, _resolve(item, builds)) for key, item in value.items())
+    return value
+
+
+class PipelineNode(object):
+    """
+    Single IIB operation of a pipeline
+
+    Args:
+        name (str)
+            Unique name of the node
+        operation (str)
+            Name of IIBClient method submitting the build, see OPERATIONS
+        kwargs (dict)
+            Arguments of the operation, may contain Upstream placeholders
+        depends_on (list)
+            Names of nodes which has to be complete before this one starts
+        state (str)
+            One of "pending", "in_progress", "complete", "failed" or
+            "cancelled"
+        build (IIBBuildDetailsModel)
+            Last known state of submitted build, None if not submitted
+        error (Exception)
+            Exception raised by submission, None if there wasn't any
+    """
+
+    def __init__(self, name, operation, kwargs, depends_on):
+        self.name = name
+        self.operation = operation
+        self.request_type = OPERATIONS[operation]
+        self.kwargs = kwargs
+        self.depends_on = depends_on
+        self.state = "pending"
+        self.build = None
+        self.error = None
+
+    def __repr__(self):
+        return "<PipelineNode %s %s %s>" % (self.name, self.operation, self.state)
+
+
+class IIBPipeline(object):
+    """
+    Scheduler of dependent IIB operations
+
+    Every node is submitted as soon as all nodes it depends on are complete.
+    Arguments of the node can reference output of upstream builds with
+    Upstream placeholders. When a build fails or its submission raises,
+    all nodes depending on it are cancelled without being submitted.
+
+    Example:
+        pipeline = IIBPipeline(client, concurrency={"add": 5})
+        pipeline.add("regen", "regenerate_bundle", bundle_image=bundle)
+        for index in indexes:
+            pipeline.add(
+                index,
+                "add_bundles",
+                index_image=index,
+                bundles=[Upstream("regen", "bundle_image")],
+                arches=["x86_64"],
+            )
+        nodes = pipeline.run()
+    """
+
+    def __init__(self, client, concurrency=None, max_workers=None):
+        """
+        Args:
+            client (IIBClient)
+                Client used to submit and poll builds
+            concurrency (dict)
+                optional. Maximal number of unfinished builds per request
+                type, e.g. {"add": 5}. Request types which are not listed
+                are not limited.
+            max_workers (int)
+                optional. Maximal number of concurrently submitted requests,
+                defaults to MAX_SUBMIT_WORKERS
+        """
+        self.client = client
+        self.concurrency = concurrency or {}
+        self.max_workers = max_workers
+        self.nodes = {}
+
+    def add(self, name, operation, depends_on=None, **kwargs):
+        """
+        Add operation to the pipeline
+
+        Nodes referenced by Upstream placeholders in kwargs are added to
+        depends_on automatically. Nodes can depend only on already added
+        nodes, so the pipeline can't contain cycles.
+
+        Args:
+            name (str)
+                Unique name of the node
+            operation (str)
+                Name of IIBClient method submitting the build, see OPERATIONS
+            depends_on (list)
+                optional. Names of nodes which has to be complete before
+                this one is submitted
+            kwargs
+                Arguments of the operation
+
+        Raises:
+            ValueError when name is not unique, operation is unknown or
+            the node depends on unknown node
+
+        Returns:
+            PipelineNode
+        """
+        if name in self.nodes:
+            raise ValueError("Node %s already exists." % name)
+        if operation not in OPERATIONS:
+            raise ValueError(
+                "Unknown operation: %s. Known operations: %s"
+                % (operation, ", ".join(sorted(OPERATIONS)))
+            )
+        dependencies = list(depends_on or [])
+        for node in _upstream_nodes(kwargs):
+            if node not in dependencies:
+                dependencies.append(node)
+        for node in dependencies:
+            if node not in self.nodes:
+                raise ValueError("Node %s depends on unknown node %s." % (name, node))
+        self.nodes[name] = PipelineNode(name, operation, kwargs, dependencies)
+        return self.nodes[name]
+
+    def _cancel_downstream(self):
+        """Cancel pending nodes depending on failed or cancelled node"""
+        for node in self.nodes.values():
+            # nodes are ordered topologically, one pass is enough
+            if node.state == "pending" and any(
+                self.nodes[dep].state in ("failed", "cancelled")
+                for dep in node.depends_on
+            ):
+                node.state = "cancelled"
+
+    def _ready_nodes(self):
+        """Return pending nodes which can be submitted now"""
+        in_flight = {}
+        for node in self.nodes.values():
+            if node.state == "in_progress":
+                in_flight[node.request_type] = in_flight.get(node.request_type, 0) + 1
+        ready = []
+        for node in self.nodes.values():
+            if node.state != "pending" or any(
+                self.nodes[dep].state != "complete" for dep in node.depends_on
+            ):
+                continue
+            limit = self.concurrency.get(node.request_type)
+            if limit is not None and in_flight.get(node.request_type, 0) >= limit:
+                continue
+            in_flight[node.request_type] = in_flight.get(node.request_type, 0) + 1
+            ready.append(node)
+        return ready
+
+    def _update(self, node, build):
+        node.build = build
+        node.state = build.state if build.state in _TERMINAL_STATES else "in_progress"
+
+    def _submit(self, node):
+        builds = dict((dep, self.nodes[dep].build) for dep in node.depends_on)
+        try:
+            kwargs = _resolve(node.kwargs, builds)
+            build = getattr(self.client, node.operation)(**kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            node.error = exc
+            node.state = "failed"
+            return
+        self._update(node, build)
+
+    def run(self, timeout=None):
+        """
+        Run the pipeline until all nodes are finished or cancelled
+
+        Unfinished builds are polled once per client's poll_interval. Polls
+        rejected by open circuit breaker of the client are skipped.
+
+        Args:
+            timeout (int)
+                optional. Maximal number of seconds to wait for the pipeline.
+                Defaults to client's wait_for_build_timeout.
+
+        Raises:
+            IIBException when timeout was reached
+
+        Returns:
+            dict of node name: PipelineNode
+        """
+        if timeout is None:
+            timeout = self.client.wait_for_build_timeout
+        deadline = time.time() + timeout
+        while True:
+            # submit until nothing else can start, results of cached
+            # requests are complete immediately
+            ready = self._ready_nodes()
+            while ready:
+                if len(ready) == 1:
+                    self._submit(ready[0])
+                else:
+                    workers = min(len(ready), self.max_workers or MAX_SUBMIT_WORKERS)
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        list(pool.map(self._submit, ready))
+                self._cancel_downstream()
+                ready = self._ready_nodes()
+
+            pending = [
+                node for node in self.nodes.values() if node.state == "in_progress"
+            ]
+            if not pending:
+                return self.nodes
+            if time.time() >= deadline:
+                raise IIBException(
+                    "Timeout reached. Pipeline nodes %s were not finished in %d seconds."
+                    % (", ".join(node.name for node in pending), timeout)
+                )
+            self.client.sleep(self.client.poll_interval, "poll")
+            for node in pending:
+                build = self.client.poll_build(node.build.id)
+                if build is not None:
+                    self._update(node, build)
+            self._cancel_downstream()
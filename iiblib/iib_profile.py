@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+
+from .iib_instrumentation import IIBInstrumentation
+
+
+class IIBProfiler(IIBInstrumentation):
+    """
+    Instrumentation recording timeline of client activity
+
+    Every request, authentication, retry, sleep, response decoding and
+    model creation is recorded as trace event. Trace can be written in
+    Chrome trace event format and opened in chrome://tracing or Perfetto.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        """
+        Args:
+            clock (callable)
+                optional. Monotonic clock returning seconds
+        """
+        self._clock = clock
+        self._start = clock()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.events = []
+
+    def _now(self):
+        return (self._clock() - self._start) * 1e6
+
+    def _complete(self, name, category, seconds, args=None):
+        """Record event which ended now and lasted given number of seconds"""
+        duration = seconds * 1e6
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round(self._now() - duration, 3),
+            "dur": round(duration, 3),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def _instant(self, name, category, args=None):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": round(self._now(), 3),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def request(self, method, endpoint, status, seconds, retries, size):
+        args = {"status": status}
+        if retries:
+            args["retries"] = retries
+        if size is not None:
+            args["size"] = size
+        self._complete("%s %s" % (method, endpoint), "http", seconds, args)
+
+    def decode(self, seconds, size):
+        self._complete("decode", "parse", seconds, {"size": size})
+
+    def model(self, request_type, seconds):
+        self._complete("model %s" % request_type, "parse", seconds)
+
+    def auth(self, seconds):
+        self._complete("auth", "auth", seconds)
+
+    def retry(self, endpoint, attempt, reason):
+        self._instant(
+            "retry %s" % endpoint, "retry", {"attempt": attempt, "reason": reason}
+        )
+
+    def sleep(self, seconds, reason):
+        self._complete("sleep %s" % reason, "sleep", seconds)
+
+    def poll(self, bid, state):
+        self._instant("poll %s" % bid, "poll", {"state": state})
+
+    def finished(self, bid, request_type, state, seconds):
+        self._instant(
+            "finished %s" % bid,
+            "poll",
+            {"request_type": request_type, "state": state, "seconds": seconds},
+        )
+
+    def trace(self):
+        """
+        Return recorded events in Chrome trace event format
+
+        Returns:
+            dict with "traceEvents" key
+        """
+        with self._lock:
+            events = list(self.events)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, destination):
+        """
+        Write trace as compact JSON
+
+        Args:
+            destination (str or file)
+                Path or text file object of the trace
+        """
+        data = json.dumps(self.trace(), separators=(",", ":"))
+        if isinstance(destination, str):
+            with open(destination, "w") as fobj:
+                fobj.write(data)
+        else:
+            destination.write(data)
@@ -0,0 +1,251 @@
+import threading
+import time
+
+from .iib_session import normalize_endpoint
+
+_TERMINAL_STATES = ("complete", "failed")
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class TokenBucket(object):
+    """
+    Thread safe token bucket
+
+    Bucket holds up to burst tokens and is refilled by rate tokens per
+    second. Every request takes one token and waits when there is none.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate (float)
+                Number of tokens added per second
+            burst (int)
+                optional. Capacity of the bucket, defaults to max(1, rate)
+            clock (callable)
+                optional. Monotonic clock returning seconds
+            sleep (callable)
+                optional. Function sleeping given number of seconds
+        """
+        if rate <= 0:
+            raise ValueError("Rate has to be positive.")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take one token and return number of seconds to wait for it"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # token is taken even when it's not available yet, so waiting
+            # threads are served in order they came
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """
+        Wait until token is available and take it
+
+        Returns:
+            float number of seconds spent waiting
+        """
+        delay = self._reserve()
+        if delay:
+            self._sleep(delay)
+        return delay
+
+
+class IIBRateLimiter(object):
+    """
+    Rate limiter and governor of in-flight builds
+
+    Requests to endpoints listed in rate_limits are throttled by token
+    buckets. Builds submitted through IIBClient are tracked until they
+    reach terminal state and new submissions of request types listed in
+    max_in_flight wait until number of unfinished builds of that type drops
+    under the limit.
+    """
+
+    def __init__(self, rate_limits=None, max_in_flight=None):
+        """
+        Args:
+            rate_limits (dict)
+                optional. Normalized endpoint (e.g. "builds/add" or
+                "builds/<id>"): rate in requests per second or (rate, burst)
+                tuple. Key "*" sets rate shared by all requests.
+            max_in_flight (dict)
+                optional. Request type (e.g. "add"): maximal number of
+                unfinished builds. Key "*" limits unfinished builds of all
+                request types together.
+        """
+        self.buckets = {}
+        for endpoint, limit in (rate_limits or {}).items():
+            if not isinstance(limit, (tuple, list)):
+                limit = (limit,)
+            self.buckets[endpoint] = TokenBucket(*limit)
+        self.max_in_flight = dict(max_in_flight or {})
+        # build id: request type of tracked builds
+        self._in_flight = {}
+        # request type: number of submissions waiting for response
+        self._reserved = {}
+        self._cond = threading.Condition()
+        # single waiter refreshes tracked builds once per poll interval
+        self._refreshing = False
+        self._refreshed = None
+
+    def throttle(self, endpoint):
+        """
+        Wait until request to endpoint is allowed by rate limits
+
+        Args:
+            endpoint (str)
+                API endpoint of the request
+
+        Returns:
+            float number of seconds spent waiting
+        """
+        waited = 0
+        for key in ("*", normalize_endpoint(endpoint)):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                waited += bucket.acquire()
+        return waited
+
+    def _count(self, request_type):
+        if request_type == "*":
+            return len(self._in_flight) + sum(self._reserved.values())
+        return self._reserved.get(request_type, 0) + sum(
+            1 for value in self._in_flight.values() if value == request_type
+        )
+
+    def _has_slot(self, request_type):
+        for key in ("*", request_type):
+            limit = self.max_in_flight.get(key)
+            if limit is not None and self._count(key) >= limit:
+                return False
+        return True
+
+    def in_flight(self, request_type=None):
+        """
+        Return ids of tracked unfinished builds
+
+        Args:
+            request_type (str)
+                optional. Return only builds of this request type
+
+        Returns:
+            list of build ids
+        """
+        with self._cond:
+            return [
+                bid
+                for bid, value in self._in_flight.items()
+                if request_type in (None, "*", value)
+            ]
+
+    def reserve(self, request_type, refresh=None, timeout=None, poll_interval=30):
+        """
+        Wait for free slot of request type and reserve it
+
+        Args:
+            request_type (str)
+                Request type of build which is going to be submitted
+            refresh (callable)
+                optional. Called when there is no free slot. It's expected
+                to fetch tracked builds and report their state by update.
+                It's called by one of waiting threads at most once per
+                poll_interval, other threads wait for its updates.
+            timeout (int)
+                optional. Maximal number of seconds to wait
+            poll_interval (int)
+                optional. Number of seconds between calls of refresh
+
+        Returns:
+            bool True when slot was reserved, False when timeout was reached
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._cond:
+                if self._has_slot(request_type):
+                    self._reserved[request_type] = (
+                        self._reserved.get(request_type, 0) + 1
+                    )
+                    return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            if refresh is not None and self._start_refresh(poll_interval):
+                try:
+                    refresh()
+                finally:
+                    with self._cond:
+                        self._refreshing = False
+                        self._refreshed = time.monotonic()
+                        self._cond.notify_all()
+            with self._cond:
+                if not self._has_slot(request_type):
+                    self._cond.wait(poll_interval)
+
+    def _start_refresh(self, poll_interval):
+        """Return True when calling thread should refresh tracked builds"""
+        with self._cond:
+            if self._refreshing:
+                return False
+            if (
+                self._refreshed is not None
+                and time.monotonic() - self._refreshed < poll_interval
+            ):
+                return False
+            self._refreshing = True
+            return True
+
+    def release(self, request_type):
+        """
+        Release reserved slot when submission failed
+
+        Args:
+            request_type (str)
+                Request type of the reservation
+        """
+        with self._cond:
+            self._reserved[request_type] -= 1
+            self._cond.notify_all()
+
+    def submitted(self, request_type, data):
+        """
+        Replace reservation by tracked build
+
+        Args:
+            request_type (str)
+                Request type of the reservation
+            data (dict)
+                Raw json data of submitted build
+        """
+        with self._cond:
+            self._reserved[request_type] -= 1
+            if data.get("state") not in _TERMINAL_STATES:
+                self._in_flight[data["id"]] = request_type
+            self._cond.notify_all()
+
+    def update(self, data):
+        """
+        Stop tracking build which reached terminal state
+
+        Args:
+            data (dict)
+                Raw json data of a build
+        """
+        if data.get("state") not in _TERMINAL_STATES:
+            return
+        with self._cond:
+            if self._in_flight.pop(data.get("id"), None) is not None:
+                self._cond.notify_all()
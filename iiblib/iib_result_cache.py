@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+
+from .iib_build_details_model import IIBBuildDetailsModel
+
+
+def digest_of(pull_spec):
+    """Return digest of pull spec pinned by digest
+
+    Args:
+        pull_spec (str)
+            Image pull spec, e.g. "registry.example.com/repo@sha256:abcd"
+
+    Returns:
+        str digest, e.g. "sha256:abcd", or None when pull spec is not
+        pinned by digest
+    """
+    if not pull_spec or "@" not in pull_spec:
+        return None
+    digest = pull_spec.rsplit("@", 1)[1]
+    if ":" not in digest:
+        return None
+    return digest
+
+
+def pinned_digest_resolver(pull_spec):
+    """Resolve only pull specs already pinned by digest
+
+    Default digest resolver of IIBResultCache. Pull specs referencing tags
+    can't be resolved without querying registry, so they are never found in
+    cache.
+
+    Args:
+        pull_spec (str)
+            Image pull spec
+
+    Returns:
+        str digest or None
+    """
+    return digest_of(pull_spec)
+
+
+class IIBResultCache(object):
+    """
+    Store of finished build results keyed by digest of their input image
+
+    Only builds in "complete" state of request types listed in CACHEABLE
+    are stored. Results are keyed by request type, digest of resolved input
+    image and request parameters which influence the result.
+    """
+
+    # request type: (input image attribute, resolved input image attribute,
+    #                parameters influencing result)
+    CACHEABLE = {
+        "recursive-related-bundles": (
+            "parent_bundle_image",
+            "parent_bundle_image_resolved",
+            ("organization",),
+        ),
+        "regenerate-bundle": (
+            "from_bundle_image",
+            "from_bundle_image_resolved",
+            ("organization",),
+        ),
+    }
+
+    def __init__(self, digest_resolver=None, path=None):
+        """
+        Args:
+            digest_resolver (callable)
+                optional. Callable returning digest (e.g. "sha256:abcd") of
+                given pull spec or None when it can't be resolved.
+                Defaults to pinned_digest_resolver.
+            path (str)
+                optional. Path of JSON file where results are persisted, so
+                they can be reused by other processes.
+        """
+        self.digest_resolver = digest_resolver or pinned_digest_resolver
+        self.path = path
+        self._results = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as fobj:
+                for build in json.load(fobj):
+                    self._store(build)
+
+    def __len__(self):
+        return len(self._results)
+
+    def _key(self, request_type, digest, params):
+        param_names = self.CACHEABLE[request_type][2]
+        return (request_type, digest) + tuple(
+            params.get(name) or None for name in param_names
+        )
+
+    def lookup(self, request_type, pull_spec, **params):
+        """
+        Return result of finished build for given input image
+
+        Args:
+            request_type (str)
+                Request type of the build
+            pull_spec (str)
+                Pull spec of input image, it's resolved to digest by
+                digest_resolver
+            params
+                Parameters of the request influencing its result
+
+        Returns:
+            IIBBuildDetailsModel or None when there is no such result
+        """
+        if request_type not in self.CACHEABLE:
+            return None
+        digest = self.digest_resolver(pull_spec)
+        if not digest:
+            return None
+        with self._lock:
+            data = self._results.get(self._key(request_type, digest, params))
+        if data is None:
+            return None
+        return IIBBuildDetailsModel.from_dict(data)
+
+    def _store(self, data):
+        cacheable = self.CACHEABLE.get(data.get("request_type"))
+        if not cacheable or data.get("state") != "complete":
+            return False
+        digest = digest_of(data.get(cacheable[1]))
+        if not digest:
+            return False
+        key = self._key(data["request_type"], digest, data)
+        with self._lock:
+            if self._results.get(key) == data:
+                return False
+            self._results[key] = data
+        return True
+
+    def store(self, build):
+        """
+        Store result of a build
+
+        Args:
+            build (IIBBuildDetailsModel or dict)
+                Build model or raw json build data
+
+        Returns:
+            bool True if build was stored and wasn't stored before
+        """
+        if isinstance(build, IIBBuildDetailsModel):
+            build = build.to_dict()
+        stored = self._store(build)
+        if stored and self.path:
+            self.save()
+        return stored
+
+    def store_many(self, builds):
+        """
+        Store results of many builds
+
+        Results are persisted to path only once after all builds are stored.
+
+        Args:
+            builds (iterable)
+                Iterable of IIBBuildDetailsModel instances or raw json build data
+
+        Returns:
+            int number of builds which weren't stored before
+        """
+        stored = 0
+        for build in builds:
+            if isinstance(build, IIBBuildDetailsModel):
+                build = build.to_dict()
+            stored += self._store(build)
+        if stored and self.path:
+            self.save()
+        return stored
+
+    def save(self):
+        """Persist stored results to path"""
+        with self._lock:
+            builds = list(self._results.values())
+        tmp_path = "%s.tmp" % self.path
+        with open(tmp_path, "w") as fobj:
+            json.dump(builds, fobj)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,214 @@
+import email.utils
+import time
+
+import requests
+from requests.packages.urllib3.exceptions import (
+    ConnectTimeoutError,
+    MaxRetryError,
+    NewConnectionError,
+)
+from requests.packages.urllib3.util.retry import Retry
+
+from .iib_timestamps import build_times
+
+# Methods which can be safely repeated
+IDEMPOTENT_METHODS = frozenset(["DELETE", "GET", "HEAD", "OPTIONS", "PUT", "TRACE"])
+
+# Statuses telling the request was rejected and may be repeated later
+RETRY_AFTER_STATUSES = frozenset([429, 503])
+
+# Request fields which are not returned in build details
+_UNMATCHED_FIELDS = frozenset(
+    [
+        "add_arches",
+        "cnr_token",
+        "overwrite_from_index_token",
+        "overwrite_target_index_token",
+    ]
+)
+
+
+def request_was_sent(error):
+    """Check if request failed by error could have been received by server
+
+    Args:
+        error (requests.exceptions.RequestException)
+            Error raised by the request
+
+    Returns:
+        bool False when connection to server couldn't be established, True
+        when the request could have been sent
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return not isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+# pylint: disable=bad-option-value,useless-object-inheritance
+class IIBRetryPolicy(object):
+    """
+    Retry policy of IIB requests
+
+    Idempotent requests are retried by urllib3 on connection errors and
+    statuses in status_forcelist, Retry-After header of 429 and 503
+    responses is honored. Failures to connect are retried by urllib3 for
+    all requests including build submissions (POST), because such request
+    never reached the server. Build submissions are repeated by IIBClient
+    only when it can't create duplicate build: after 429 or 503 response,
+    or after connection failed once the request was sent and no matching
+    build was found among builds created since the first attempt.
+    """
+
+    def __init__(
+        self,
+        retries=3,
+        backoff_factor=2,
+        status_forcelist=None,
+        post_retries=None,
+        max_retry_after=300,
+        clock_skew=60,
+        max_scan_pages=10,
+        sleep=time.sleep,
+    ):
+        """
+        Args:
+            retries (int)
+                number of http retries of idempotent requests
+            backoff_factor (int)
+                backoff factor to apply between attempts after the second try
+            status_forcelist (iterable)
+                optional. Statuses of idempotent requests to retry, defaults
+                to 429 and 500-511
+            post_retries (int)
+                optional. number of repeated build submissions, defaults to
+                retries
+            max_retry_after (int)
+                maximal number of seconds to wait for Retry-After header
+            clock_skew (int)
+                tolerated difference in seconds between local clock and IIB
+                clock when looking for already submitted builds
+            max_scan_pages (int)
+                maximal number of builds pages scanned when looking for
+                already submitted build
+            sleep (callable)
+                optional. Function sleeping given number of seconds
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        if status_forcelist is None:
+            status_forcelist = set(range(500, 512)) | set([429])
+        self.status_forcelist = frozenset(status_forcelist)
+        self.post_retries = retries if post_retries is None else post_retries
+        self.max_retry_after = max_retry_after
+        self.clock_skew = clock_skew
+        self.max_scan_pages = max_scan_pages
+        self.sleep = sleep
+
+    def urllib3_retry(self):
+        """
+        Return urllib3 Retry of idempotent requests
+
+        Returns:
+            urllib3.util.retry.Retry
+        """
+        kwargs = dict(
+            total=self.retries,
+            read=self.retries,
+            connect=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.status_forcelist,
+            respect_retry_after_header=True,
+        )
+        try:
+            return Retry(allowed_methods=IDEMPOTENT_METHODS, **kwargs)
+        except TypeError:  # pragma: no cover
+            # urllib3 < 1.26
+            return Retry(method_whitelist=IDEMPOTENT_METHODS, **kwargs)
+
+    def backoff(self, attempt):
+        """
+        Return number of seconds to wait before given attempt
+
+        Args:
+            attempt (int)
+                Number of failed attempts
+
+        Returns:
+            float
+        """
+        if attempt <= 1:
+            return 0
+        return self.backoff_factor * (2 ** (attempt - 1))
+
+    def retry_after(self, response):
+        """
+        Return number of seconds requested by Retry-After header
+
+        Args:
+            response (requests.Response)
+                Response with 429 or 503 status
+
+        Returns:
+            float or None when header is missing or invalid
+        """
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            parsed = email.utils.parsedate_tz(value)
+            if parsed is None:
+                return None
+            seconds = email.utils.mktime_tz(parsed) - time.time()
+        return min(max(seconds, 0), self.max_retry_after)
+
+    def created_since(self, build, since):
+        """
+        Check if build was created after given time
+
+        Creation time is the oldest entry of state history, builds without
+        state history are considered old.
+
+        Args:
+            build (dict)
+                Raw json data of a build
+            since (float)
+                Time in seconds since epoch
+
+        Returns:
+            bool
+        """
+        created = build_times(build.get("state_history") or [])[0]
+        return created is not None and created >= (since - self.clock_skew) * 10**6
+
+    def matches(self, request_type, post_data, build, since):
+        """
+        Check if build was created by given submission
+
+        Args:
+            request_type (str)
+                Request type of the submission
+            post_data (dict)
+                Data of the submission
+            build (dict)
+                Raw json data of a build
+            since (float)
+                Time of the first submission attempt in seconds since epoch
+
+        Returns:
+            bool
+        """
+        if build.get("request_type") != request_type:
+            return False
+        if not self.created_since(build, since):
+            return False
+        for key, value in post_data.items():
+            if key in _UNMATCHED_FIELDS or key not in build:
+                continue
+            if build[key] != value:
+                return False
+        return True
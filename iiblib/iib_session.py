@@ -1,13 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
 import requests
 from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from requests.packages.urllib3.response import HTTPResponse
+
+from .iib_retry import IIBRetryPolicy
+
+# Default number of URLs which validators of conditional requests are kept
+MAX_VALIDATORS = 1024
+
+
+def normalize_endpoint(endpoint):
+    """Return endpoint with query string removed and ids replaced by "<id>"
+
+    Args:
+        endpoint (str)
+            API specific endpoint, e.g. "builds/123?verbose=true"
+
+    Returns:
+        str normalized endpoint, e.g. "builds/<id>"
+    """
+    path = endpoint.split("?", 1)[0].strip("/")
+    return "/".join(
+        "<id>" if segment.isdigit() else segment for segment in path.split("/")
+    )
+
+
+def accept_encoding():
+    """Return Accept-Encoding of content codings urllib3 can decode
+
+    gzip and deflate are always supported, br and zstd only when urllib3
+    finds brotli and zstd modules (see "compression" extra of iiblib).
+
+    Returns:
+        str e.g. "gzip, deflate, br"
+    """
+    # x-gzip is only legacy alias of gzip
+    return ", ".join(
+        coding for coding in HTTPResponse.CONTENT_DECODERS if coding != "x-gzip"
+    )
+
+
+def _transferred_bytes(response, uncompressed):
+    """Return number of body bytes received over the wire"""
+    try:
+        received = response.raw.tell()
+    except (AttributeError, TypeError, ValueError):
+        received = None
+    if received:
+        return received
+    size = response.headers.get("Content-Length")
+    if size and size.isdigit():
+        return int(size)
+    return uncompressed
 
 
 # pylint: disable=bad-option-value,useless-object-inheritance
 class IIBSession(object):
     """Helper class to support iib requests and authentication"""
 
-    def __init__(self, hostname, retries=3, verify=True, backoff_factor=2):
+    def __init__(
+        self,
+        hostname,
+        retries=3,
+        verify=True,
+        backoff_factor=2,
+        rate_limiter=None,
+        retry_policy=None,
+        circuit_breaker=None,
+        instrumentation=None,
+        max_validators=MAX_VALIDATORS,
+    ):
         """
         Args:
             hostname (str)
@@ -18,19 +83,38 @@ class IIBSession(object):
                 enable/disable SSL verification
             backoff_factor (int)
                 backoff factor to apply between attempts after the second try
+            rate_limiter (IIBRateLimiter)
+                optional. Rate limiter throttling requests per endpoint
+            retry_policy (IIBRetryPolicy)
+                optional. Retry policy of requests, created from retries and
+                backoff_factor by default
+            circuit_breaker (IIBCircuitBreaker)
+                optional. Circuit breaker rejecting requests while IIB
+                service is failing. It can be shared by many sessions.
+            instrumentation (IIBInstrumentation)
+                optional. Hooks called after every request and with
+                compressed and uncompressed size of every response which
+                isn't streamed
+            max_validators (int)
+                optional. Maximal number of URLs which ETag and
+                Last-Modified validators are kept for conditional requests
         """
         self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = accept_encoding()
         self.hostname = hostname
         self.verify = verify
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.instrumentation = instrumentation
+        self.max_validators = max_validators
+        # url: headers of conditional request, least recently used first
+        self._validators = OrderedDict()
+        self._validators_lock = threading.Lock()
 
-        retry = Retry(
-            total=retries,
-            read=retries,
-            connect=retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=set(range(500, 512)),
+        self.retry_policy = retry_policy or IIBRetryPolicy(
+            retries=retries, backoff_factor=backoff_factor
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        adapter = HTTPAdapter(max_retries=self.retry_policy.urllib3_retry())
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
 
@@ -44,7 +128,7 @@ class IIBSession(object):
             requests.Response
         """
 
-        return self.session.get(self._api_url(endpoint), verify=self.verify, **kwargs)
+        return self._request("get", endpoint, **kwargs)
 
     def post(self, endpoint, **kwargs):
         """HTTP post request against ibb server API
@@ -56,7 +140,7 @@ class IIBSession(object):
             requests.Response
         """
 
-        return self.session.post(self._api_url(endpoint), verify=self.verify, **kwargs)
+        return self._request("post", endpoint, **kwargs)
 
     def put(self, endpoint, **kwargs):
         """HTTP put request against ibb server API
@@ -68,7 +152,7 @@ class IIBSession(object):
             requests.Response
         """
 
-        return self.session.put(self._api_url(endpoint), verify=self.verify, **kwargs)
+        return self._request("put", endpoint, **kwargs)
 
     def delete(self, endpoint, **kwargs):
         """HTTP delete request against ibb server API
@@ -80,8 +164,125 @@ class IIBSession(object):
             requests.Response
         """
 
-        return self.session.delete(
-            self._api_url(endpoint), verify=self.verify, **kwargs
+        return self._request("delete", endpoint, **kwargs)
+
+    def _conditional_headers(self, url, headers):
+        """Return headers with validators of previous response of url"""
+        with self._validators_lock:
+            validators = self._validators.get(url)
+            if validators is None:
+                return headers
+            self._validators.move_to_end(url)
+        ret = dict(validators)
+        ret.update(headers or {})
+        return ret
+
+    def _store_validators(self, url, response):
+        """Keep validators of successful response of url"""
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        with self._validators_lock:
+            if not validators:
+                self._validators.pop(url, None)
+                return
+            self._validators[url] = validators
+            self._validators.move_to_end(url)
+            while len(self._validators) > self.max_validators:
+                self._validators.popitem(last=False)
+
+    def _request(self, method, endpoint, conditional=False, **kwargs):
+        """HTTP request against ibb server API
+
+        Args:
+            method (str)
+                HTTP method of the request
+            endpoint (str)
+                API specific endpoint for the request
+            conditional (bool)
+                optional. Send validators of previous response of the same
+                URL, so the server can answer 304 Not Modified. Caller has
+                to handle 304 response, e.g. by reusing data of previous
+                response.
+        Raises:
+            CircuitOpenError when circuit breaker is open
+        Returns:
+            requests.Response
+        """
+        url = self._api_url(endpoint)
+        if conditional and self.max_validators:
+            kwargs["headers"] = self._conditional_headers(url, kwargs.get("headers"))
+        else:
+            conditional = False
+        breaker = self.circuit_breaker
+        instrumentation = self.instrumentation
+        if breaker is not None:
+            breaker.before_request()
+        if self.rate_limiter is not None:
+            self.rate_limiter.throttle(endpoint)
+        if instrumentation is not None:
+            start = time.perf_counter()
+        try:
+            resp = getattr(self.session, method)(url, verify=self.verify, **kwargs)
+        except requests.exceptions.RequestException:
+            if breaker is not None:
+                breaker.record(False)
+            if instrumentation is not None:
+                instrumentation.request(
+                    method.upper(),
+                    normalize_endpoint(endpoint),
+                    None,
+                    time.perf_counter() - start,
+                    0,
+                    None,
+                )
+            raise
+        if breaker is not None:
+            breaker.record(not breaker.is_failure(resp))
+        if conditional and resp.status_code == 200:
+            self._store_validators(url, resp)
+        if instrumentation is not None:
+            retries = getattr(resp.raw, "retries", None)
+            size = resp.headers.get("Content-Length")
+            instrumentation.request(
+                method.upper(),
+                normalize_endpoint(endpoint),
+                resp.status_code,
+                time.perf_counter() - start,
+                len(retries.history) if retries is not None else 0,
+                int(size) if size and size.isdigit() else None,
+            )
+            if not kwargs.get("stream"):
+                self.report_transfer(endpoint, resp)
+        return resp
+
+    def report_transfer(self, endpoint, response, uncompressed=None):
+        """Report sizes of response body to instrumentation
+
+        Responses which aren't streamed are reported when they are received,
+        streamed responses are reported by their consumer when the stream is
+        closed.
+
+        Args:
+            endpoint (str)
+                API specific endpoint of the request
+            response (requests.Response)
+                Received response
+            uncompressed (int)
+                optional. Number of decompressed body bytes consumed from
+                streamed response, size of response content by default
+        """
+        if self.instrumentation is None:
+            return
+        if uncompressed is None:
+            uncompressed = len(response.content)
+        self.instrumentation.transfer(
+            normalize_endpoint(endpoint),
+            response.headers.get("Content-Encoding", "identity"),
+            _transferred_bytes(response, uncompressed),
+            uncompressed,
         )
 
     def _api_url(self, endpoint):
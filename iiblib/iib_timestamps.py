@@ -0,0 +1,104 @@
+import datetime
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_TERMINAL_STATES = ("complete", "failed")
+
+
+def parse_timestamp(value):
+    """Parse IIB timestamp to number of microseconds since epoch
+
+    Args:
+        value (str)
+            Timestamp in ISO 8601 format used by IIB, e.g.
+            "2020-02-12T17:03:00.123456Z"
+
+    Returns:
+        int or None when value is empty
+    """
+    if not value:
+        return None
+    if value.endswith("Z"):
+        value = value[:-1]
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except AttributeError:  # pragma: no cover
+        # python 3.6
+        fmt = "%Y-%m-%dT%H:%M:%S.%f" if "." in value else "%Y-%m-%dT%H:%M:%S"
+        parsed = datetime.datetime.strptime(value, fmt)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (parsed - _EPOCH) // _MICROSECOND
+
+
+def format_timestamp(value):
+    """Format number of microseconds since epoch as IIB timestamp
+
+    Args:
+        value (int)
+            Number of microseconds since epoch
+
+    Returns:
+        str or None when value is None
+    """
+    if value is None:
+        return None
+    return (_EPOCH + value * _MICROSECOND).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def build_times(state_history):
+    """Return times of build milestones from build state history
+
+    Build is considered created at time of the oldest state history entry and
+    started at time of the following non-terminal entry, which is the first
+    progress reported by IIB worker. Build is finished when it reached
+    terminal state.
+
+    Args:
+        state_history (list)
+            List of dictionaries with state, state_reason and updated keys
+
+    Returns:
+        tuple of (created, started, finished) in microseconds since epoch,
+        each of them may be None when not reached yet
+    """
+    entries = sorted(
+        (parse_timestamp(entry["updated"]), entry["state"]) for entry in state_history
+    )
+    created = started = finished = None
+    for updated, state in entries:
+        if state in _TERMINAL_STATES:
+            finished = updated
+            break
+        if created is None:
+            created = updated
+        elif started is None:
+            started = updated
+    if created is None:
+        created = finished
+    return created, started, finished
+
+
+def build_durations(state_history):
+    """Return queue and run durations of build in seconds
+
+    Queue duration is time between creation of the build and first progress
+    reported by IIB worker, run duration is time between that and the moment
+    build reached terminal state.
+
+    Args:
+        state_history (list)
+            List of dictionaries with state, state_reason and updated keys
+
+    Returns:
+        tuple of (queue, run) durations in seconds, each of them may be None
+    """
+    created, started, finished = build_times(state_history)
+    queue = run = None
+    if started is not None:
+        queue = (started - created) / 1e6
+        if finished is not None:
+            run = (finished - started) / 1e6
+    elif finished is not None:
+        run = (finished - created) / 1e6
+    return queue, run
@@ -0,0 +1,189 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from .iib_notifications import IIBNotificationSource
+
+# Maximal accepted size of callback body
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+# Header with HMAC-SHA256 signature of callback body
+SIGNATURE_HEADER = "X-IIB-Signature"
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    """Handler of build state callbacks POSTed to the receiver"""
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        receiver = self.server.receiver
+        if self.path.split("?", 1)[0] != receiver.path:
+            self._reply(404)
+            return
+        try:
+            size = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self._reply(411)
+            return
+        if size > receiver.max_body_size:
+            self._reply(413)
+            return
+        body = self.rfile.read(size)
+        if not receiver.authenticated(self.headers, body):
+            self._reply(401)
+            return
+        try:
+            data = receiver.json_loads(body)
+            builds = data if isinstance(data, list) else [data]
+            for build in builds:
+                self.server.callback(build)
+        except (KeyError, TypeError, ValueError):
+            self._reply(400)
+            return
+        self._reply(204)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class _WebhookServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class IIBWebhookReceiver(IIBNotificationSource):
+    """
+    Embeddable HTTP receiver of build state callbacks
+
+    Every POST to path carries raw json data of a changed build or a list
+    of them. Body of valid callback is passed to the notification callback,
+    which is IIBBuildWatcher.notify when the receiver is used by watcher.
+    Watcher parses it with IIBBuildDetailsModel.from_dict and routes it to
+    callbacks and futures registered for the build id. Invalid payloads
+    are answered with 400.
+
+    Callbacks are authenticated by secret shared with the sender, either
+    sent as "Authorization: Bearer <secret>" header or used as key of
+    HMAC-SHA256 signature of the body sent as "X-IIB-Signature:
+    sha256=<hex digest>" header. Unauthenticated callbacks are answered
+    with 401. Receiver listening on other than loopback address requires
+    the secret.
+
+    Example:
+        receiver = IIBWebhookReceiver(
+            host="0.0.0.0", port=8080, path="/iib", secret=secret
+        )
+        with IIBBuildWatcher(client, receiver) as watcher:
+            future = watcher.future(client.add_bundles(...).id)
+            build = future.result()
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        path="/",
+        json_loads=json.loads,
+        max_body_size=MAX_BODY_SIZE,
+        secret=None,
+    ):
+        """
+        Args:
+            host (str)
+                optional. Address the receiver listens on
+            port (int)
+                optional. Port the receiver listens on, random free port is
+                used by default
+            path (str)
+                optional. Path callbacks are POSTed to
+            json_loads (callable)
+                optional. Function decoding callback body
+            max_body_size (int)
+                optional. Maximal accepted size of callback body in bytes
+            secret (str or bytes)
+                Secret authenticating callbacks. Optional only when host is
+                loopback address.
+
+        Raises:
+            ValueError when secret isn't set for non-loopback host
+        """
+        if not secret and not _is_loopback(host):
+            raise ValueError("Secret is required by receiver listening on %s." % host)
+        if isinstance(secret, str):
+            secret = secret.encode("utf-8")
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.path = path
+        self.json_loads = json_loads
+        self.max_body_size = max_body_size
+        self._server = None
+        self._thread = None
+
+    def authenticated(self, headers, body):
+        """
+        Check that callback was sent by holder of the secret
+
+        Args:
+            headers (email.message.Message)
+                Headers of the callback request
+            body (bytes)
+                Body of the callback request
+
+        Returns:
+            bool, always True when the receiver has no secret
+        """
+        if not self.secret:
+            return True
+        authorization = headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            token = authorization[len("Bearer ") :].strip().encode("utf-8")
+            return hmac.compare_digest(token, self.secret)
+        signature = headers.get(SIGNATURE_HEADER, "")
+        if signature.startswith("sha256="):
+            expected = hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+            return hmac.compare_digest(
+                signature[len("sha256=") :].strip().encode("utf-8"),
+                expected.encode("utf-8"),
+            )
+        return False
+
+    @property
+    def url(self):
+        """URL callbacks are POSTed to, available after start"""
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d%s" % (host, port, self.path)
+
+    def start(self, callback):
+        self._server = _WebhookServer((self.host, self.port), _WebhookHandler)
+        self._server.receiver = self
+        self._server.callback = callback
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="iib-webhook", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
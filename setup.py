@@ -53,7 +53,13 @@ long_description = read_content("README.md") + read_content(
 
 INSTALL_REQUIRES = ["requests", "requests-kerberos", "kerberos", "tenacity"]
 
-extras_require = {"reST": ["Sphinx"]}
+extras_require = {
+    "reST": ["Sphinx"],
+    "orjson": ["orjson"],
+    "arrow": ["pyarrow"],
+    "analytics": ["numpy"],
+    "compression": ["urllib3[brotli,zstd]"],
+}
 
 if os.environ.get("READTHEDOCS", None):
     extras_require["reST"].append("recommonmark")
@@ -74,6 +80,7 @@ setup(
     install_requires=INSTALL_REQUIRES,
     include_package_data=True,
     extras_require=extras_require,
+    entry_points={"console_scripts": ["iib=iiblib.iib_cli:main"]},
     tests_require=["tox", "mock", "requests_mock"],
     cmdclass={"test": Tox},
 )
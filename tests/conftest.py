@@ -0,0 +1,32 @@
+import copy
+
+import pytest
+
+
+@pytest.fixture
+def fixture_build_details_json():
+    json = {
+        "id": 3,
+        "arches": ["x86_64"],
+        "state": "in_progress",
+        "state_reason": "state_reason",
+        "request_type": "regenerate-bundle",
+        "state_history": [],
+        "batch": 1,
+        "batch_annotations": {"batch_annotations": 1},
+        "logs": {},
+        "updated": "updated",
+        "user": "user@example.com",
+        "bundle_image": "bundle_image",
+        "from_bundle_image": "from_bundle_image",
+        "from_bundle_image_resolved": "from_bundle_image_resolved",
+        "organization": "organization",
+    }
+    return json
+
+
+@pytest.fixture
+def fixture_finished_json(fixture_build_details_json):
+    finished = copy.deepcopy(fixture_build_details_json)
+    finished["state"] = "complete"
+    return finished
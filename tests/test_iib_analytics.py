@@ -0,0 +1,168 @@
+import pytest
+
+from iiblib.iib_build_details_model import IIBBuildDetailsModel
+from iiblib.iib_build_details_pager import IIBBuildDetailsPager
+from iiblib.iib_compact_model import CompactBuildDetails
+from iiblib.iib_timestamps import build_durations
+
+numpy = pytest.importorskip("numpy")
+
+from iiblib.iib_analytics import BuildHistoryArrays, MISSING  # noqa: E402
+
+
+def _entry(state, seconds, reason="reason"):
+    return {
+        "state": state,
+        "state_reason": reason,
+        "updated": "2024-01-01T%02d:%02d:%02d.000000Z"
+        % (seconds // 3600, seconds % 3600 // 60, seconds % 60),
+    }
+
+
+def _build(bid, request_type, history):
+    return {
+        "id": bid,
+        "arches": ["x86_64"],
+        "batch": bid,
+        "state": history[0]["state"],
+        "state_reason": history[0]["state_reason"],
+        "request_type": request_type,
+        "state_history": history,
+        "updated": history[0]["updated"],
+        "user": "user@example.com",
+        "bundle_image": "bundle_image",
+        "from_bundle_image": "from_bundle_image",
+        "from_bundle_image_resolved": "from_bundle_image_resolved",
+        "organization": "organization",
+        "parent_bundle_image": "parent_bundle_image",
+        "parent_bundle_image_resolved": "parent_bundle_image_resolved",
+        "nested_bundles": [],
+    }
+
+
+@pytest.fixture
+def fixture_builds():
+    return [
+        _build(
+            1,
+            "regenerate-bundle",
+            [
+                _entry("complete", 100),
+                _entry("in_progress", 30),
+                _entry("in_progress", 10),
+                _entry("in_progress", 0),
+            ],
+        ),
+        _build(
+            2,
+            "regenerate-bundle",
+            [
+                _entry("failed", 3700, "Failed to resolve"),
+                _entry("in_progress", 3620),
+                _entry("in_progress", 3600),
+            ],
+        ),
+        _build(
+            3,
+            "recursive-related-bundles",
+            [_entry("failed", 3610, "Timeout"), _entry("in_progress", 3600)],
+        ),
+        _build(4, "recursive-related-bundles", [_entry("in_progress", 3600)]),
+        _build(
+            5,
+            "regenerate-bundle",
+            [_entry("failed", 7300, "Failed to resolve"), _entry("in_progress", 7200)],
+        ),
+    ]
+
+
+def test_build_history_arrays(fixture_builds):
+    arrays = BuildHistoryArrays.from_builds(fixture_builds)
+    assert len(arrays) == 5
+    assert arrays.ids.tolist() == [1, 2, 3, 4, 5]
+    assert arrays.request_type_labels == [
+        "recursive-related-bundles",
+        "regenerate-bundle",
+    ]
+    assert arrays.request_types.tolist() == [1, 1, 0, 0, 1]
+    assert arrays.started[3] == MISSING
+    assert arrays.finished[3] == MISSING
+    for build, queue, run in zip(
+        fixture_builds, arrays.queue_seconds(), arrays.run_seconds()
+    ):
+        expected_queue, expected_run = build_durations(build["state_history"])
+        assert (numpy.isnan(queue) and expected_queue is None) or (
+            queue == expected_queue
+        )
+        assert (numpy.isnan(run) and expected_run is None) or run == expected_run
+    assert arrays.total_seconds()[:3].tolist() == [100.0, 100.0, 10.0]
+
+
+def test_build_history_arrays_inputs(fixture_builds):
+    expected = BuildHistoryArrays.from_builds(fixture_builds)
+    models = [IIBBuildDetailsModel.from_dict(build) for build in fixture_builds]
+    compact = [CompactBuildDetails.from_dict(build) for build in fixture_builds]
+    pager = IIBBuildDetailsPager(None, 1)
+    pager._items = models[:2]
+    pages = [pager, {"items": fixture_builds[2:], "meta": {}}]
+    for arrays in (
+        BuildHistoryArrays.from_builds(models),
+        BuildHistoryArrays.from_builds(compact),
+        BuildHistoryArrays.from_pages(pages),
+    ):
+        assert arrays.ids.tolist() == expected.ids.tolist()
+        assert arrays.created.tolist() == expected.created.tolist()
+        assert arrays.started.tolist() == expected.started.tolist()
+        assert arrays.finished.tolist() == expected.finished.tolist()
+
+
+def test_build_history_arrays_timezone_offsets(fixture_builds):
+    fixture_builds[0]["state_history"][0]["updated"] = "2024-01-01T01:01:40+01:00"
+    arrays = BuildHistoryArrays.from_builds(fixture_builds)
+    assert arrays.total_seconds()[0] == 100.0
+
+
+def test_build_history_arrays_empty():
+    arrays = BuildHistoryArrays.from_builds([])
+    assert len(arrays) == 0
+    assert arrays.percentiles() == {}
+    assert arrays.failure_rates() == {}
+    assert arrays.failure_reasons() == []
+    assert arrays.throughput_per_hour()[1].tolist() == []
+
+
+def test_percentiles(fixture_builds):
+    arrays = BuildHistoryArrays.from_builds(fixture_builds)
+    assert arrays.percentiles("queue", q=(50,)) == {
+        "regenerate-bundle": {50: 15.0},
+    }
+    assert arrays.percentiles("run", q=(0, 100)) == {
+        "recursive-related-bundles": {0: 10.0, 100: 10.0},
+        "regenerate-bundle": {0: 80.0, 100: 100.0},
+    }
+    with pytest.raises(ValueError, match="Unknown metric: foo.*"):
+        arrays.percentiles("foo")
+
+
+def test_report(fixture_builds):
+    report = BuildHistoryArrays.from_builds(fixture_builds).report(q=(50,))
+    assert report["builds"] == 5
+    assert report["failure_rates"] == {
+        "recursive-related-bundles": 1.0,
+        "regenerate-bundle": 2.0 / 3,
+    }
+    assert report["failure_reasons"] == [("Failed to resolve", 2), ("Timeout", 1)]
+    assert report["throughput_per_hour"] == [
+        ("2024-01-01T00", 1),
+        ("2024-01-01T01", 2),
+        ("2024-01-01T02", 1),
+    ]
+
+
+def test_failure_rates_without_state_history():
+    failed = _build(1, "regenerate-bundle", [_entry("failed", 10)])
+    failed["state_history"] = []
+    other_failed = dict(failed, id=2)
+    complete = _build(3, "regenerate-bundle", [_entry("complete", 10)])
+    arrays = BuildHistoryArrays.from_builds([failed, other_failed, complete])
+    assert arrays.failure_rates() == {"regenerate-bundle": 2.0 / 3}
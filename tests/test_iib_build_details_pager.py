@@ -3,7 +3,8 @@ import requests_mock
 
 
 from iiblib.iib_build_details_model import IIBBuildDetailsModel
-from iiblib.iib_client import IIBClient
+from iiblib.iib_build_details_pager import IIBBuildDetailsPager
+from iiblib.iib_client import IIBClient, IIBException
 
 
 @pytest.fixture
@@ -146,3 +147,121 @@ def test_iib_build_details_pager(
         assert pager.items() == [
             IIBBuildDetailsModel.from_dict(fixture_builds_page1_json["items"][0])
         ]
+
+
+def test_iib_build_details_pager_stream(
+    fixture_builds_page1_json,
+    fixture_builds_page2_json,
+):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            status_code=200,
+            json=fixture_builds_page1_json,
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=2",
+            status_code=200,
+            json=fixture_builds_page2_json,
+        )
+
+        iibc = IIBClient("fake-host")
+        pager = iibc.get_builds(stream=True)
+        assert m.call_count == 0
+        assert list(pager.items()) == [
+            IIBBuildDetailsModel.from_dict(fixture_builds_page1_json["items"][0])
+        ]
+        assert pager.meta == fixture_builds_page1_json["meta"]
+        pager.next()
+        assert pager.meta == {}
+        assert list(pager.items()) == [
+            IIBBuildDetailsModel.from_dict(fixture_builds_page2_json["items"][0])
+        ]
+        assert pager.meta == fixture_builds_page2_json["meta"]
+
+        assert list(iibc.get_builds(page=2, raw=True, stream=True)) == (
+            fixture_builds_page2_json["items"]
+        )
+
+
+def test_iib_build_details_pager_stream_error():
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            status_code=500,
+            json={"error": "Internal error"},
+        )
+
+        iibc = IIBClient("fake-host", retries=0)
+        with pytest.raises(IIBException, match="Internal error"):
+            list(iibc.get_builds(stream=True).items())
+
+
+def test_iib_build_details_pager_cache(
+    fixture_builds_page1_json,
+    fixture_builds_page2_json,
+):
+    now = [0]
+    with requests_mock.Mocker() as m:
+        page1 = m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            status_code=200,
+            json=fixture_builds_page1_json,
+        )
+        page2 = m.register_uri(
+            "GET",
+            "/api/v1/builds?page=2",
+            status_code=200,
+            json=fixture_builds_page2_json,
+        )
+
+        iibc = IIBClient("fake-host")
+        pager = IIBBuildDetailsPager.from_dict(
+            iibc, iibc.get_builds(raw=True), clock=lambda: now[0]
+        )
+        pager.next()
+        pager.prev()
+        pager.next()
+        assert pager.items() == [
+            IIBBuildDetailsModel.from_dict(fixture_builds_page2_json["items"][0])
+        ]
+        assert (page1.call_count, page2.call_count) == (1, 1)
+
+        # reload_page always fetches the page
+        pager.reload_page()
+        assert page2.call_count == 2
+
+        # expired page is fetched again
+        now[0] = 30
+        pager.prev()
+        assert page1.call_count == 2
+
+        # new build shifted pages, other cached pages are dropped
+        fixture_builds_page1_json["meta"]["total"] = 3
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            status_code=200,
+            json=fixture_builds_page1_json,
+        )
+        pager.reload_page()
+        pager.next()
+        assert page2.call_count == 3
+
+        # cache is bounded by number of cached builds
+        pager = IIBBuildDetailsPager(iibc, 1, max_cached_builds=1)
+        pager.reload_page()
+        pager.next()
+        pager.prev()
+        assert m.call_count == 9
+
+        # cache is disabled
+        pager = IIBBuildDetailsPager(iibc, 1, cache_size=0)
+        pager.reload_page()
+        pager.next()
+        pager.prev()
+        assert m.call_count == 12
@@ -0,0 +1,147 @@
+import copy
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import mock
+import pytest
+import requests
+import requests_mock
+
+from iiblib.iib_build_details_model import RegenerateBundleModel
+from iiblib.iib_circuit_breaker import CircuitOpenError, IIBCircuitBreaker
+from iiblib.iib_client import IIBClient
+from iiblib.iib_session import IIBSession
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker():
+    clock = FakeClock()
+    breaker = IIBCircuitBreaker(
+        failure_rate=0.5, window=4, min_requests=4, reset_timeout=10, clock=clock
+    )
+    for success in (True, False, True):
+        breaker.before_request()
+        breaker.record(success)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    # half-open lets through single probe
+    clock.now = 10
+    assert breaker.state == "half_open"
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record(False)
+    assert breaker.state == "open"
+
+    clock.now = 20
+    breaker.before_request()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+    assert breaker.metrics() == {
+        "state": "closed",
+        "state_code": 0,
+        "requests": 6,
+        "failures": 3,
+        "rejected": 2,
+        "opened": 2,
+        "window_failure_rate": 0.0,
+    }
+
+
+def test_session_circuit_breaker():
+    breaker = IIBCircuitBreaker(failure_rate=1.0, window=2, min_requests=2)
+    iibs = IIBSession("fake-host", retries=0, circuit_breaker=breaker)
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds/1", status_code=404)
+        m.register_uri("GET", "/api/v1/builds/2", status_code=503)
+        m.register_uri(
+            "GET", "/api/v1/builds/3", exc=requests.exceptions.ConnectionError
+        )
+        iibs.get("builds/1")
+        iibs.get("builds/2")
+        assert breaker.state == "closed"
+        with pytest.raises(requests.exceptions.ConnectionError):
+            iibs.get("builds/3")
+        assert breaker.state == "open"
+        with pytest.raises(requests.exceptions.RequestException):
+            iibs.get("builds/1")
+        assert m.call_count == 3
+
+
+def test_client_circuit_breaker(fixture_finished_json):
+    clock = FakeClock()
+    breaker = IIBCircuitBreaker(window=1, min_requests=1, reset_timeout=10, clock=clock)
+    in_progress = copy.deepcopy(fixture_finished_json)
+    in_progress["id"] = 4
+    in_progress["state"] = "in_progress"
+    finished = copy.deepcopy(in_progress)
+    finished["state"] = "failed"
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/3",
+            json=fixture_finished_json,
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/4",
+            [{"status_code": 500}, {"json": finished}],
+        )
+        iibc = IIBClient(
+            "fake-host", retries=0, poll_interval=0, circuit_breaker=breaker
+        )
+        iibc.get_build(3)
+        with pytest.raises(requests.exceptions.HTTPError):
+            iibc.get_build(4)
+        assert breaker.state == "open"
+
+        # finished build is served from cache
+        assert iibc.get_build(3, raw=True) == (fixture_finished_json)
+        with pytest.raises(CircuitOpenError):
+            iibc.get_build(4)
+        assert m.call_count == 2
+
+        # waiting skips polls while circuit is open
+        def _sleep(seconds):
+            clock.now += 5
+
+        with mock.patch("iiblib.iib_client.time.sleep", side_effect=_sleep) as sleep:
+            build = iibc.wait_for_build(RegenerateBundleModel.from_dict(in_progress))
+        assert build.state == "failed"
+        assert sleep.call_count == 2
+        assert m.call_count == 3
+
+
+def test_finished_builds_tracked_concurrently(
+    fixture_finished_json,
+):
+    iibc = IIBClient("fake-host", circuit_breaker=IIBCircuitBreaker())
+
+    def _track(offset):
+        for bid in range(offset, offset + 2000):
+            build = dict(fixture_finished_json, id=bid % 50)
+            iibc.track_build(build)
+
+    interval = sys.getswitchinterval()
+    # switch threads often to interleave evictions and updates
+    sys.setswitchinterval(1e-6)
+    try:
+        with mock.patch("iiblib.iib_client.FINISHED_BUILDS_CACHE_SIZE", 10):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(_track, range(0, 80, 10)))
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(iibc._finished_builds) == 10
@@ -0,0 +1,159 @@
+import copy
+import io
+import json
+
+import pytest
+import requests_mock
+
+from iiblib.iib_cli import main
+
+
+def _build(build, bid, state):
+    ret = copy.deepcopy(build)
+    ret["id"] = bid
+    ret["state"] = state
+    return ret
+
+
+def _run(*argv):
+    out = io.StringIO()
+    ret = main(["--hostname", "fake-host", "--poll-interval", "0"] + list(argv), out)
+    return ret, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_submit(fixture_build_details_json):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST", "/api/v1/builds/create-empty-index", json=fixture_build_details_json
+        )
+        ret, lines = _run(
+            "create-empty-index", "--index", "index", "--label", "version=v4.6"
+        )
+        assert ret == 0
+        assert lines == [fixture_build_details_json]
+        assert m.last_request.json() == {
+            "from_index": "index",
+            "labels": {"version": "v4.6"},
+        }
+
+        ret, lines = _run("create-empty-index", "--label", "version")
+        assert ret == 1
+        assert not lines
+        assert m.call_count == 1
+
+
+def test_submit_errors(fixture_build_details_json, capsys, monkeypatch):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            status_code=400,
+            json={"error": "Invalid bundle"},
+        )
+        assert _run("regenerate-bundle", "--bundle", "bundle") == (1, [])
+        assert "iib: error: Invalid bundle" in capsys.readouterr().err
+
+        assert _run("regenerate-bundle") == (1, [])
+        assert "missing arguments bundle_image" in capsys.readouterr().err
+    assert m.call_count == 1
+
+    monkeypatch.delenv("IIB_HOSTNAME", raising=False)
+    with pytest.raises(SystemExit):
+        main(["get", "3"])
+
+
+def test_bulk_submit(fixture_build_details_json, tmp_path):
+    requests_file = tmp_path / "requests.jsonl"
+    requests_file.write_text(
+        '{"bundle_image": "bundle1"}\n\n{"bundle_image": "invalid"}\n'
+        '{"bundle_image": "bundle2", "organization": "other"}\n'
+    )
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            [
+                {"json": _build(fixture_build_details_json, 3, "in_progress")},
+                {"status_code": 400, "json": {"error": "Invalid bundle"}},
+                {"json": _build(fixture_build_details_json, 4, "in_progress")},
+            ],
+        )
+        ret, lines = _run(
+            "regenerate-bundle",
+            "--from-file",
+            str(requests_file),
+            "--organization",
+            "org",
+            "--max-workers",
+            "1",
+        )
+        assert ret == 1
+        assert [(line.get("id"), line["line"]) for line in lines] == [
+            (3, 1),
+            (None, 3),
+            (4, 4),
+        ]
+        assert lines[1]["error"] == {
+            "type": "IIBException",
+            "message": "Invalid bundle",
+        }
+        assert [r.json() for r in m.request_history] == [
+            {"from_bundle_image": "bundle1", "organization": "org"},
+            {"from_bundle_image": "invalid", "organization": "org"},
+            {"from_bundle_image": "bundle2", "organization": "other"},
+        ]
+
+        # nothing is submitted when any request is invalid
+        requests_file.write_text('{"bundle_image": "bundle1"}\n{"bundle": "x"}\n')
+        assert _run("regenerate-bundle", "--from-file", str(requests_file)) == (1, [])
+        assert m.call_count == 3
+
+
+def test_submit_watch(fixture_build_details_json):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST", "/api/v1/builds/regenerate-bundle", json=fixture_build_details_json
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/3",
+            [
+                {"json": _build(fixture_build_details_json, 3, "in_progress")},
+                {"json": _build(fixture_build_details_json, 3, "in_progress")},
+                {"json": _build(fixture_build_details_json, 3, "failed")},
+            ],
+        )
+        ret, lines = _run("regenerate-bundle", "--bundle", "bundle", "--watch")
+        assert ret == 1
+        assert [line["state"] for line in lines] == ["in_progress", "failed"]
+
+
+def test_get_list_and_wait(fixture_build_details_json, monkeypatch):
+    complete = _build(fixture_build_details_json, 3, "complete")
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds/3", json=complete)
+        m.register_uri(
+            "GET", "/api/v1/builds/4", status_code=404, json={"error": "Not found"}
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            json={"items": [complete], "meta": {"page": 1, "pages": 2}},
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=2",
+            json={"items": [complete], "meta": {"page": 2, "pages": 2}},
+        )
+
+        ret, lines = _run("get", "3", "4")
+        assert ret == 1
+        assert lines[0] == complete
+        assert lines[1]["id"] == 4
+        assert lines[1]["error"]["message"] == "Not found"
+
+        assert _run("list") == (0, [complete])
+        assert _run("list", "--all") == (0, [complete, complete])
+
+        monkeypatch.setattr("sys.stdin", io.StringIO(json.dumps(complete) + "\n3\n"))
+        assert _run("wait", "-") == (0, [complete])
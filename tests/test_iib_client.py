@@ -6,6 +6,8 @@ import tenacity
 from requests import HTTPError
 
 from iiblib.iib_client import (
+    IIBBatchGetError,
+    IIBBatchSubmitError,
     IIBClient,
     IIBException,
 )
@@ -16,6 +18,8 @@ from iiblib.iib_build_details_model import (
     RegenerateBundleModel,
     CreateEmptyIndexModel,
     AddDeprecationsModel,
+    MergeIndexImageModel,
+    FBCOperationsModel,
 )
 from iiblib.iib_build_details_pager import IIBBuildDetailsPager
 
@@ -721,3 +725,359 @@ def test_iib_error_response():
         iibc = IIBClient("fake-host")
         with pytest.raises(IIBException):
             iibc.get_builds()
+
+
+@pytest.fixture
+def fixture_merge_index_image_build_details_json():
+    json = {
+        "id": 8,
+        "arches": ["x86_64"],
+        "state": "in_progress",
+        "state_reason": "state_reason",
+        "request_type": "merge-index-image",
+        "state_history": [],
+        "batch": 1,
+        "batch_annotations": {"batch_annotations": 1},
+        "logs": {},
+        "updated": "updated",
+        "user": "user@example.com",
+        "binary_image": "binary_image",
+        "binary_image_resolved": "binary_image_resolved",
+        "build_tags": [],
+        "deprecation_list": [],
+        "distribution_scope": "prod",
+        "index_image": "index_image",
+        "source_from_index": "source_from_index",
+        "source_from_index_resolved": "source_from_index_resolved",
+        "target_index": "target_index",
+        "target_index_resolved": "target_index_resolved",
+    }
+    return json
+
+
+def test_merge_index_images(fixture_merge_index_image_build_details_json):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/merge-index-image",
+            status_code=200,
+            json=fixture_merge_index_image_build_details_json,
+        )
+        iibc = IIBClient("fake-host")
+        assert iibc.merge_index_images(
+            "source_from_index",
+            "target_index",
+            binary_image="binary_image",
+            build_tags=["extra-tag1"],
+            deprecation_list=["bundle1"],
+            distribution_scope="prod",
+            overwrite_target_index=True,
+            overwrite_target_index_token="str",
+        ) == MergeIndexImageModel.from_dict(
+            fixture_merge_index_image_build_details_json
+        )
+        assert m.last_request.json() == {
+            "source_from_index": "source_from_index",
+            "target_index": "target_index",
+            "binary_image": "binary_image",
+            "build_tags": ["extra-tag1"],
+            "deprecation_list": ["bundle1"],
+            "distribution_scope": "prod",
+            "overwrite_target_index": True,
+            "overwrite_target_index_token": "str",
+        }
+        assert (
+            iibc.merge_index_images("source_from_index", "target_index", raw=True)
+            == fixture_merge_index_image_build_details_json
+        )
+        assert m.last_request.json() == {
+            "source_from_index": "source_from_index",
+            "target_index": "target_index",
+        }
+
+        error_msg = (
+            "Either both or neither of overwrite-target-index "
+            "and overwrite-target-index-token should be specified."
+        )
+        with pytest.raises(ValueError, match=error_msg):
+            iibc.merge_index_images(
+                "source_from_index", "target_index", overwrite_target_index=True
+            )
+        with pytest.raises(ValueError, match=error_msg):
+            iibc.merge_index_images(
+                "source_from_index",
+                "target_index",
+                overwrite_target_index_token="str",
+            )
+
+
+def test_merge_index_images_to_targets(fixture_merge_index_image_build_details_json):
+    targets = ["target-v4.%d" % version for version in range(12, 16)]
+
+    def _post_callback(request, context):
+        ret = copy.deepcopy(fixture_merge_index_image_build_details_json)
+        ret["target_index"] = request.json()["target_index"]
+        ret["id"] = 100 + targets.index(ret["target_index"])
+        return ret
+
+    def _get_callback(request, context):
+        bid = int(request.path.rsplit("/", 1)[1])
+        ret = copy.deepcopy(fixture_merge_index_image_build_details_json)
+        ret["id"] = bid
+        ret["target_index"] = targets[bid - 100]
+        # every build needs different number of polls
+        polls[bid] = polls.get(bid, 0) + 1
+        if polls[bid] > bid - 100:
+            ret["state"] = "complete"
+        return ret
+
+    polls = {}
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", "/api/v1/builds/merge-index-image", json=_post_callback)
+        m.register_uri("GET", requests_mock.ANY, json=_get_callback, complete_qs=False)
+        iibc = IIBClient("fake-host", poll_interval=0)
+        builds = iibc.merge_index_images_to_targets(
+            "source_from_index", targets, binary_image="binary_image"
+        )
+        assert [build.target_index for build in builds] == targets
+        assert [build.state for build in builds] == ["complete"] * 4
+        assert polls == {100: 1, 101: 2, 102: 3, 103: 4}
+
+        builds = iibc.merge_index_images_to_targets(
+            "source_from_index", targets[:2], wait=False, max_workers=1
+        )
+        assert [build.state for build in builds] == ["in_progress"] * 2
+        assert iibc.merge_index_images_to_targets("source_from_index", []) == []
+
+        posts = m.call_count
+        with pytest.raises(ValueError):
+            iibc.merge_index_images_to_targets(
+                "source_from_index", targets, overwrite_target_index=True
+            )
+        assert m.call_count == posts
+
+
+def test_wait_for_builds_timeout(fixture_add_build_details_json):
+    iibc = IIBClient("fake-host", poll_interval=0, wait_for_build_timeout=0)
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds/1", json=fixture_add_build_details_json)
+        with pytest.raises(IIBException, match="Timeout reached. Build requests 1 .*"):
+            iibc.wait_for_builds(
+                [IIBBuildDetailsModel.from_dict(fixture_add_build_details_json)]
+            )
+
+
+def test_fbc_operations(fixture_fbc_operations_build_details_json):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/fbc-operations",
+            status_code=200,
+            json=fixture_fbc_operations_build_details_json,
+        )
+        iibc = IIBClient("fake-host")
+        assert iibc.fbc_operations(
+            "from_index",
+            "fbc_fragment",
+            arches=["x86_64"],
+            binary_image="binary_image",
+            build_tags=["extra-tag1"],
+            overwrite_from_index=True,
+            overwrite_from_index_token="str",
+        ) == FBCOperationsModel.from_dict(fixture_fbc_operations_build_details_json)
+        assert m.last_request.json() == {
+            "from_index": "from_index",
+            "fbc_fragment": "fbc_fragment",
+            "add_arches": ["x86_64"],
+            "binary_image": "binary_image",
+            "build_tags": ["extra-tag1"],
+            "overwrite_from_index": True,
+            "overwrite_from_index_token": "str",
+        }
+        assert (
+            iibc.fbc_operations("from_index", "fbc_fragment", raw=True)
+            == fixture_fbc_operations_build_details_json
+        )
+
+        with pytest.raises(ValueError, match="Either both or neither.*"):
+            iibc.fbc_operations("from_index", "fbc_fragment", overwrite_from_index=True)
+        with pytest.raises(ValueError, match="Either both or neither.*"):
+            iibc.fbc_operations(
+                "from_index", "fbc_fragment", overwrite_from_index_token="str"
+            )
+        with pytest.raises(ValueError, match="Index image has to be specified."):
+            iibc.fbc_operations("", "fbc_fragment")
+        with pytest.raises(ValueError, match="FBC fragment has to be specified."):
+            iibc.fbc_operations("from_index", None)
+
+
+def test_merge_index_images_to_targets_submit_error(
+    fixture_merge_index_image_build_details_json,
+):
+    targets = ["target-v4.%d" % version for version in range(12, 16)]
+
+    def _post_callback(request, context):
+        ret = copy.deepcopy(fixture_merge_index_image_build_details_json)
+        ret["target_index"] = request.json()["target_index"]
+        ret["id"] = 100 + targets.index(ret["target_index"])
+        if ret["id"] == 101:
+            context.status_code = 400
+            return {"error": "Invalid target"}
+        return ret
+
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", "/api/v1/builds/merge-index-image", json=_post_callback)
+        iibc = IIBClient("fake-host", poll_interval=0)
+        with pytest.raises(IIBBatchSubmitError, match="Failed to submit 1 of 4") as e:
+            iibc.merge_index_images_to_targets(
+                "source_from_index", targets, max_workers=2
+            )
+        # all requests were submitted and no build was polled
+        assert m.call_count == 4
+    assert [build and build.id for build in e.value.builds] == [100, None, 102, 103]
+    assert [build.id for build in e.value.submitted] == [100, 102, 103]
+    assert str(e.value.errors[1]) == "Invalid target"
+
+
+def test_fbc_operations_batch(fixture_fbc_operations_build_details_json):
+    indexes = ["index-v4.%d" % version for version in range(10, 18)]
+
+    def _post_callback(request, context):
+        ret = copy.deepcopy(fixture_fbc_operations_build_details_json)
+        ret["from_index"] = request.json()["from_index"]
+        ret["fbc_fragment"] = request.json()["fbc_fragment"]
+        ret["id"] = 100 + indexes.index(ret["from_index"])
+        return ret
+
+    def _get_callback(request, context):
+        bid = int(request.path.rsplit("/", 1)[1])
+        ret = copy.deepcopy(fixture_fbc_operations_build_details_json)
+        ret["id"] = bid
+        ret["from_index"] = indexes[bid - 100]
+        ret["state"] = "failed" if bid == 101 else "complete"
+        return ret
+
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", "/api/v1/builds/fbc-operations", json=_post_callback)
+        m.register_uri("GET", requests_mock.ANY, json=_get_callback)
+        iibc = IIBClient("fake-host", poll_interval=0)
+        builds = iibc.fbc_operations_batch(
+            [(index, "fbc_fragment") for index in indexes],
+            binary_image="binary_image",
+        )
+        assert [build.from_index for build in builds] == indexes
+        assert [build.state for build in builds][:3] == [
+            "complete",
+            "failed",
+            "complete",
+        ]
+        assert m.call_count == 16
+
+        builds = iibc.fbc_operations_batch(
+            [("index-v4.10", "fbc_fragment")], wait=False
+        )
+        assert builds[0].state == "in_progress"
+
+        posts = m.call_count
+        with pytest.raises(
+            ValueError, match="FBC fragment fbc_fragment is requested.*"
+        ):
+            iibc.fbc_operations_batch(
+                [("index-v4.10", "fbc_fragment"), ("index-v4.10", "fbc_fragment")]
+            )
+        with pytest.raises(ValueError, match="FBC fragment has to be specified."):
+            iibc.fbc_operations_batch(
+                [("index-v4.10", "fbc_fragment"), ("index-v4.11", "")]
+            )
+        assert m.call_count == posts
+
+
+def test_get_build_not_modified(fixture_add_build_details_json):
+    iibc = IIBClient("fake-host", conditional_cache_size=1)
+    with requests_mock.Mocker() as m:
+        build_1 = m.register_uri(
+            "GET",
+            "/api/v1/builds/1",
+            [
+                {"json": fixture_add_build_details_json, "headers": {"ETag": '"1"'}},
+                {"status_code": 304},
+                {"status_code": 304},
+                {"status_code": 304},
+            ],
+        )
+        build_2 = copy.deepcopy(fixture_add_build_details_json)
+        build_2["id"] = 2
+        m.register_uri("GET", "/api/v1/builds/2", json=build_2, headers={"ETag": "2"})
+
+        build = iibc.get_build(1)
+        # unchanged build is served from cache
+        assert iibc.get_build(1) is build
+        assert build_1.last_request.headers["If-None-Match"] == '"1"'
+        # raw json of cached build is a copy
+        data = iibc.get_build(1, raw=True)
+        assert data == fixture_add_build_details_json
+        data["state"] = "failed"
+        assert iibc.get_build(1, raw=True) == fixture_add_build_details_json
+        assert build_1.call_count == 4
+
+        # cached build was dropped, build is fetched again
+        iibc.get_build(2)
+        iibc.iib_session._validators["https://fake-host/api/v1/builds/1"] = {
+            "If-None-Match": '"1"'
+        }
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/1",
+            [
+                {"status_code": 304},
+                {"json": fixture_add_build_details_json},
+            ],
+        )
+        assert iibc.get_build(1) == build
+        assert m.call_count == 7
+
+    iibc = IIBClient("fake-host", conditional_cache_size=0)
+    with requests_mock.Mocker() as m:
+        build_1 = m.register_uri(
+            "GET",
+            "/api/v1/builds/1",
+            json=fixture_add_build_details_json,
+            headers={"ETag": '"1"'},
+        )
+        iibc.get_build(1)
+        iibc.get_build(1)
+        assert "If-None-Match" not in build_1.last_request.headers
+
+
+def test_get_builds_by_ids(fixture_add_build_details_json):
+    complete = copy.deepcopy(fixture_add_build_details_json)
+    complete["state"] = "complete"
+    in_progress = copy.deepcopy(fixture_add_build_details_json)
+    in_progress["id"] = 2
+    iibc = IIBClient("fake-host")
+    with requests_mock.Mocker() as m:
+        build_1 = m.register_uri("GET", "/api/v1/builds/1", json=complete)
+        build_2 = m.register_uri("GET", "/api/v1/builds/2", json=in_progress)
+        m.register_uri(
+            "GET", "/api/v1/builds/3", status_code=404, json={"error": "Not found"}
+        )
+
+        builds = iibc.get_builds_by_ids([2, 1, 2])
+        assert list(builds) == [2, 1]
+        assert builds[1] == AddModel.from_dict(complete)
+        assert builds[2] == AddModel.from_dict(in_progress)
+        assert m.call_count == 2
+
+        # finished build is served from cache, unfinished one is fetched again
+        assert iibc.get_builds_by_ids([1, 2], raw=True) == {
+            1: complete,
+            2: in_progress,
+        }
+        assert iibc.get_builds_by_ids([1])[1] is iibc.get_builds_by_ids([1])[1]
+        assert build_1.call_count == 1
+        assert build_2.call_count == 2
+
+        with pytest.raises(IIBBatchGetError, match="Failed to get 1 of 2 builds") as e:
+            iibc.get_builds_by_ids([3, 1], max_workers=1)
+        assert list(e.value.builds) == [1]
+        assert str(e.value.errors[3]) == "Not found"
@@ -0,0 +1,128 @@
+import sys
+
+import pytest
+import requests_mock
+
+from iiblib.iib_build_details_model import AddModel, IIBBuildDetailsModel
+from iiblib.iib_client import IIBClient
+from iiblib.iib_compact_model import CompactBuildDetails, compact_builds
+
+
+@pytest.fixture
+def fixture_add_build_details_json():
+    json = {
+        "id": 1,
+        "arches": ["x86_64"],
+        "state": "complete",
+        "state_reason": "The request completed successfully",
+        "request_type": "add",
+        "state_history": [
+            {
+                "state": "complete",
+                "state_reason": "The request completed successfully",
+                "updated": "2024-01-01T00:01:00.000000Z",
+            },
+            {
+                "state": "in_progress",
+                "state_reason": "The request was initiated",
+                "updated": "2024-01-01T00:00:00.000000Z",
+            },
+        ],
+        "batch": 1,
+        "batch_annotations": {"batch_annotations": 1},
+        "build_tags": ["v4.5-2020-10-10"],
+        "check_related_images": True,
+        "logs": {},
+        "deprecation_list": [],
+        "updated": "2024-01-01T00:01:00.000000Z",
+        "user": "user@example.com",
+        "binary_image": "binary_image",
+        "binary_image_resolved": "binary_image_resolved",
+        "bundles": ["bundles1"],
+        "bundle_mapping": {"bundle_mapping": ["map"]},
+        "from_index": "from_index",
+        "from_index_resolved": "from_index_resolved",
+        "index_image": "index_image",
+        "index_image_resolved": "index_image_resolved",
+        "internal_index_image_copy": "internal_index_image_copy",
+        "internal_index_image_copy_resolved": "index_image_copy_resolved",
+        "removed_operators": ["operator1"],
+        "organization": None,
+        "omps_operator_version": {"operator": "1.0"},
+        "distribution_scope": "prod",
+    }
+    return json
+
+
+def test_compact_build_details(fixture_add_build_details_json):
+    compact = CompactBuildDetails.from_dict(fixture_add_build_details_json)
+    assert compact.id == 1
+    assert compact.request_type == "add"
+    assert compact.updated == 1704067260000000
+    assert compact.arches == ("x86_64",)
+    assert compact.bundles == ("bundles1",)
+    assert compact.bundle_mapping == {"bundle_mapping": ("map",)}
+    assert compact.logs == {}
+    assert compact.organization is None
+    assert compact.state_history == (
+        ("complete", "The request completed successfully", 1704067260000000),
+        ("in_progress", "The request was initiated", 1704067200000000),
+    )
+    assert compact.to_dict() == fixture_add_build_details_json
+    assert compact.to_model() == AddModel.from_dict(fixture_add_build_details_json)
+    assert compact == CompactBuildDetails.from_model(compact.to_model())
+    assert compact != fixture_add_build_details_json
+    with pytest.raises(AttributeError):
+        compact.source_from_index
+    with pytest.raises(AttributeError):
+        compact._missing
+
+
+def test_compact_build_details_interned(fixture_add_build_details_json):
+    first = CompactBuildDetails.from_dict(fixture_add_build_details_json)
+    data = dict(fixture_add_build_details_json)
+    data["from_index"] = "".join(["from_", "index"])
+    data["index_image"] = "".join(["index_", "image"])
+    second = CompactBuildDetails.from_dict(data)
+    assert second.from_index is first.from_index
+    assert second.from_index is sys.intern("from_index")
+    assert second.logs is first.logs
+    assert second.index_image == first.index_image
+
+
+def test_compact_build_details_defaults(fixture_add_build_details_json):
+    del fixture_add_build_details_json["logs"]
+    del fixture_add_build_details_json["state_history"]
+    compact = CompactBuildDetails.from_dict(fixture_add_build_details_json)
+    assert compact.logs == {}
+    assert compact.state_history == ()
+    del fixture_add_build_details_json["bundles"]
+    with pytest.raises(KeyError):
+        CompactBuildDetails.from_dict(fixture_add_build_details_json)
+    fixture_add_build_details_json["request_type"] = "unknown"
+    with pytest.raises(KeyError, match="Unsupported request type: unknown"):
+        CompactBuildDetails.from_dict(fixture_add_build_details_json)
+
+
+def test_compact_builds(fixture_add_build_details_json):
+    model = IIBBuildDetailsModel.from_dict(fixture_add_build_details_json)
+    assert (
+        list(compact_builds([model, fixture_add_build_details_json]))
+        == [CompactBuildDetails.from_model(model)] * 2
+    )
+
+
+def test_client_iter_builds_compact(fixture_add_build_details_json):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            json={
+                "items": [fixture_add_build_details_json],
+                "meta": {"page": 1, "pages": 1},
+            },
+        )
+        iibc = IIBClient("fake-host")
+        assert list(iibc.iter_all_builds(compact=True)) == [
+            CompactBuildDetails.from_dict(fixture_add_build_details_json)
+        ]
@@ -0,0 +1,164 @@
+import copy
+import os
+import socket
+import stat
+
+import pytest
+import requests_mock
+from mock import MagicMock
+
+from iiblib.iib_build_details_model import RegenerateBundleModel
+from iiblib.iib_build_details_pager import IIBBuildDetailsPager
+from iiblib.iib_client import IIBClient, IIBException
+from iiblib.iib_daemon import IIBDaemon, IIBDaemonClient, default_socket_path
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    factory = MagicMock(
+        side_effect=lambda hostname: IIBClient(hostname, poll_interval=0)
+    )
+    daemon = IIBDaemon(str(tmp_path / "iib.sock"), client_factory=factory)
+    daemon.start()
+    yield daemon
+    daemon.stop()
+
+
+def test_default_socket_path(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert default_socket_path() == "/run/user/1000/iiblib-%s.sock" % os.getuid()
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    private_dir = str(tmp_path / ("iiblib-%s" % os.getuid()))
+    assert default_socket_path() == os.path.join(private_dir, "daemon.sock")
+    assert stat.S_IMODE(os.stat(private_dir).st_mode) == 0o700
+    assert default_socket_path() == os.path.join(private_dir, "daemon.sock")
+
+    # directory accessible by other users isn't used
+    os.chmod(private_dir, 0o755)
+    with pytest.raises(IIBException, match="isn't private directory"):
+        default_socket_path()
+    os.rmdir(private_dir)
+    os.symlink(str(tmp_path), private_dir)
+    with pytest.raises(IIBException, match="isn't private directory"):
+        default_socket_path()
+
+
+def test_daemon_client(daemon, fixture_build_details_json):
+    finished = copy.deepcopy(fixture_build_details_json)
+    finished["state"] = "complete"
+    mode = os.stat(daemon.socket_path).st_mode
+    assert stat.S_IMODE(mode) == 0o600
+
+    iibc = IIBDaemonClient("fake-host", socket_path=daemon.socket_path)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            json=fixture_build_details_json,
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/3",
+            [{"json": fixture_build_details_json}, {"json": finished}],
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds",
+            json={"items": [finished], "meta": {"page": 1}},
+        )
+
+        build = iibc.regenerate_bundle("bundle", organization="organization")
+        assert isinstance(build, RegenerateBundleModel)
+        assert build.id == 3
+        assert m.last_request.json() == {
+            "from_bundle_image": "bundle",
+            "organization": "organization",
+        }
+        assert iibc.regenerate_bundle("bundle", raw=True) == fixture_build_details_json
+
+        assert iibc.wait_for_build(build).state == "complete"
+        assert iibc.get_build(3, raw=True) == finished
+        assert iibc.wait_for_builds([build]) == [
+            RegenerateBundleModel.from_dict(finished)
+        ]
+
+        pager = iibc.get_builds()
+        assert isinstance(pager, IIBBuildDetailsPager)
+        assert pager.items() == [RegenerateBundleModel.from_dict(finished)]
+        pager.reload_page()
+        assert pager.meta == {"page": 1}
+
+        # single client of the service is shared by proxies
+        IIBDaemonClient("fake-host", socket_path=daemon.socket_path).get_build(3)
+    daemon.client_factory.assert_called_once_with("fake-host")
+
+
+def test_daemon_client_errors(daemon):
+    iibc = IIBDaemonClient("fake-host", socket_path=daemon.socket_path)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            status_code=400,
+            json={"error": "Invalid bundle"},
+        )
+        with pytest.raises(IIBException, match="Invalid bundle"):
+            iibc.regenerate_bundle("bundle")
+        with pytest.raises(ValueError, match="future isn't supported"):
+            iibc.regenerate_bundle("bundle", future=True)
+        with pytest.raises(TypeError, match="unexpected keyword argument"):
+            iibc.get_build(3, unknown=True)
+        daemon.client_factory.side_effect = RuntimeError("No credentials")
+        with pytest.raises(IIBException, match="RuntimeError: No credentials"):
+            IIBDaemonClient("other-host", socket_path=daemon.socket_path).get_build(3)
+    with pytest.raises(ValueError, match="Unsupported method"):
+        daemon.call("fake-host", "close", [], {})
+    with pytest.raises(AttributeError):
+        iibc.close()
+
+
+def test_daemon_socket(tmp_path):
+    path = str(tmp_path / "iib.sock")
+    daemon = IIBDaemon(path, client_factory=MagicMock())
+    daemon.start()
+    with pytest.raises(IIBException, match="already running"):
+        IIBDaemon(path).start()
+    daemon.client("fake-host")
+    daemon.stop()
+    assert not os.path.exists(path)
+    daemon.client_factory.return_value.close.assert_called_once_with()
+    daemon.stop()
+
+    # other files are not replaced
+    with open(path, "w"):
+        pass
+    with pytest.raises(IIBException, match="isn't a socket"):
+        daemon.start()
+    os.unlink(path)
+
+    # socket of daemon which didn't exit cleanly is replaced
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    daemon.start()
+    with pytest.raises(TypeError, match="not JSON serializable"):
+        IIBDaemonClient("fake-host", socket_path=path).get_build(3)
+    daemon.client_factory.return_value.get_build.return_value = {"id": 3}
+    assert IIBDaemonClient("fake-host", socket_path=path).get_build(3, raw=True)
+    daemon.stop()
+
+
+def test_socket_of_other_user(tmp_path, monkeypatch):
+    path = str(tmp_path / "iib.sock")
+    daemon = IIBDaemon(path, client_factory=MagicMock())
+    daemon.start()
+    uid = os.getuid()
+    monkeypatch.setattr("os.getuid", lambda: uid + 1)
+    with pytest.raises(IIBException, match="isn't owned by current user"):
+        IIBDaemonClient("fake-host", socket_path=path).get_build(3)
+    with pytest.raises(IIBException, match="isn't owned by current user"):
+        IIBDaemon(path).start()
+    assert not daemon.client_factory.called
+    monkeypatch.undo()
+    daemon.stop()
@@ -0,0 +1,130 @@
+import csv
+import io
+
+import pytest
+import requests_mock
+
+from iiblib.iib_build_details_model import IIBBuildDetailsModel
+from iiblib.iib_client import IIBClient
+from iiblib.iib_export import (
+    COLUMNS,
+    RESOLVED_IMAGE_COLUMNS,
+    build_row,
+    default_format,
+    export_builds,
+)
+
+
+def _build(bid, state="complete"):
+    return {
+        "id": bid,
+        "arches": ["amd64", "s390x"],
+        "batch": bid,
+        "state": state,
+        "state_reason": "state_reason",
+        "request_type": "regenerate-bundle",
+        "state_history": [
+            {
+                "state": state,
+                "state_reason": "state_reason",
+                "updated": "2024-01-01T00:01:00.000000Z",
+            },
+            {
+                "state": "in_progress",
+                "state_reason": "Resolving the container images",
+                "updated": "2024-01-01T00:00:10.000000Z",
+            },
+            {
+                "state": "in_progress",
+                "state_reason": "The request was initiated",
+                "updated": "2024-01-01T00:00:00.000000Z",
+            },
+        ],
+        "updated": "2024-01-01T00:01:00.000000Z",
+        "user": "user@example.com",
+        "bundle_image": "bundle_image",
+        "from_bundle_image": "from_bundle_image",
+        "from_bundle_image_resolved": "from_bundle_image@sha256:%d" % bid,
+        "organization": "organization",
+    }
+
+
+def _page(page, pages, items):
+    return {"items": items, "meta": {"page": page, "pages": pages, "total": 3}}
+
+
+def test_resolved_image_columns():
+    assert "from_index_resolved" in RESOLVED_IMAGE_COLUMNS
+    assert "from_bundle_image_resolved" in RESOLVED_IMAGE_COLUMNS
+    assert "parent_bundle_image_resolved" in RESOLVED_IMAGE_COLUMNS
+
+
+def test_build_row():
+    row = build_row(IIBBuildDetailsModel.from_dict(_build(1)))
+    assert row == build_row(_build(1))
+    assert sorted(row) == sorted(COLUMNS)
+    assert row["id"] == 1
+    assert row["arches"] == ["amd64", "s390x"]
+    assert row["updated"] == 1704067260000000
+    assert row["queue_seconds"] == 10.0
+    assert row["run_seconds"] == 50.0
+    assert row["from_bundle_image_resolved"] == "from_bundle_image@sha256:1"
+    assert row["from_index_resolved"] is None
+
+
+def test_default_format():
+    assert default_format("builds.csv") == "csv"
+    assert default_format("builds.PARQUET") == "parquet"
+    assert default_format("builds.feather") == "arrow"
+
+
+def test_export_builds_csv(tmpdir):
+    path = str(tmpdir.join("builds.csv"))
+    assert export_builds((_build(i) for i in range(1, 6)), path, batch_size=2) == 5
+    with open(path, newline="") as fobj:
+        rows = list(csv.DictReader(fobj))
+    assert [row["id"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert rows[0]["arches"] == "amd64 s390x"
+    assert rows[0]["updated"] == "2024-01-01T00:01:00.000000Z"
+    assert rows[0]["run_seconds"] == "50.0"
+
+
+def test_export_builds_unsupported_format():
+    with pytest.raises(ValueError, match="Unsupported export format: xml.*"):
+        export_builds([], io.StringIO(), fmt="xml")
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_builds_arrow(tmpdir, fmt):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    path = str(tmpdir.join("builds.%s" % fmt))
+    builds = [_build(1), _build(2, state="failed")]
+    assert export_builds(builds, path, batch_size=1) == 2
+    if fmt == "parquet":
+        table = pyarrow.parquet.read_table(path)
+    else:
+        table = pyarrow.ipc.open_stream(path).read_all()
+    assert table.column_names == COLUMNS
+    assert table.schema.field("id").type == pyarrow.int64()
+    assert table.schema.field("updated").type == pyarrow.timestamp("us", tz="UTC")
+    assert table.column("state").to_pylist() == ["complete", "failed"]
+    assert table.column("arches").to_pylist()[0] == ["amd64", "s390x"]
+
+
+def test_client_export_builds():
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            json=_page(1, 2, [_build(3), _build(2)]),
+        )
+        m.register_uri("GET", "/api/v1/builds?page=2", json=_page(2, 2, [_build(1)]))
+        iibc = IIBClient("fake-host")
+        output = io.StringIO()
+        assert iibc.export_builds(output, fmt="csv") == 3
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        assert [row["id"] for row in rows] == ["3", "2", "1"]
+        assert [build.id for build in iibc.iter_all_builds(page=2)] == [1]
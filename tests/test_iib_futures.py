@@ -0,0 +1,99 @@
+import copy
+import threading
+from concurrent.futures import as_completed
+
+import pytest
+import requests
+import requests_mock
+
+from iiblib.iib_client import IIBClient, IIBException
+from iiblib.iib_futures import BuildFuture
+
+
+def _finished(build, bid):
+    ret = copy.deepcopy(build)
+    ret["id"] = bid
+    ret["state"] = "complete"
+    return ret
+
+
+def test_submit_future(fixture_build_details_json):
+    other = copy.deepcopy(fixture_build_details_json)
+    other["id"] = 4
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            [{"json": fixture_build_details_json}, {"json": other}],
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/3",
+            [
+                {"json": fixture_build_details_json},
+                {"json": _finished(fixture_build_details_json, 3)},
+            ],
+        )
+        m.register_uri(
+            "GET", "/api/v1/builds/4", json=_finished(fixture_build_details_json, 4)
+        )
+        iibc = IIBClient("fake-host", poll_interval=0)
+        futures = [
+            iibc.regenerate_bundle("bundle:v1", future=True),
+            iibc.regenerate_bundle("bundle:v2", future=True),
+        ]
+        assert all(isinstance(future, BuildFuture) for future in futures)
+        assert futures[0].bid == 3
+        done = threading.Event()
+        futures[0].add_done_callback(lambda future: done.set())
+
+        finished = [future.result(timeout=10) for future in as_completed(futures)]
+        assert sorted(build.id for build in finished) == [3, 4]
+        assert all(build.state == "complete" for build in finished)
+        assert done.wait(10)
+        assert futures[0].build.state == "complete"
+        assert not futures[0].cancel()
+    assert iibc._build_poller.pending() == 0
+
+
+def test_future_of_finished_build(fixture_build_details_json):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            json=_finished(fixture_build_details_json, 3),
+        )
+        future = IIBClient("fake-host").regenerate_bundle("bundle", future=True)
+        assert future.done()
+        assert future.result().id == 3
+
+
+def test_future_errors(fixture_build_details_json):
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            json=fixture_build_details_json,
+        )
+        m.register_uri("GET", "/api/v1/builds/3", json=fixture_build_details_json)
+        iibc = IIBClient("fake-host", poll_interval=0, wait_for_build_timeout=0)
+        future = iibc.regenerate_bundle("bundle", future=True)
+        with pytest.raises(IIBException, match="Build request 3 was not processed"):
+            future.result(timeout=10)
+
+        m.register_uri(
+            "GET", "/api/v1/builds/3", exc=requests.exceptions.ConnectionError
+        )
+        iibc = IIBClient("fake-host", poll_interval=0)
+        future = iibc.regenerate_bundle("bundle", future=True)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            future.result(timeout=10)
+
+        # unfinished futures fail when client is closed
+        iibc = IIBClient("fake-host", poll_interval=60)
+        future = iibc.regenerate_bundle("bundle", future=True)
+        iibc.close()
+        with pytest.raises(IIBException, match="poller was stopped before build 3"):
+            future.result(timeout=10)
+        with pytest.raises(IIBException, match="poller was stopped"):
+            iibc.regenerate_bundle("bundle", future=True)
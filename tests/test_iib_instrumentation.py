@@ -0,0 +1,182 @@
+import copy
+import gzip
+import json
+
+import pytest
+import requests
+import requests_mock
+
+from iiblib.iib_client import IIBClient
+from iiblib.iib_instrumentation import Histogram, IIBInstrumentation, IIBMetrics
+
+
+@pytest.fixture
+def fixture_queued_json(fixture_build_details_json):
+    fixture_build_details_json["state_history"] = [
+        {
+            "state": "in_progress",
+            "state_reason": "queued",
+            "updated": "2020-02-12T17:00:00.000000Z",
+        }
+    ]
+    return fixture_build_details_json
+
+
+def test_histogram():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 2, 10):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2]
+    assert histogram.count == 3
+    assert histogram.sum == 12.5
+
+
+def test_instrumentation_hooks_do_nothing():
+    hooks = IIBInstrumentation()
+    hooks.request("GET", "builds", 200, 0.1, 0, None)
+    hooks.transfer("builds", "gzip", 10, 100)
+    hooks.decode(0.1, 10)
+    hooks.model("add", 0.1)
+    hooks.poll(1, "complete")
+    hooks.finished(1, "add", "complete", 10)
+
+
+def test_client_metrics(fixture_queued_json):
+    finished = copy.deepcopy(fixture_queued_json)
+    finished["state"] = "complete"
+    finished["state_history"].append(
+        {
+            "state": "complete",
+            "state_reason": "done",
+            "updated": "2020-02-12T17:05:00.000000Z",
+        }
+    )
+    metrics = IIBMetrics()
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            json=fixture_queued_json,
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/3",
+            [
+                {"json": fixture_queued_json},
+                {"json": finished, "headers": {"Content-Length": "100"}},
+            ],
+        )
+        m.register_uri(
+            "GET", "/api/v1/builds/4", exc=requests.exceptions.ConnectionError
+        )
+        iibc = IIBClient("fake-host", poll_interval=0, instrumentation=metrics)
+        assert iibc.iib_session.instrumentation is metrics
+        build = iibc.regenerate_bundle("bundle")
+        iibc.wait_for_build(build)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            iibc.get_build(4)
+
+    assert (
+        metrics.histogram(
+            "iib_request_duration_seconds",
+            method="GET",
+            endpoint="builds/<id>",
+            status="200",
+        ).count
+        == 2
+    )
+    assert (
+        metrics.histogram(
+            "iib_request_duration_seconds",
+            method="GET",
+            endpoint="builds/<id>",
+            status="error",
+        ).count
+        == 1
+    )
+    assert metrics.counter("iib_response_bytes_total", endpoint="builds/<id>") == 100
+    assert metrics.histogram("iib_decode_duration_seconds").count == 3
+    assert (
+        metrics.histogram(
+            "iib_model_duration_seconds", request_type="regenerate-bundle"
+        ).count
+        == 3
+    )
+    assert metrics.counter("iib_polls_total", state="in_progress") == 1
+    assert metrics.counter("iib_polls_total", state="complete") == 1
+    polls = metrics.histogram("iib_build_polls", request_type="regenerate-bundle")
+    assert polls.sum == 2
+    duration = metrics.histogram(
+        "iib_build_duration_seconds",
+        request_type="regenerate-bundle",
+        state="complete",
+    )
+    assert duration.sum == 300
+
+    text = metrics.prometheus_text()
+    assert "# TYPE iib_polls_total counter\n" in text
+    assert 'iib_polls_total{state="complete"} 1\n' in text
+    assert (
+        'iib_build_duration_seconds_bucket{request_type="regenerate-bundle",'
+        'state="complete",le="+Inf"} 1\n'
+    ) in text
+    assert (
+        'iib_build_duration_seconds_sum{request_type="regenerate-bundle",'
+        'state="complete"} 300\n'
+    ) in text
+
+
+def test_listing_metrics(fixture_queued_json):
+    listing = {
+        "items": [fixture_queued_json],
+        "meta": {"page": 1, "pages": 1},
+    }
+    metrics = IIBMetrics()
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds", json=listing)
+        iibc = IIBClient("fake-host", instrumentation=metrics)
+        pager = iibc.get_builds()
+        pager.reload_page()
+        assert len(list(iibc.iter_builds())) == 1
+
+    assert metrics.histogram("iib_decode_duration_seconds").count == 2
+    assert (
+        metrics.histogram(
+            "iib_model_duration_seconds", request_type="regenerate-bundle"
+        ).count
+        == 3
+    )
+
+
+def test_metrics_polls_are_bounded():
+    metrics = IIBMetrics(max_tracked_builds=2)
+    for bid in (1, 2, 1, 3):
+        metrics.poll(bid, "in_progress")
+    # build 2 was polled least recently
+    assert list(metrics._polls) == [1, 3]
+    metrics.finished(1, "add", "complete", None)
+    assert metrics.histogram("iib_build_polls", request_type="add").sum == 2
+    assert list(metrics._polls) == [3]
+
+
+def test_streamed_transfer_metrics():
+    body = json.dumps({"items": [], "meta": {"page": 1}}).encode()
+    metrics = IIBMetrics()
+    client = IIBClient("fake-host", instrumentation=metrics)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds",
+            content=gzip.compress(body),
+            headers={"Content-Encoding": "gzip"},
+        )
+        meta = {}
+        assert list(client.iter_builds(meta=meta)) == []
+        assert meta == {"page": 1}
+
+    assert metrics.counter(
+        "iib_response_compressed_bytes_total", endpoint="builds", encoding="gzip"
+    ) == len(gzip.compress(body))
+    assert metrics.counter(
+        "iib_response_uncompressed_bytes_total", endpoint="builds", encoding="gzip"
+    ) == len(body)
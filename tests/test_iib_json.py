@@ -0,0 +1,124 @@
+import json
+
+import pytest
+import requests_mock
+
+from iiblib.iib_client import IIBClient, IIBException
+from iiblib.iib_json import available_decoders, get_decoder, iter_json_object
+
+
+def test_available_decoders():
+    decoders = available_decoders()
+    assert decoders[-1] == "json"
+
+
+@pytest.mark.parametrize("name", available_decoders())
+def test_get_decoder(name):
+    loads = get_decoder(name)
+    assert loads(b'{"items": [1, 2], "meta": {}}') == {"items": [1, 2], "meta": {}}
+    assert loads('{"a": "b"}') == {"a": "b"}
+    with pytest.raises(ValueError):
+        loads(b"not a json")
+
+
+def test_get_decoder_default_and_callable():
+    assert get_decoder() is get_decoder(available_decoders()[0])
+
+    def custom(content):
+        return content
+
+    assert get_decoder(custom) is custom
+
+
+def test_get_decoder_unknown():
+    with pytest.raises(ValueError, match="JSON decoder foo is not available.*"):
+        get_decoder("foo")
+
+
+@pytest.mark.parametrize("name", available_decoders())
+def test_client_json_decoder(name):
+    calls = []
+    loads = get_decoder(name)
+
+    def counting_loads(content):
+        calls.append(content)
+        return loads(content)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds",
+            status_code=200,
+            json={"items": [], "meta": {"page": 1}},
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/1",
+            status_code=404,
+            json={"error": "The requested resource was not found"},
+        )
+        iibc = IIBClient("fake-host", json_decoder=counting_loads)
+        assert iibc.get_builds(raw=True) == {"items": [], "meta": {"page": 1}}
+        assert len(calls) == 1
+        with pytest.raises(IIBException, match="The requested resource.*"):
+            iibc.get_build(1)
+        assert len(calls) == 2
+
+
+def test_client_invalid_json():
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds", status_code=200, text="<html>")
+        iibc = IIBClient("fake-host", json_decoder="json")
+        with pytest.raises(ValueError):
+            iibc.get_builds()
+
+
+def _chunked(body, size):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 100000])
+def test_iter_json_object(chunk_size):
+    doc = {
+        "items": [{"id": i, "name": "ěšč" * i, "size": -1.25e-3} for i in range(20)],
+        "meta": {"page": 1, "total": 12345678901234},
+        "other": 1.5e10,
+    }
+    body = json.dumps(doc, indent=1).encode("utf-8")
+    parsed = list(iter_json_object(_chunked(body, chunk_size), "items"))
+    assert [value for key, value in parsed if key == "items"] == doc["items"]
+    assert [(key, value) for key, value in parsed if key != "items"] == [
+        ("meta", doc["meta"]),
+        ("other", doc["other"]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (b"{}", []),
+        (b'{"items": []}', []),
+        (b'{"items": 5 }', [("items", 5)]),
+        (b' { "meta" : null } ', [("meta", None)]),
+    ],
+)
+def test_iter_json_object_simple(body, expected):
+    assert list(iter_json_object(_chunked(body, 2), "items")) == expected
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"",
+        b"[1]",
+        b'{"items": [1 2]}',
+        b'{"items": [1,',
+        b'{"a" 1}',
+        b"{1: 2}",
+        b'{"a": 1 "b": 2}',
+        b'{"a": 1x}',
+    ],
+)
+def test_iter_json_object_invalid(body):
+    with pytest.raises(ValueError):
+        list(iter_json_object(_chunked(body, 2), "items"))
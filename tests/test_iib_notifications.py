@@ -0,0 +1,151 @@
+import copy
+import threading
+
+import pytest
+import requests_mock
+from mock import MagicMock
+
+from iiblib.iib_build_details_model import IIBBuildDetailsModel
+from iiblib.iib_circuit_breaker import IIBCircuitBreaker
+from iiblib.iib_client import IIBClient, IIBException
+from iiblib.iib_notifications import (
+    IIBBuildWatcher,
+    IIBNotificationSource,
+    LocalBroker,
+)
+
+
+def test_source_interface():
+    source = IIBNotificationSource()
+    with pytest.raises(NotImplementedError):
+        source.start(lambda data: None)
+    with pytest.raises(NotImplementedError):
+        source.stop()
+
+
+def test_local_broker(fixture_build_details_json):
+    broker = LocalBroker()
+    received = []
+    broker.start(received.append)
+    broker.publish(fixture_build_details_json)
+    broker.publish(IIBBuildDetailsModel.from_dict(fixture_build_details_json))
+    broker.stop()
+    broker.publish(fixture_build_details_json)
+    assert received == [fixture_build_details_json] * 2
+
+
+def test_wait_resolved_by_notification(
+    fixture_build_details_json, fixture_finished_json
+):
+    broker = LocalBroker()
+    with requests_mock.Mocker() as m:
+        get = m.register_uri(
+            "GET",
+            "/api/v1/builds/3",
+            [
+                {"json": fixture_build_details_json},
+                {"json": fixture_finished_json},
+            ],
+        )
+        iibc = IIBClient("fake-host", poll_interval=60)
+        build = IIBBuildDetailsModel.from_dict(fixture_build_details_json)
+        with IIBBuildWatcher(iibc, broker) as watcher:
+            timer = threading.Timer(0.05, broker.publish, [fixture_finished_json])
+            timer.start()
+            finished = watcher.wait_for_build(build, timeout=10)
+            timer.join()
+        # build was polled when waiting started and when notified finished
+        assert get.call_count == 2
+    assert finished.state == "complete"
+    assert not watcher._subscribers
+
+
+def test_wait_falls_back_to_polling(fixture_build_details_json, fixture_finished_json):
+    other = copy.deepcopy(fixture_build_details_json)
+    other["id"] = 4
+    broker = LocalBroker()
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/3",
+            [
+                {"json": fixture_build_details_json},
+                {"json": fixture_finished_json},
+            ],
+        )
+        m.register_uri("GET", "/api/v1/builds/4", json=other)
+        iibc = IIBClient("fake-host", poll_interval=0.01)
+        build = IIBBuildDetailsModel.from_dict(fixture_build_details_json)
+        watcher = IIBBuildWatcher(iibc, broker)
+        watcher.start()
+        # notifications which don't finish the build are ignored
+        broker.publish(fixture_build_details_json)
+        assert not watcher.quiet()
+        assert (
+            watcher.wait_for_builds([build, build], timeout=10)
+            == [IIBBuildDetailsModel.from_dict(fixture_finished_json)] * 2
+        )
+
+        # channel is quiet, timeout is reached by polling
+        with pytest.raises(IIBException, match="Build requests 4 were not processed"):
+            watcher.wait_for_build(IIBBuildDetailsModel.from_dict(other), timeout=0.05)
+        watcher.stop()
+
+
+def test_invalid_notification(fixture_build_details_json):
+    broker = LocalBroker()
+    iibc = IIBClient("fake-host")
+    watcher = IIBBuildWatcher(iibc, broker)
+    watcher.start()
+    del fixture_build_details_json["state"]
+    with pytest.raises(KeyError):
+        broker.publish(fixture_build_details_json)
+    assert watcher.quiet()
+
+
+def test_subscribe(fixture_finished_json):
+    broker = LocalBroker()
+    watcher = IIBBuildWatcher(IIBClient("fake-host"), broker)
+    watcher.start()
+    received = []
+    watcher.subscribe(3, received.append)
+    watcher.subscribe(3, received.append)
+    watcher.unsubscribe(3, received.append)
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds/3", json=fixture_finished_json)
+        broker.publish(fixture_finished_json)
+        broker.publish(fixture_finished_json)
+    # callbacks are called only once
+    assert [build.id for build in received] == [3]
+
+
+def test_forged_notification(fixture_build_details_json, fixture_finished_json):
+    broker = LocalBroker()
+    result_cache = MagicMock()
+    iibc = IIBClient(
+        "fake-host", result_cache=result_cache, circuit_breaker=IIBCircuitBreaker()
+    )
+    watcher = IIBBuildWatcher(iibc, broker)
+    watcher.start()
+    received = []
+    watcher.subscribe(3, received.append)
+    forged = dict(fixture_finished_json, bundle_image="evil.example.com/pwn:latest")
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds/3", json=fixture_build_details_json)
+        m.register_uri("GET", "/api/v1/builds/4", status_code=404, json={})
+        broker.publish(forged)
+        # notification of build nobody waits for isn't fetched
+        broker.publish(dict(forged, id=4))
+        assert m.call_count == 1
+    # build isn't finished in IIB, notified data isn't recorded
+    assert not received
+    assert not iibc._finished_builds
+    assert [c[0][0]["state"] for c in result_cache.store.call_args_list] == [
+        "in_progress"
+    ]
+
+    watcher.subscribe(4, received.append)
+    with requests_mock.Mocker() as m:
+        m.register_uri("GET", "/api/v1/builds/4", status_code=404, json={})
+        broker.publish(dict(forged, id=4))
+    assert not received
@@ -0,0 +1,206 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import mock
+import pytest
+import requests_mock
+
+from iiblib.iib_build_details_model import IIBBuildDetailsModel
+from iiblib.iib_circuit_breaker import CircuitOpenError, IIBCircuitBreaker
+from iiblib.iib_client import MAX_SUBMIT_WORKERS, IIBClient, IIBException
+from iiblib.iib_instrumentation import IIBMetrics
+from iiblib.iib_pipeline import IIBPipeline, Upstream
+
+
+class FakeIIB(object):
+    """Fake IIB service completing every build after first poll"""
+
+    def __init__(self, fail=()):
+        self.fail = fail
+        self.builds = {}
+        self.posts = []
+        self.max_in_progress = 0
+
+    def _model(self, request_type):
+        for sub_cls in IIBBuildDetailsModel.__subclasses__():
+            if sub_cls._accepted_request_type == request_type:
+                return sub_cls
+
+    def post(self, request, context):
+        request_type = request.path.rsplit("/", 1)[1]
+        post_data = request.json()
+        bid = len(self.builds) + 1
+        build = dict(
+            (attr, None) for attr in self._model(request_type)._operation_attrs
+        )
+        build.update(post_data)
+        build.update(
+            {
+                "id": bid,
+                "arches": ["x86_64"],
+                "state": "in_progress",
+                "state_reason": "state_reason",
+                "request_type": request_type,
+                "batch": 1,
+                "updated": "updated",
+                "user": "user@example.com",
+            }
+        )
+        if request_type == "regenerate-bundle":
+            build["bundle_image"] = "bundle-%s" % bid
+        else:
+            build["index_image_resolved"] = "index-%s" % bid
+        self.builds[bid] = build
+        self.posts.append((request_type, post_data))
+        self.max_in_progress = max(
+            self.max_in_progress,
+            len([b for b in self.builds.values() if b["state"] == "in_progress"]),
+        )
+        return build
+
+    def get(self, request, context):
+        build = self.builds[int(request.path.rsplit("/", 1)[1])]
+        if build["state"] == "in_progress":
+            build["state"] = "in_progress_polled"
+        elif build["state"] == "in_progress_polled":
+            failed = build.get("from_index") in self.fail
+            build["state"] = "failed" if failed else "complete"
+        ret = dict(build)
+        if ret["state"] == "in_progress_polled":
+            ret["state"] = "in_progress"
+        return ret
+
+
+@pytest.fixture
+def fake_iib():
+    fake = FakeIIB(fail=("index-b",))
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", requests_mock.ANY, json=fake.post)
+        m.register_uri("GET", requests_mock.ANY, json=fake.get)
+        yield fake
+
+
+def test_pipeline(fake_iib):
+    iibc = IIBClient("fake-host", poll_interval=0)
+    pipeline = IIBPipeline(iibc, concurrency={"add": 2})
+    pipeline.add("regen", "regenerate_bundle", bundle_image="bundle:v1")
+    for index in ("index-a", "index-b", "index-c"):
+        pipeline.add(
+            index,
+            "add_bundles",
+            index_image=index,
+            bundles=[Upstream("regen", "bundle_image")],
+            arches=["x86_64"],
+        )
+        pipeline.add(
+            "%s-deprecations" % index,
+            "add_deprecations",
+            index_image=Upstream(index, "index_image_resolved"),
+            deprecation_schema="schema",
+            operator_package="package",
+        )
+    pipeline.add("final", "regenerate_bundle", depends_on=["index-a-deprecations"])
+
+    nodes = pipeline.run()
+
+    assert dict((name, node.state) for name, node in nodes.items()) == {
+        "regen": "complete",
+        "index-a": "complete",
+        "index-b": "failed",
+        "index-c": "complete",
+        "index-a-deprecations": "complete",
+        "index-b-deprecations": "cancelled",
+        "index-c-deprecations": "complete",
+        "final": "failed",
+    }
+    # missing bundle_image argument
+    assert isinstance(nodes["final"].error, TypeError)
+    assert nodes["index-b-deprecations"].build is None
+
+    posts = dict(
+        (post_data["from_index"], post_data)
+        for request_type, post_data in fake_iib.posts
+        if request_type == "add"
+    )
+    assert posts["index-c"]["bundles"] == ["bundle-1"]
+    deprecations = sorted(
+        post_data["from_index"]
+        for request_type, post_data in fake_iib.posts
+        if request_type == "add-deprecations"
+    )
+    assert deprecations == [
+        nodes["index-a"].build.index_image_resolved,
+        nodes["index-c"].build.index_image_resolved,
+    ]
+    # concurrency of add builds was capped
+    assert fake_iib.max_in_progress == 2
+
+
+def test_pipeline_submit_workers_are_capped(fake_iib):
+    iibc = IIBClient("fake-host", poll_interval=0)
+    pipeline = IIBPipeline(iibc)
+    for index in range(20):
+        pipeline.add(
+            "index-%s" % index,
+            "add_bundles",
+            index_image="index-%s" % index,
+            bundles=["bundle"],
+            arches=["x86_64"],
+        )
+    with mock.patch(
+        "iiblib.iib_pipeline.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+    ) as pool:
+        nodes = pipeline.run()
+    pool.assert_called_once_with(max_workers=MAX_SUBMIT_WORKERS)
+    assert all(node.state == "complete" for node in nodes.values())
+
+
+def test_pipeline_add_errors():
+    pipeline = IIBPipeline(IIBClient("fake-host"))
+    pipeline.add("regen", "regenerate_bundle", bundle_image="bundle:v1")
+    with pytest.raises(ValueError, match="Node regen already exists."):
+        pipeline.add("regen", "regenerate_bundle", bundle_image="bundle:v1")
+    with pytest.raises(ValueError, match="Unknown operation: rebuild_index.*"):
+        pipeline.add("rebuild", "rebuild_index", index_image="index")
+    with pytest.raises(ValueError, match="Node add depends on unknown node other."):
+        pipeline.add(
+            "add",
+            "add_bundles",
+            index_image="index",
+            bundles=[Upstream("other", "bundle_image")],
+            arches=[],
+        )
+
+
+def test_pipeline_timeout(fake_iib):
+    iibc = IIBClient("fake-host", poll_interval=0, wait_for_build_timeout=0)
+    pipeline = IIBPipeline(iibc)
+    pipeline.add("regen", "regenerate_bundle", bundle_image="bundle:v1")
+    with pytest.raises(IIBException, match="Timeout reached. Pipeline nodes regen .*"):
+        pipeline.run()
+
+
+def test_pipeline_skips_polls_while_circuit_is_open(fake_iib):
+    breaker = IIBCircuitBreaker(window=1, min_requests=1)
+    metrics = IIBMetrics()
+    iibc = IIBClient(
+        "fake-host", poll_interval=0, circuit_breaker=breaker, instrumentation=metrics
+    )
+    pipeline = IIBPipeline(iibc)
+    pipeline.add("regen", "regenerate_bundle", bundle_image="bundle:v1")
+    rejected = []
+
+    def _before_request(original=breaker.before_request):
+        # reject first poll of the build
+        if fake_iib.builds and not rejected:
+            rejected.append(True)
+            raise CircuitOpenError("open")
+        original()
+
+    breaker.before_request = _before_request
+    nodes = pipeline.run()
+    assert nodes["regen"].state == "complete"
+    assert rejected
+    assert metrics.counter("iib_polls_total", state="error") == 1
+    assert (
+        metrics.histogram("iib_build_polls", request_type="regenerate-bundle").sum == 3
+    )
@@ -0,0 +1,121 @@
+import io
+import json
+
+import requests_mock
+from mock import MagicMock
+
+from iiblib.iib_client import IIBClient
+from iiblib.iib_instrumentation import CompositeInstrumentation, IIBMetrics
+from iiblib.iib_profile import IIBProfiler
+from iiblib.iib_retry import IIBRetryPolicy
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_profiler_trace():
+    clock = FakeClock()
+    profiler = IIBProfiler(clock=clock)
+    clock.now = 2.0
+    profiler.request("GET", "builds/<id>", 200, 0.5, 1, 10)
+    profiler.auth(0.25)
+    profiler.sleep(1, "poll")
+    profiler.retry("builds/add", 1, "status 429")
+    profiler.poll(3, "in_progress")
+
+    events = profiler.trace()["traceEvents"]
+    assert [(e["name"], e["ph"], e["cat"]) for e in events] == [
+        ("GET builds/<id>", "X", "http"),
+        ("auth", "X", "auth"),
+        ("sleep poll", "X", "sleep"),
+        ("retry builds/add", "i", "retry"),
+        ("poll 3", "i", "poll"),
+    ]
+    assert events[0]["ts"] == 1.5e6
+    assert events[0]["dur"] == 0.5e6
+    assert events[0]["args"] == {"status": 200, "retries": 1, "size": 10}
+    assert events[3]["args"] == {"attempt": 1, "reason": "status 429"}
+
+    fobj = io.StringIO()
+    profiler.write(fobj)
+    assert json.loads(fobj.getvalue()) == profiler.trace()
+
+
+def test_composite_instrumentation():
+    first = MagicMock()
+    second = MagicMock()
+    composite = CompositeInstrumentation(first, second)
+    composite.request("GET", "builds", 200, 0.1, 0, None)
+    composite.decode(0.1, 10)
+    composite.model("add", 0.1)
+    composite.auth(0.1)
+    composite.retry("builds/add", 1, "connection error")
+    composite.sleep(1, "poll")
+    composite.poll(1, "complete")
+    composite.finished(1, "add", "complete", 10)
+    for instrumentation in (first, second):
+        assert [call[0] for call in instrumentation.method_calls] == [
+            "request",
+            "decode",
+            "model",
+            "auth",
+            "retry",
+            "sleep",
+            "poll",
+            "finished",
+        ]
+
+
+def test_client_profile(tmpdir, fixture_finished_json):
+    path = str(tmpdir.join("trace.json"))
+    auth = MagicMock()
+    metrics = IIBMetrics()
+    policy = IIBRetryPolicy(sleep=MagicMock())
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            [
+                {"status_code": 429, "headers": {"Retry-After": "1"}},
+                {"json": fixture_finished_json},
+            ],
+        )
+        with IIBClient(
+            "fake-host",
+            auth=auth,
+            instrumentation=metrics,
+            retry_policy=policy,
+            profile=path,
+        ) as iibc:
+            assert isinstance(iibc.instrumentation, CompositeInstrumentation)
+            iibc.regenerate_bundle("bundle")
+            iibc.sleep(0, "poll")
+    auth.make_auth.assert_called_once_with(iibc.iib_session)
+    policy.sleep.assert_called_once_with(1)
+
+    with open(path) as fobj:
+        names = [event["name"] for event in json.load(fobj)["traceEvents"]]
+    assert names == [
+        "auth",
+        "POST builds/regenerate-bundle",
+        "retry builds/regenerate-bundle",
+        "sleep retry",
+        "POST builds/regenerate-bundle",
+        "decode",
+        "model regenerate-bundle",
+        "sleep poll",
+    ]
+    # other instrumentation is called too
+    assert metrics.histogram("iib_decode_duration_seconds").count == 1
+
+
+def test_client_profile_without_path():
+    iibc = IIBClient("fake-host", profile=True)
+    assert iibc.instrumentation is iibc.profiler
+    iibc.close()
+    assert IIBClient("fake-host").profiler is None
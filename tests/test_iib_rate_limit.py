@@ -0,0 +1,175 @@
+import copy
+import threading
+import time
+
+import pytest
+import requests_mock
+from mock import MagicMock
+
+from iiblib.iib_client import IIBClient, IIBException
+from iiblib.iib_rate_limit import IIBRateLimiter, TokenBucket
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def fixture_add_build_details_json():
+    json = {
+        "id": 1,
+        "arches": ["x86_64"],
+        "state": "in_progress",
+        "state_reason": "state_reason",
+        "request_type": "add",
+        "state_history": [],
+        "batch": 1,
+        "batch_annotations": {"batch_annotations": 1},
+        "build_tags": [],
+        "check_related_images": True,
+        "logs": {},
+        "deprecation_list": [],
+        "updated": "updated",
+        "user": "user@example.com",
+        "binary_image": "binary_image",
+        "binary_image_resolved": "binary_image_resolved",
+        "bundles": ["bundles1"],
+        "bundle_mapping": {},
+        "from_index": "from_index",
+        "from_index_resolved": "from_index_resolved",
+        "index_image": "index_image",
+        "index_image_resolved": "index_image_resolved",
+        "internal_index_image_copy": "internal_index_image_copy",
+        "internal_index_image_copy_resolved": "index_image_copy_resolved",
+        "removed_operators": [],
+        "organization": "organization",
+        "omps_operator_version": {},
+        "distribution_scope": "null",
+    }
+    return json
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(2, burst=3, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == 0.5
+    assert bucket.acquire() == 0.5
+    clock.now += 10
+    # bucket doesn't overflow
+    assert [bucket.acquire() for _ in range(4)] == [0, 0, 0, 0.5]
+    assert clock.sleeps == [0.5, 0.5, 0.5]
+
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_rate_limiter_throttle():
+    limiter = IIBRateLimiter(rate_limits={"builds/<id>": (1, 1), "*": 100})
+    bucket = MagicMock()
+    bucket.acquire.return_value = 0.25
+    limiter.buckets["builds/<id>"] = bucket
+    assert limiter.throttle("builds/1") == 0.25
+    assert limiter.throttle("builds/add") == 0
+    assert bucket.acquire.call_count == 1
+
+
+def test_rate_limiter_in_flight():
+    limiter = IIBRateLimiter(max_in_flight={"add": 2, "*": 3})
+    assert limiter.reserve("add")
+    assert limiter.reserve("add")
+    assert not limiter.reserve("add", timeout=0)
+    assert limiter.reserve("rm")
+    assert not limiter.reserve("rm", timeout=0)
+
+    limiter.submitted("add", {"id": 1, "state": "in_progress"})
+    limiter.submitted("add", {"id": 2, "state": "complete"})
+    limiter.release("rm")
+    assert limiter.in_flight() == [1]
+    assert limiter.in_flight("rm") == []
+
+    refresh = MagicMock(
+        side_effect=lambda: limiter.update({"id": 1, "state": "failed"})
+    )
+    assert limiter.reserve("add")
+    assert limiter.reserve("add", refresh=refresh, poll_interval=0)
+    assert refresh.call_count == 1
+    assert limiter.in_flight() == []
+
+
+def test_rate_limiter_single_refresh():
+    limiter = IIBRateLimiter(max_in_flight={"add": 1})
+    assert limiter.reserve("add")
+    limiter.submitted("add", {"id": 1, "state": "in_progress"})
+    started = threading.Barrier(8)
+
+    def _refresh():
+        time.sleep(0.1)
+        limiter.update({"id": 1, "state": "complete"})
+
+    refresh = MagicMock(side_effect=_refresh)
+
+    def _submit():
+        started.wait()
+        assert limiter.reserve("add", refresh=refresh, poll_interval=60)
+        limiter.release("add")
+
+    threads = [threading.Thread(target=_submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    # blocked submitters waited for single refresh of in-flight builds
+    assert refresh.call_count == 1
+
+
+def test_client_governor(fixture_add_build_details_json):
+    polls = []
+
+    def _post_callback(request, context):
+        ret = copy.deepcopy(fixture_add_build_details_json)
+        ret["id"] = len(posts) + 1
+        posts.append(ret["id"])
+        return ret
+
+    def _get_callback(request, context):
+        ret = copy.deepcopy(fixture_add_build_details_json)
+        ret["id"] = int(request.path.rsplit("/", 1)[1])
+        polls.append(ret["id"])
+        if len(polls) % 2 == 0:
+            ret["state"] = "complete"
+        return ret
+
+    posts = []
+    limiter = IIBRateLimiter(max_in_flight={"add": 1})
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", "/api/v1/builds/add", json=_post_callback)
+        m.register_uri("GET", requests_mock.ANY, json=_get_callback)
+        iibc = IIBClient("fake-host", poll_interval=0, rate_limiter=limiter)
+        assert iibc.iib_session.rate_limiter is limiter
+        for _ in range(3):
+            iibc.add_bundles("index_image", ["bundle"], ["x86_64"])
+        # every next build was submitted after previous one finished
+        assert posts == [1, 2, 3]
+        assert polls == [1, 1, 2, 2]
+        assert limiter.in_flight() == [3]
+
+        m.register_uri("POST", "/api/v1/builds/rm", status_code=500)
+        limiter.max_in_flight["rm"] = 1
+        with pytest.raises(Exception):
+            iibc.remove_operators("index_image", ["operator"], ["x86_64"])
+        assert limiter.reserve("rm", timeout=0)
+
+    iibc = IIBClient("fake-host", wait_for_build_timeout=0, rate_limiter=limiter)
+    with pytest.raises(IIBException, match="Timeout reached. No free slot for rm .*"):
+        iibc.remove_operators("index_image", ["operator"], ["x86_64"])
@@ -0,0 +1,238 @@
+import copy
+
+import pytest
+import requests_mock
+
+from iiblib.iib_build_details_model import RecursiveRelatedBundlesModel
+from iiblib.iib_client import IIBClient
+from iiblib.iib_result_cache import IIBResultCache, digest_of
+
+DIGEST = "sha256:%s" % ("a" * 64)
+
+
+@pytest.fixture
+def fixture_recursive_related_bundles_build_details_json():
+    json = {
+        "id": 5,
+        "arches": ["x86_64"],
+        "batch": 1,
+        "batch_annotations": {"batch_annotations": 1},
+        "parent_bundle_image": "registry.example.com/bundle:v1",
+        "parent_bundle_image_resolved": "registry.example.com/bundle@%s" % DIGEST,
+        "nested_bundles": {"url": "url", "expiration": "expiration"},
+        "organization": "organization",
+        "logs": {},
+        "request_type": "recursive-related-bundles",
+        "state": "complete",
+        "state_history": [],
+        "state_reason": "state_reason",
+        "updated": "updated",
+        "user": "user@example.com",
+    }
+    return json
+
+
+def test_digest_of():
+    assert digest_of("registry.example.com/bundle@%s" % DIGEST) == DIGEST
+    assert digest_of("registry.example.com:443/bundle:v1") is None
+    assert digest_of("registry.example.com/bundle@latest") is None
+    assert digest_of(None) is None
+
+
+def test_result_cache(fixture_recursive_related_bundles_build_details_json):
+    cache = IIBResultCache()
+    build = RecursiveRelatedBundlesModel.from_dict(
+        fixture_recursive_related_bundles_build_details_json
+    )
+    assert cache.store(build)
+    assert not cache.store(build)
+    assert len(cache) == 1
+
+    # same digest in different repository
+    pull_spec = "other.example.com/bundle@%s" % DIGEST
+    assert (
+        cache.lookup(
+            "recursive-related-bundles", pull_spec, organization="organization"
+        )
+        == build
+    )
+    assert (
+        cache.lookup("recursive-related-bundles", pull_spec, organization="other")
+        is None
+    )
+    assert cache.lookup("recursive-related-bundles", pull_spec) is None
+    assert (
+        cache.lookup(
+            "recursive-related-bundles",
+            "registry.example.com/bundle:v1",
+            organization="organization",
+        )
+        is None
+    )
+    assert cache.lookup("add", pull_spec) is None
+
+
+def test_result_cache_not_stored(fixture_recursive_related_bundles_build_details_json):
+    cache = IIBResultCache()
+    in_progress = copy.deepcopy(fixture_recursive_related_bundles_build_details_json)
+    in_progress["state"] = "in_progress"
+    unresolved = copy.deepcopy(fixture_recursive_related_bundles_build_details_json)
+    unresolved["parent_bundle_image_resolved"] = None
+    other = copy.deepcopy(fixture_recursive_related_bundles_build_details_json)
+    other["request_type"] = "add"
+    for build in (in_progress, unresolved, other):
+        assert not cache.store(build)
+    assert len(cache) == 0
+
+
+def test_result_cache_resolver_and_persistence(
+    tmpdir, fixture_recursive_related_bundles_build_details_json
+):
+    path = str(tmpdir.join("cache.json"))
+    cache = IIBResultCache(path=path)
+    cache.store(fixture_recursive_related_bundles_build_details_json)
+
+    resolved = {"registry.example.com/bundle:v1": DIGEST}
+    cache = IIBResultCache(digest_resolver=resolved.get, path=path)
+    assert len(cache) == 1
+    assert cache.lookup(
+        "recursive-related-bundles",
+        "registry.example.com/bundle:v1",
+        organization="organization",
+    ) == RecursiveRelatedBundlesModel.from_dict(
+        fixture_recursive_related_bundles_build_details_json
+    )
+
+
+def test_client_recursive_related_bundles(
+    fixture_recursive_related_bundles_build_details_json,
+):
+    in_progress = copy.deepcopy(fixture_recursive_related_bundles_build_details_json)
+    in_progress["state"] = "in_progress"
+    pull_spec = "registry.example.com/bundle@%s" % DIGEST
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            "POST", "/api/v1/builds/recursive-related-bundles", json=in_progress
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds/5",
+            json=fixture_recursive_related_bundles_build_details_json,
+        )
+
+        iibc = IIBClient("fake-host")
+        assert iibc.recursive_related_bundles(
+            pull_spec, organization="organization"
+        ) == RecursiveRelatedBundlesModel.from_dict(in_progress)
+        assert m.last_request.json() == {
+            "parent_bundle_image": pull_spec,
+            "organization": "organization",
+        }
+        assert iibc.recursive_related_bundles(pull_spec, raw=True) == in_progress
+        assert m.last_request.json() == {"parent_bundle_image": pull_spec}
+
+        iibc = IIBClient("fake-host", result_cache=IIBResultCache())
+        build = iibc.recursive_related_bundles(pull_spec, organization="organization")
+        iibc.wait_for_build(build)
+        calls = m.call_count
+        assert iibc.recursive_related_bundles(
+            pull_spec, organization="organization"
+        ) == RecursiveRelatedBundlesModel.from_dict(
+            fixture_recursive_related_bundles_build_details_json
+        )
+        assert (
+            iibc.recursive_related_bundles(
+                pull_spec, organization="organization", raw=True
+            )
+            == fixture_recursive_related_bundles_build_details_json
+        )
+        assert m.call_count == calls
+
+
+@pytest.fixture
+def fixture_regenerate_bundle_build_details_json():
+    json = {
+        "id": 3,
+        "arches": ["x86_64"],
+        "state": "complete",
+        "state_reason": "state_reason",
+        "request_type": "regenerate-bundle",
+        "state_history": [],
+        "batch": 1,
+        "batch_annotations": {"batch_annotations": 1},
+        "logs": {},
+        "updated": "updated",
+        "user": "user@example.com",
+        "bundle_image": "registry.example.com/iib:3",
+        "from_bundle_image": "registry.example.com/bundle:v1",
+        "from_bundle_image_resolved": "registry.example.com/bundle@%s" % DIGEST,
+        "organization": "organization",
+    }
+    return json
+
+
+def test_client_regenerate_bundle_cached(
+    fixture_regenerate_bundle_build_details_json,
+):
+    pull_spec = "registry.example.com/bundle@%s" % DIGEST
+    in_progress = copy.deepcopy(fixture_regenerate_bundle_build_details_json)
+    in_progress["state"] = "in_progress"
+    other_org = copy.deepcopy(fixture_regenerate_bundle_build_details_json)
+    other_org["id"] = 2
+    other_org["organization"] = None
+    other_org["bundle_image"] = "registry.example.com/iib:2"
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", "/api/v1/builds/regenerate-bundle", json=in_progress)
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            json={
+                "items": [fixture_regenerate_bundle_build_details_json],
+                "meta": {"page": 1, "pages": 3},
+            },
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=2",
+            json={"items": [other_org, in_progress], "meta": {"page": 2, "pages": 3}},
+        )
+
+        iibc = IIBClient("fake-host")
+        with pytest.raises(ValueError, match="Result cache is not set."):
+            iibc.load_result_cache()
+
+        iibc = IIBClient("fake-host", result_cache=IIBResultCache())
+        assert iibc.regenerate_bundle(pull_spec, "organization").state == (
+            "in_progress"
+        )
+        assert iibc.load_result_cache(max_pages=2) == 2
+        assert m.call_count == 3
+
+        calls = m.call_count
+        cached = iibc.regenerate_bundle(pull_spec, "organization")
+        assert cached.bundle_image == "registry.example.com/iib:3"
+        assert iibc.regenerate_bundle(pull_spec, raw=True) == other_org
+        assert m.call_count == calls
+        assert iibc.regenerate_bundle("registry.example.com/bundle:v1").state == (
+            "in_progress"
+        )
+        assert m.call_count == calls + 1
+
+
+def test_result_cache_store_many(
+    tmpdir,
+    fixture_regenerate_bundle_build_details_json,
+    fixture_recursive_related_bundles_build_details_json,
+):
+    path = str(tmpdir.join("cache.json"))
+    cache = IIBResultCache(path=path)
+    builds = [
+        RecursiveRelatedBundlesModel.from_dict(
+            fixture_recursive_related_bundles_build_details_json
+        ),
+        fixture_regenerate_bundle_build_details_json,
+        fixture_regenerate_bundle_build_details_json,
+    ]
+    assert cache.store_many(builds) == 2
+    assert cache.store_many(builds) == 0
+    assert len(IIBResultCache(path=path)) == 2
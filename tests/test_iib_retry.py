@@ -0,0 +1,243 @@
+import copy
+import time
+
+import pytest
+import requests
+import requests_mock
+from mock import MagicMock
+from requests.packages.urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from iiblib.iib_client import IIBClient
+from iiblib.iib_retry import IIBRetryPolicy, request_was_sent
+from iiblib.iib_timestamps import format_timestamp
+
+
+@pytest.fixture
+def fixture_regenerate_bundle_build_details_json():
+    json = {
+        "id": 3,
+        "arches": ["x86_64"],
+        "state": "in_progress",
+        "state_reason": "state_reason",
+        "request_type": "regenerate-bundle",
+        "state_history": [
+            {
+                "state": "in_progress",
+                "state_reason": "The request was initiated",
+                "updated": format_timestamp(int(time.time() * 10**6)),
+            }
+        ],
+        "batch": 1,
+        "batch_annotations": {"batch_annotations": 1},
+        "logs": {},
+        "updated": format_timestamp(int(time.time() * 10**6)),
+        "user": "user@example.com",
+        "bundle_image": None,
+        "from_bundle_image": "bundle:v1",
+        "from_bundle_image_resolved": None,
+        "organization": "organization",
+    }
+    return json
+
+
+def test_urllib3_retry():
+    retry = IIBRetryPolicy(retries=5, backoff_factor=1).urllib3_retry()
+    assert retry.total == 5
+    assert retry.is_retry("GET", 429)
+    assert retry.is_retry("GET", 503)
+    assert not retry.is_retry("GET", 404)
+    assert not retry.is_retry("POST", 503)
+
+
+def test_backoff():
+    policy = IIBRetryPolicy(backoff_factor=2)
+    assert [policy.backoff(attempt) for attempt in (1, 2, 3)] == [0, 4, 8]
+
+
+def test_retry_after():
+    policy = IIBRetryPolicy(max_retry_after=60)
+    response = requests.Response()
+    assert policy.retry_after(response) is None
+    response.headers["Retry-After"] = "5"
+    assert policy.retry_after(response) == 5
+    response.headers["Retry-After"] = "3600"
+    assert policy.retry_after(response) == 60
+    response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert policy.retry_after(response) == 0
+    response.headers["Retry-After"] = "soon"
+    assert policy.retry_after(response) is None
+
+
+def test_matches(fixture_regenerate_bundle_build_details_json):
+    policy = IIBRetryPolicy(clock_skew=60)
+    build = fixture_regenerate_bundle_build_details_json
+    post_data = {"from_bundle_image": "bundle:v1", "organization": "organization"}
+    now = time.time()
+    assert policy.matches("regenerate-bundle", post_data, build, now)
+    assert not policy.matches("add", post_data, build, now)
+    assert not policy.matches("regenerate-bundle", post_data, build, now + 120)
+    post_data["organization"] = "other"
+    assert not policy.matches("regenerate-bundle", post_data, build, now)
+
+
+def test_matches_creation_time(fixture_regenerate_bundle_build_details_json):
+    policy = IIBRetryPolicy(clock_skew=60)
+    build = fixture_regenerate_bundle_build_details_json
+    now = time.time()
+    # old build updated recently isn't created by the submission
+    build["state_history"][0]["updated"] = format_timestamp(int((now - 3600) * 10**6))
+    build["state_history"].append(
+        {
+            "state": "complete",
+            "state_reason": "The request completed successfully",
+            "updated": format_timestamp(int(now * 10**6)),
+        }
+    )
+    assert not policy.matches("regenerate-bundle", {}, build, now)
+    assert policy.matches("regenerate-bundle", {}, build, now - 3600)
+    build["state_history"] = []
+    assert not policy.matches("regenerate-bundle", {}, build, now - 3600)
+
+
+def test_submit_connection_error(fixture_regenerate_bundle_build_details_json):
+    other = copy.deepcopy(fixture_regenerate_bundle_build_details_json)
+    other["id"] = 2
+    other["from_bundle_image"] = "bundle:v2"
+    policy = IIBRetryPolicy(sleep=MagicMock())
+    with requests_mock.Mocker() as m:
+        post = m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            [
+                {"exc": requests.exceptions.ConnectionError},
+                {"json": other},
+            ],
+        )
+        listing = m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            json={
+                "items": [fixture_regenerate_bundle_build_details_json],
+                "meta": {},
+            },
+        )
+        iibc = IIBClient("fake-host", retry_policy=policy)
+        assert iibc.retry_policy is policy
+
+        # IIB didn't receive the request, it's submitted again
+        build = iibc.regenerate_bundle("bundle:v2")
+        assert build.id == 2
+        assert post.call_count == 2
+        assert listing.last_request.qs == {
+            "page": ["1"],
+            "request_type": ["regenerate-bundle"],
+            "verbose": ["true"],
+        }
+
+        # IIB received the request, existing build is returned
+        post = m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            exc=requests.exceptions.ConnectionError,
+        )
+        build = iibc.regenerate_bundle("bundle:v1", organization="organization")
+        assert build.id == 3
+        assert post.call_count == 1
+        # builds are filtered by user of previous submission
+        assert listing.last_request.qs["user"] == ["user@example.com"]
+
+        # no more retries
+        with pytest.raises(requests.exceptions.ConnectionError):
+            IIBClient(
+                "fake-host", retry_policy=IIBRetryPolicy(post_retries=0)
+            ).regenerate_bundle("bundle:v1")
+
+
+def test_submit_scans_pages(fixture_regenerate_bundle_build_details_json):
+    now = time.time()
+    newer = copy.deepcopy(fixture_regenerate_bundle_build_details_json)
+    newer["id"] = 4
+    newer["from_bundle_image"] = "bundle:v2"
+    older = copy.deepcopy(newer)
+    older["id"] = 1
+    older["state_history"][0]["updated"] = format_timestamp(int((now - 3600) * 10**6))
+    policy = IIBRetryPolicy(sleep=MagicMock())
+    with requests_mock.Mocker() as m:
+        post = m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            exc=requests.exceptions.ReadTimeout,
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=1",
+            json={"items": [newer], "meta": {"page": 1, "pages": 3}},
+        )
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=2",
+            json={
+                "items": [fixture_regenerate_bundle_build_details_json],
+                "meta": {"page": 2, "pages": 3},
+            },
+        )
+        build = IIBClient("fake-host", retry_policy=policy).regenerate_bundle(
+            "bundle:v1", organization="organization"
+        )
+        assert build.id == 3
+        assert post.call_count == 1
+
+        # scan stops at builds created before the submission
+        m.register_uri(
+            "GET",
+            "/api/v1/builds?page=2",
+            json={"items": [older], "meta": {"page": 2, "pages": 3}},
+        )
+        page_3 = m.register_uri(
+            "GET", "/api/v1/builds?page=3", json={"items": [], "meta": {}}
+        )
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            IIBClient(
+                "fake-host", retry_policy=IIBRetryPolicy(post_retries=1)
+            ).regenerate_bundle("bundle:v3")
+        assert not page_3.called
+
+
+def test_submit_connect_error_not_repeated():
+    error = requests.exceptions.ConnectionError(
+        MaxRetryError(
+            None, "/api/v1/builds/regenerate-bundle", NewConnectionError(None, "down")
+        )
+    )
+    assert not request_was_sent(error)
+    assert not request_was_sent(requests.exceptions.ConnectTimeout())
+    assert request_was_sent(requests.exceptions.ReadTimeout())
+    assert request_was_sent(requests.exceptions.ConnectionError())
+    with requests_mock.Mocker() as m:
+        post = m.register_uri("POST", "/api/v1/builds/regenerate-bundle", exc=error)
+        listing = m.register_uri("GET", "/api/v1/builds", json={"items": []})
+        with pytest.raises(requests.exceptions.ConnectionError):
+            IIBClient(
+                "fake-host", retry_policy=IIBRetryPolicy(sleep=MagicMock())
+            ).regenerate_bundle("bundle:v1")
+        # urllib3 already retried the connection
+        assert post.call_count == 1
+        assert not listing.called
+
+
+def test_submit_retry_after(fixture_regenerate_bundle_build_details_json):
+    policy = IIBRetryPolicy(backoff_factor=1, sleep=MagicMock())
+    with requests_mock.Mocker() as m:
+        post = m.register_uri(
+            "POST",
+            "/api/v1/builds/regenerate-bundle",
+            [
+                {"status_code": 429, "headers": {"Retry-After": "7"}},
+                {"status_code": 503, "json": {"error": "unavailable"}},
+                {"json": fixture_regenerate_bundle_build_details_json},
+            ],
+        )
+        iibc = IIBClient("fake-host", retry_policy=policy)
+        assert iibc.regenerate_bundle("bundle:v1").id == 3
+        assert post.call_count == 3
+        assert [call[0][0] for call in policy.sleep.call_args_list] == [7, 2]
@@ -1,6 +1,12 @@
-from mock import patch
+import gzip
+import json
 
-from iiblib.iib_session import IIBSession
+import requests_mock
+from mock import MagicMock, patch
+from requests.packages.urllib3.response import HTTPResponse
+
+from iiblib.iib_instrumentation import IIBMetrics
+from iiblib.iib_session import IIBSession, accept_encoding, normalize_endpoint
 
 
 @patch("requests.Session.get")
@@ -26,3 +32,93 @@ def test_iib_session_methods(patched_delete, patched_put, patched_post, patched_
     patched_delete.assert_called_with(
         "https://fake-host/api/v1/fake-end-point", verify=True
     )
+
+
+def test_normalize_endpoint():
+    assert normalize_endpoint("builds/123") == "builds/<id>"
+    assert normalize_endpoint("/builds?page=2") == "builds"
+    assert normalize_endpoint("builds/add") == "builds/add"
+
+
+@patch("requests.Session.get")
+def test_iib_session_rate_limiter(patched_get):
+    limiter = MagicMock()
+    iibs = IIBSession("fake-host", rate_limiter=limiter)
+    iibs.get("builds/1")
+    limiter.throttle.assert_called_once_with("builds/1")
+    patched_get.assert_called_once_with(
+        "https://fake-host/api/v1/builds/1", verify=True
+    )
+
+
+def test_iib_session_conditional_requests():
+    iibs = IIBSession("fake-host", max_validators=1)
+    with requests_mock.Mocker() as m:
+        build = m.register_uri(
+            "GET",
+            "/api/v1/builds/1",
+            [
+                {
+                    "json": {},
+                    "headers": {
+                        "ETag": '"v1"',
+                        "Last-Modified": "Wed, 12 Feb 2020 17:00:00 GMT",
+                    },
+                },
+                {"status_code": 304},
+            ],
+        )
+        m.register_uri("GET", "/api/v1/builds/2", json={}, headers={"ETag": '"v2"'})
+
+        assert iibs.get("builds/1", conditional=True).status_code == 200
+        assert "If-None-Match" not in build.last_request.headers
+        assert iibs.get("builds/1", conditional=True).status_code == 304
+        assert build.last_request.headers["If-None-Match"] == '"v1"'
+        assert (
+            build.last_request.headers["If-Modified-Since"]
+            == "Wed, 12 Feb 2020 17:00:00 GMT"
+        )
+        # validators are sent only with conditional requests
+        iibs.get("builds/1")
+        assert "If-None-Match" not in build.last_request.headers
+
+        # validators of least recently used url are dropped
+        iibs.get("builds/2", conditional=True)
+        iibs.get("builds/1", conditional=True)
+        assert "If-None-Match" not in build.last_request.headers
+
+
+def test_iib_session_compression():
+    body = json.dumps({"items": [{"bundle_mapping": "x" * 1000}]}).encode()
+    metrics = IIBMetrics()
+    iibs = IIBSession("fake-host", instrumentation=metrics)
+    with patch.object(HTTPResponse, "CONTENT_DECODERS", ["gzip", "x-gzip", "br"]):
+        assert accept_encoding() == "gzip, br"
+    with requests_mock.Mocker() as m:
+        builds = m.register_uri(
+            "GET",
+            "/api/v1/builds",
+            content=gzip.compress(body),
+            headers={"Content-Encoding": "gzip"},
+        )
+        m.register_uri("GET", "/api/v1/builds/1", content=b"{}")
+        assert iibs.get("builds").json() == json.loads(body)
+        assert builds.last_request.headers["Accept-Encoding"] == accept_encoding()
+        iibs.get("builds/1")
+        iibs.get("builds", stream=True).close()
+
+    compressed = metrics.counter(
+        "iib_response_compressed_bytes_total", endpoint="builds", encoding="gzip"
+    )
+    assert compressed == len(gzip.compress(body))
+    assert metrics.counter(
+        "iib_response_uncompressed_bytes_total", endpoint="builds", encoding="gzip"
+    ) == len(body)
+    assert (
+        metrics.counter(
+            "iib_response_compressed_bytes_total",
+            endpoint="builds/<id>",
+            encoding="identity",
+        )
+        == 2
+    )
@@ -0,0 +1,77 @@
+import pytest
+
+from iiblib.iib_timestamps import (
+    build_durations,
+    build_times,
+    format_timestamp,
+    parse_timestamp,
+)
+
+
+def _entry(state, updated):
+    return {"state": state, "state_reason": "reason", "updated": updated}
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("1970-01-01T00:00:01.000002Z") == 1000002
+    assert parse_timestamp("1970-01-01T00:01:00") == 60000000
+    assert parse_timestamp("1970-01-01T01:00:00+01:00") == 0
+    assert parse_timestamp("") is None
+    assert parse_timestamp(None) is None
+    with pytest.raises(ValueError):
+        parse_timestamp("updated")
+
+
+def test_format_timestamp():
+    assert format_timestamp(1000002) == "1970-01-01T00:00:01.000002Z"
+    assert format_timestamp(None) is None
+    value = "2024-02-12T17:03:00.123456Z"
+    assert format_timestamp(parse_timestamp(value)) == value
+
+
+def test_build_times():
+    history = [
+        _entry("complete", "1970-01-01T00:00:30Z"),
+        _entry("in_progress", "1970-01-01T00:00:12Z"),
+        _entry("in_progress", "1970-01-01T00:00:10Z"),
+        _entry("in_progress", "1970-01-01T00:00:02Z"),
+    ]
+    assert build_times(history) == (2000000, 10000000, 30000000)
+    assert build_durations(history) == (8.0, 20.0)
+
+
+@pytest.mark.parametrize(
+    "history, times, durations",
+    [
+        ([], (None, None, None), (None, None)),
+        (
+            [_entry("in_progress", "1970-01-01T00:00:02Z")],
+            (2000000, None, None),
+            (None, None),
+        ),
+        (
+            [
+                _entry("in_progress", "1970-01-01T00:00:02Z"),
+                _entry("in_progress", "1970-01-01T00:00:05Z"),
+            ],
+            (2000000, 5000000, None),
+            (3.0, None),
+        ),
+        (
+            [
+                _entry("failed", "1970-01-01T00:00:04Z"),
+                _entry("in_progress", "1970-01-01T00:00:02Z"),
+            ],
+            (2000000, None, 4000000),
+            (None, 2.0),
+        ),
+        (
+            [_entry("failed", "1970-01-01T00:00:04Z")],
+            (4000000, None, 4000000),
+            (None, 0.0),
+        ),
+    ],
+)
+def test_build_times_incomplete(history, times, durations):
+    assert build_times(history) == times
+    assert build_durations(history) == durations
@@ -0,0 +1,84 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+import requests
+import requests_mock
+
+from iiblib.iib_client import IIBClient
+from iiblib.iib_notifications import IIBBuildWatcher
+from iiblib.iib_webhook import SIGNATURE_HEADER, IIBWebhookReceiver
+
+
+def test_webhook_receiver(fixture_finished_json):
+    received = []
+    receiver = IIBWebhookReceiver(path="/iib", max_body_size=2000)
+    receiver.start(received.append)
+    try:
+        resp = requests.post(receiver.url, json=fixture_finished_json)
+        assert resp.status_code == 204
+        resp = requests.post(receiver.url, json=[fixture_finished_json] * 2)
+        assert resp.status_code == 204
+        assert received == [fixture_finished_json] * 3
+
+        assert requests.post(receiver.url, data="{").status_code == 400
+        assert requests.post(receiver.url, data="x" * 2001).status_code == 413
+        url = receiver.url.replace("/iib", "/other")
+        assert requests.post(url, json=fixture_finished_json).status_code == 404
+    finally:
+        receiver.stop()
+    receiver.stop()
+
+
+def test_webhook_secret(fixture_finished_json):
+    with pytest.raises(ValueError, match="Secret is required"):
+        IIBWebhookReceiver(host="0.0.0.0")
+    with pytest.raises(ValueError, match="Secret is required"):
+        IIBWebhookReceiver(host="iib-receiver.example.com", secret="")
+    IIBWebhookReceiver(host="0.0.0.0", secret="secret")
+
+    received = []
+    receiver = IIBWebhookReceiver(secret="secret")
+    receiver.start(received.append)
+    try:
+        body = json.dumps(fixture_finished_json).encode("utf-8")
+        signature = hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+        for headers, status in (
+            ({}, 401),
+            ({"Authorization": "Bearer wrong"}, 401),
+            ({SIGNATURE_HEADER: "sha256=%s" % ("0" * 64)}, 401),
+            ({"Authorization": "Bearer secret"}, 204),
+            ({SIGNATURE_HEADER: "sha256=%s" % signature}, 204),
+        ):
+            resp = requests.post(receiver.url, data=body, headers=headers)
+            assert resp.status_code == status
+        assert received == [fixture_finished_json] * 2
+    finally:
+        receiver.stop()
+
+
+def test_webhook_routes_to_futures_and_callbacks(fixture_finished_json):
+    receiver = IIBWebhookReceiver()
+    with requests_mock.Mocker(real_http=True) as m:
+        m.register_uri(
+            "GET", "https://fake-host/api/v1/builds/3", json=fixture_finished_json
+        )
+        with IIBBuildWatcher(IIBClient("fake-host"), receiver) as watcher:
+            future = watcher.future(3)
+            other = watcher.future(4)
+            received = []
+            watcher.subscribe(3, received.append)
+
+            invalid = dict(fixture_finished_json)
+            del invalid["request_type"]
+            assert requests.post(receiver.url, json=invalid).status_code == 400
+            assert not future.done()
+
+            resp = requests.post(receiver.url, json=fixture_finished_json)
+            assert resp.status_code == 204
+            build = future.result(timeout=10)
+            assert build.id == 3
+            assert build.state == "complete"
+            assert received == [build]
+            assert not other.done()
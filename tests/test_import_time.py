@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+
+# Budget of time spent in iiblib modules themselves when importing
+# iiblib.iib_client, in microseconds. Dependencies aren't counted.
+IMPORT_TIME_BUDGET = 100000
+
+# Modules which are imported only when used
+LAZY_MODULES = (
+    "kerberos",
+    "tenacity",
+    "orjson",
+    "ujson",
+    "iiblib.iib_export",
+    "iiblib.iib_profile",
+    "iiblib.iib_futures",
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(*args):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [ROOT, os.environ.get("PYTHONPATH")])
+    )
+    return subprocess.run(
+        [sys.executable] + list(args),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+def _self_times(importtime_output):
+    """Return self time in microseconds of imported modules"""
+    times = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, module = line[len("import time:") :].split("|")
+        if self_time.strip().isdigit():
+            times[module.strip()] = int(self_time)
+    return times
+
+
+def test_lazy_imports():
+    proc = _python(
+        "-c",
+        "import sys, iiblib.iib_client; "
+        "print(' '.join(m for m in %r if m in sys.modules))" % (LAZY_MODULES,),
+    )
+    assert proc.stdout.split() == []
+
+
+def test_import_time_budget():
+    # compile bytecode first, so compilation isn't measured
+    _python("-c", "import iiblib.iib_client")
+    proc = _python("-X", "importtime", "-c", "import iiblib.iib_client")
+    times = _self_times(proc.stderr)
+    assert "iiblib.iib_client" in times
+    spent = sum(t for module, t in times.items() if module.split(".")[0] == "iiblib")
+    assert spent < IMPORT_TIME_BUDGET, sorted(times.items(), key=lambda i: -i[1])